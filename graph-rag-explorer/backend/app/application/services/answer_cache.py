@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from app.application.types.graph_triple import GraphTriple
+
+
+# ===== 可調參數 =====
+ANSWER_CACHE_MAX_ENTRIES = 1024   # 記憶體（與磁碟）最多保留的回答數，超過即淘汰最久未用者
+ANSWER_CACHE_TOUCH_FLUSH = 64     # 命中累積幾筆後才把最近使用時間批次寫回 SQLite
+
+_SPACES = re.compile(r"\s+")
+
+# 快取內容：(回答, 三元組；None 表示未快取三元組)
+CachedAnswer = Tuple[str, Optional[List[GraphTriple]]]
+
+
+def normalize_question(question: str) -> str:
+    """
+    正規化問題文字：NFKC（全形 → 半形）、casefold、合併空白。
+
+    Args:
+        question: 原始問題。
+
+    Returns:
+        正規化後的問題。
+    """
+    text = unicodedata.normalize("NFKC", question).casefold()
+    return _SPACES.sub(" ", text).strip()
+
+
+def passages_hash(passages: Sequence[str]) -> str:
+    """
+    計算檢索段落（含順序）的 md5；語料變動使檢索結果改變時 hash 隨之改變。
+
+    Args:
+        passages: 檢索到的段落。
+
+    Returns:
+        md5 hex digest。
+    """
+    h = hashlib.md5()
+    for p in passages:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class AnswerCache:
+    """
+    AnswerCache 快取 /api/ask 的回答與三元組。
+
+    - key 為 (正規化問題, 檢索段落 hash, model id, 生成參數) 的 hash；
+      語料變動使檢索段落不同時自然不會命中
+    - 記憶體以 OrderedDict 維持 LRU，筆數超過 max_entries 時淘汰最久未用者
+    - 指定 path 時同步寫入 SQLite，重啟後載入最近使用的 max_entries 筆；
+      淘汰時一併從磁碟刪除，磁碟筆數與記憶體一致
+    - 命中只更新記憶體中的最近使用時間，累積 touch_flush 筆、put 或 close 時
+      才批次寫回 SQLite，命中路徑不做磁碟寫入；異常結束時最多遺失尚未寫回的
+      使用順序（重啟後的淘汰順序略有偏差），不會遺失回答
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        generation_params: Mapping[str, Any],
+        path: Optional[Path] = None,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        touch_flush: int = ANSWER_CACHE_TOUCH_FLUSH,
+    ) -> None:
+        """
+        建立 AnswerCache。
+
+        Args:
+            model_id: 生成回答的模型 id。
+            generation_params: 生成參數（任一項改變都視為不同結果）。
+            path: SQLite 檔案路徑；None 表示只保存在記憶體。
+            max_entries: 快取筆數上限。
+            touch_flush: 命中累積幾筆後批次寫回最近使用時間。
+        """
+        self.model_id: str = model_id
+        self.generation_params: str = json.dumps(dict(generation_params), sort_keys=True, default=str)
+        self.path: Optional[Path] = Path(path) if path else None
+        self.max_entries: int = max(1, max_entries)
+        self.touch_flush: int = max(1, touch_flush)
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._clock: int = 0
+        self._touched: Dict[str, int] = {}   # 尚未寫回的最近使用時間：key -> clock
+
+        if self.path is not None:
+            self._open()
+
+    # ----------------------------------------------------------
+    # 讀寫
+    # ----------------------------------------------------------
+    def key(self, question: str, passages: Sequence[str]) -> str:
+        """
+        組出快取 key。
+
+        Args:
+            question: 原始問題。
+            passages: 檢索到的段落。
+
+        Returns:
+            key（sha256 hex digest）。
+        """
+        raw = "\0".join((
+            normalize_question(question),
+            passages_hash(passages),
+            self.model_id,
+            self.generation_params,
+        ))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedAnswer]:
+        """
+        查詢快取，命中的紀錄會更新為最近使用。
+
+        Args:
+            key: key() 的結果。
+
+        Returns:
+            (回答, 三元組)；未命中時為 None。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if self._conn is not None:
+                self._clock += 1
+                self._touched[key] = self._clock
+                if len(self._touched) >= self.touch_flush:
+                    self._write_touched()
+                    self._conn.commit()
+            return entry
+
+    def put(self, key: str, answer: str, triples: Optional[List[GraphTriple]]) -> None:
+        """
+        寫入回答，必要時淘汰最久未用的紀錄。
+
+        Args:
+            key: key() 的結果。
+            answer: 回答文字。
+            triples: 回答附帶的三元組；None 表示不快取三元組。
+        """
+        with self._lock:
+            self._entries[key] = (answer, list(triples) if triples is not None else None)
+            self._entries.move_to_end(key)
+
+            evicted: List[str] = []
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                evicted.append(old)
+            self.evictions += len(evicted)
+
+            if self._conn is not None:
+                # 同一個交易一併寫回累積的最近使用時間
+                self._touched.pop(key, None)
+                for old in evicted:
+                    self._touched.pop(old, None)
+                self._write_touched()
+
+                self._clock += 1
+                payload = None if triples is None else json.dumps(
+                    [asdict(t) for t in triples], ensure_ascii=False
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answer_cache (key, answer, triples, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, answer, payload, self._clock),
+                )
+                self._conn.executemany(
+                    "DELETE FROM answer_cache WHERE key=?",
+                    [(k,) for k in evicted],
+                )
+                self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        取得快取統計。
+
+        Returns:
+            entries / hits / misses / evictions / hit_rate。
+        """
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        """寫回累積的最近使用時間並關閉 SQLite。"""
+        with self._lock:
+            if self._conn is not None:
+                self._write_touched()
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _write_touched(self) -> None:
+        """（持有 _lock）將累積的最近使用時間寫入目前交易（由呼叫端 commit）。"""
+        if not self._touched or self._conn is None:
+            return
+        self._conn.executemany(
+            "UPDATE answer_cache SET last_used=? WHERE key=?",
+            [(clock, key) for key, clock in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _open(self) -> None:
+        """開啟 SQLite 並載入最近使用的紀錄。"""
+        assert self.path is not None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answer_cache (
+                key       TEXT    PRIMARY KEY,
+                answer    TEXT    NOT NULL,
+                triples   TEXT,
+                last_used INTEGER NOT NULL
+            )
+            """
+        )
+
+        rows = conn.execute(
+            "SELECT key, answer, triples, last_used FROM answer_cache "
+            "ORDER BY last_used DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, answer, triples, _ in reversed(rows):
+            self._entries[key] = (
+                answer,
+                None if triples is None else [GraphTriple(**t) for t in json.loads(triples)],
+            )
+        self._clock = int(rows[0][3]) if rows else 0
+
+        # 上限調小時，刪除超出的舊紀錄
+        conn.execute(
+            "DELETE FROM answer_cache WHERE key NOT IN ("
+            "SELECT key FROM answer_cache ORDER BY last_used DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        conn.commit()
+        self._conn = conn
+
+        if rows:
+            print(f"💬 AnswerCache：已載入 {len(rows)} 筆回答快取")
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+from itertools import islice
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 
-from app.core.embedding.chunker import split_document, DocumentChunk
+from app.core.embedding.chunker import iter_document_chunks, split_document, DocumentChunk
+
+
+# ===== 可調參數 =====
+CHUNK_BATCH_SIZE = 256   # 串流切分時，每累積幾個 chunk 交給下游處理一次
 
 
 class DocumentChunkingService:
@@ -23,3 +28,39 @@ class DocumentChunkingService:
             文件切分後的 DocumentChunk 清單。
         """
         return split_document(str(file_path))
+
+    def iter_split(self, file_path: Path) -> Iterator[DocumentChunk]:
+        """
+        以串流方式切分檔案：逐段讀取、逐一產生 chunk，適合大型文字檔。
+
+        Args:
+            file_path: 文件路徑。
+
+        Yields:
+            DocumentChunk（與 split 的結果相同）。
+        """
+        return iter_document_chunks(str(file_path))
+
+    def iter_batches(
+        self,
+        file_path: Path,
+        batch_size: int = CHUNK_BATCH_SIZE,
+    ) -> Iterator[List[DocumentChunk]]:
+        """
+        以串流方式切分檔案，每累積 batch_size 個 chunk 產生一批。
+
+        下游可在檔案還沒讀完前就開始處理前面的批次。
+
+        Args:
+            file_path: 文件路徑。
+            batch_size: 每批 chunk 數。
+
+        Yields:
+            DocumentChunk 清單（最後一批可能不足 batch_size）。
+        """
+        chunks = self.iter_split(file_path)
+        while True:
+            batch = list(islice(chunks, max(1, batch_size)))
+            if not batch:
+                return
+            yield batch
@@ -1,3 +1,6 @@
+from typing import Callable, Optional
+
+from app.core.embedding.embedder import AddChunksResult
 from app.infrastructure.models.model_loader import ModelRegistry
 
 
@@ -5,8 +8,12 @@ class EmbeddingIngestService:
     def __init__(self, registry: ModelRegistry):
         self._registry = registry
 
-    def ingest(self, texts: list[str]) -> None:
+    def ingest(
+        self,
+        texts: list[str],
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> AddChunksResult:
         """
-        將文本加入向量資料庫
+        將文本分批加入向量資料庫（已存在的文字會略過），回傳新增 / 略過數
         """
-        self._registry.add_chunks(texts)
+        return self._registry.add_chunks(texts, progress=progress)
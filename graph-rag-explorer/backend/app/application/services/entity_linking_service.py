@@ -0,0 +1,63 @@
+from app.application.types.graph_triple import GraphTriple
+from app.core.graph.entity_matcher import EntityMatcher
+from app.core.graph.graph_store import GraphStore
+
+# 每個命中的 entity 最多取幾條相鄰邊，以及整體回傳的三元組上限
+ENTITY_FANOUT = 10
+MAX_LINKED_TRIPLES = 20
+
+
+class EntityLinkingService:
+    """
+    以 EntityMatcher 找出文字中的已知 entity，直接回傳圖譜中既有的三元組。
+
+    介面與 GraphExtractionService.extract 相同，但不需要呼叫 LLM。
+    """
+
+    def __init__(
+        self,
+        store: GraphStore,
+        matcher: EntityMatcher | None = None,
+        max_triples: int = MAX_LINKED_TRIPLES,
+    ):
+        self.store = store
+        self.matcher = matcher or EntityMatcher(store)
+        self.max_triples = max_triples
+
+    def extract(self, text: str) -> list[GraphTriple]:
+        """
+        回傳與文字中 entity 相連的三元組：兩端都在文字中出現的邊排在前面。
+        """
+        entities = self.matcher.entities(text)
+        if not entities:
+            return []
+
+        mentioned = set(entities)
+        seen: set[tuple] = set()
+        both: list[GraphTriple] = []
+        one: list[GraphTriple] = []
+
+        for entity in entities:
+            subgraph = self.store.neighborhood(
+                entity,
+                hops=1,
+                fanout=ENTITY_FANOUT,
+                max_edges=ENTITY_FANOUT,
+            )
+            for t in subgraph["triples"]:
+                key = (t["subject"], t["predicate"], t["object"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                triple = GraphTriple(
+                    subject=t["subject"],
+                    predicate=t["predicate"] or "",
+                    object=t["object"],
+                    source_text=text,
+                )
+                if t["subject"] in mentioned and t["object"] in mentioned:
+                    both.append(triple)
+                else:
+                    one.append(triple)
+
+        return (both + one)[: self.max_triples]
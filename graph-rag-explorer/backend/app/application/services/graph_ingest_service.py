@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 
-from app.core.graph.graph_store import GraphStore
-from app.core.graph.graph_builder import GraphBuilder
+from app.core.graph.extraction_cache import ExtractionCache
+from app.core.graph.graph_store import GraphStore, SourcedTriple
+from app.core.graph.graph_builder import GraphBuilder, ProgressCallback
 from app.infrastructure.models.model_provider import ModelProvider
 
 
@@ -20,6 +21,7 @@ class GraphIngestService:
         self,
         provider: ModelProvider,
         store: GraphStore,
+        cache: Optional[ExtractionCache] = None,
     ) -> None:
         """
         建立 GraphIngestService。
@@ -27,15 +29,18 @@ class GraphIngestService:
         Args:
             provider: 提供 LLM / embedding 等模型資源的 ModelProvider。
             store: 知識圖譜儲存層。
+            cache: 三元組抽取快取（None 表示不使用）。
         """
         self.provider: ModelProvider = provider
         self.store: GraphStore = store
+        self.cache: Optional[ExtractionCache] = cache
 
     def ingest_from_file(
         self,
         file_path: str,
         *,
         max_chunks: Optional[int] = None,
+        progress: Optional[ProgressCallback] = None,
     ) -> List[Dict[str, str]]:
         """
         從檔案匯入資料並建立知識圖譜。
@@ -48,6 +53,7 @@ class GraphIngestService:
         Args:
             file_path: 文件路徑。
             max_chunks: 最大處理 chunk 數量，None 表示不限制。
+            progress: 每批抽取完成後的進度回報。
 
         Returns:
             本次匯入產生的三元組清單。
@@ -55,9 +61,43 @@ class GraphIngestService:
         builder: GraphBuilder = GraphBuilder(
             provider=self.provider,
             store=self.store,
+            cache=self.cache,
         )
 
         return builder.build_from_file(
             file_path=file_path,
             max_chunks=max_chunks,
+            progress=progress,
+        )
+
+    def ingest_chunks(
+        self,
+        doc_id: str,
+        texts: Sequence[str],
+        *,
+        max_chunks: Optional[int] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> List[SourcedTriple]:
+        """
+        從已切好的 chunk 建立知識圖譜（不再重新讀檔、切分）。
+
+        Args:
+            doc_id: 文件 id（記錄於三元組出處）。
+            texts: chunk 文字。
+            max_chunks: 最大處理 chunk 數量，None 表示不限制。
+            progress: 每批抽取完成後的進度回報。
+
+        Returns:
+            本次匯入產生的三元組清單（含 doc_id / chunk_id）。
+        """
+        builder: GraphBuilder = GraphBuilder(
+            provider=self.provider,
+            store=self.store,
+            cache=self.cache,
+        )
+
+        return builder.build_from_chunks(
+            [(doc_id, t) for t in texts],
+            max_chunks=max_chunks,
+            progress=progress,
         )
@@ -1,29 +1,276 @@
+import base64
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Iterator, Sequence
+
+from app.core.graph.graph_layout import GraphLayout
 from app.core.graph.graph_store import GraphStore
 
+# 鄰域查詢快取筆數上限（LRU）
+NEIGHBORHOOD_CACHE_SIZE = 256
+
+
 class GraphQueryService:
-    def __init__(self, store: GraphStore):
+    def __init__(
+        self,
+        store: GraphStore,
+        neighborhood_cache_size: int = NEIGHBORHOOD_CACHE_SIZE,
+        layout: GraphLayout | None = None,
+    ):
         self.store = store
+        self.layout = layout
+
+        # (node, hops, direction, fanout, max_edges, graph version) -> 子圖
+        self._cache: "OrderedDict[tuple, dict[str, Any]]" = OrderedDict()
+        self._cache_size = neighborhood_cache_size
+        self._cache_version = store.version
+        self._cache_lock = threading.Lock()
 
     def get_related(self, node: str) -> list[dict]:
         return self.store.search_related(node)
 
+    def get_incoming(self, node: str) -> list[dict]:
+        return self.store.search_incoming(node)
+
+    def get_by_relation(self, predicate: str, limit: int | None = None) -> list[dict]:
+        return self.store.search_by_relation(predicate, limit=limit)
+
+    def get_neighborhood(
+        self,
+        node: str,
+        hops: int = 2,
+        direction: str = "both",
+        fanout: Sequence[int] = (20,),
+        max_edges: int = 200,
+    ) -> dict[str, Any]:
+        """
+        取得節點的 k-hop 鄰域子圖，結果依圖譜版本快取。
+
+        圖譜版本改變（add_triples 寫入新邊）時整個快取即失效。
+        """
+        fanout = tuple(fanout)
+        version = self.store.version
+        key = (node, hops, direction, fanout, max_edges, version)
+
+        with self._cache_lock:
+            if version != self._cache_version:
+                self._cache.clear()
+                self._cache_version = version
+
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return {**hit, "cached": True}
+
+        subgraph = self.store.neighborhood(
+            node,
+            hops,
+            direction=direction,
+            fanout=fanout,
+            max_edges=max_edges,
+        )
+        result = {"node": node, "hops": hops, "version": version, **subgraph}
+
+        with self._cache_lock:
+            if version == self._cache_version:
+                self._cache[key] = result
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+
+        return {**result, "cached": False}
+
     def get_visual_elements(self) -> dict:
-        g = self.store.graph
-
-        nodes = [{"data": {"id": n, "label": n}} for n in g.nodes]
-        edges = [
-            {"data": {
-                "source": u,
-                "target": v,
-                "label": d.get("relation", "")
-            }}
-            for u, v, d in g.edges(data=True)
-        ]
+        self._sync_layout()
+        version = self.store.version
+        nodes = [self._node_element(n) for n in self.store.iter_nodes()]
+        edges = [self._edge_element(t) for t in self.store.iter_edges()]
 
         return {
             "elements": {"nodes": nodes, "edges": edges},
             "meta": {
+                "version": version,
                 "node_count": len(nodes),
                 "edge_count": len(edges),
+                "layout": self._layout_name(),
+                "layout_epoch": self._layout_epoch(),
             }
         }
+
+    def get_visual_changes(self, since: int, layout_epoch: int | None = None) -> dict:
+        """
+        取得版本 since 之後新增的節點與邊，供前端輪詢時只下載差異。
+
+        以下情況退回完整圖譜，並以 full=True 標示，前端應以回傳內容取代現有畫面：
+        - 變更紀錄已截斷（或 since 不合法）
+        - 伺服器完成了新的完整佈局（layout_epoch 與目前不同，
+          或 since 早於該次佈局生效的版本），既有節點的座標已改變
+
+        Args:
+            since: 前端目前持有的版本（上次回傳的 version）。
+            layout_epoch: 前端目前座標所屬的佈局 epoch（上次回傳的 meta.layout_epoch）。
+
+        Returns:
+            {"full": bool, "version": int, "elements": {...}, "meta": {...}}
+        """
+        self._sync_layout()
+        changes = self.store.changes_since(since)
+        if changes is None or self._layout_changed(since, layout_epoch):
+            data = self.get_visual_elements()
+            return {"full": True, "version": data["meta"]["version"], **data}
+
+        nodes = [self._node_element(n) for c in changes for n in c["nodes"]]
+        edges = [self._edge_element(t) for c in changes for t in c["triples"]]
+        version = changes[-1]["version"] if changes else since
+
+        return {
+            "full": False,
+            "version": version,
+            "elements": {"nodes": nodes, "edges": edges},
+            "meta": {
+                "node_count": len(nodes),
+                "edge_count": len(edges),
+                "layout": self._layout_name(),
+                "layout_epoch": self._layout_epoch(),
+            },
+        }
+
+    def get_visual_page(self, cursor: str | None = None, limit: int = 1000) -> dict:
+        """
+        以 cursor 分頁取得 Cytoscape 元素：先列完所有節點，再列邊，
+        因此前端依序加入時，邊的端點一定已經存在。
+
+        cursor 記錄上一頁最後一個元素本身（節點名稱或 (s, p, o)），
+        不是位置，因此分頁期間的寫入或 compaction 不會造成略過或重複。
+
+        Args:
+            cursor: 上一頁回傳的 next_cursor；None 表示從頭開始。
+            limit: 每頁最多元素數。
+
+        Returns:
+            {"elements": {...}, "next_cursor": str | None, "meta": {...}}；
+            next_cursor 為 None 表示已到最後一頁。
+
+        Raises:
+            ValueError: cursor 格式不正確。
+        """
+        phase, after = self._parse_cursor(cursor)
+        if phase == "n" and after is None:
+            self._sync_layout()
+
+        nodes: list[dict] = []
+        edges: list[dict] = []
+        next_cursor: str | None = None
+
+        if phase == "n":
+            last_node = after
+            for n in self.store.iter_nodes(last_node):
+                if len(nodes) >= limit:
+                    next_cursor = self._encode_cursor("n", last_node)
+                    break
+                nodes.append(self._node_element(n))
+                last_node = n
+            else:
+                phase, after = "e", None
+
+        if phase == "e" and next_cursor is None:
+            last_edge = after
+            for t in self.store.iter_edges(last_edge):
+                if len(nodes) + len(edges) >= limit:
+                    next_cursor = self._encode_cursor("e", last_edge)
+                    break
+                edges.append(self._edge_element(t))
+                last_edge = (t["subject"], t["predicate"], t["object"])
+
+        return {
+            "elements": {"nodes": nodes, "edges": edges},
+            "next_cursor": next_cursor,
+            "meta": {
+                "version": self.store.version,
+                "node_count": len(nodes),
+                "edge_count": len(edges),
+                "layout": self._layout_name(),
+                "layout_epoch": self._layout_epoch(),
+            },
+        }
+
+    def iter_visual_elements(self) -> Iterator[dict]:
+        """
+        逐一產生 Cytoscape 元素（帶 group 欄位，可直接 cy.add），
+        先節點後邊，不會在記憶體中組出完整清單。
+        """
+        self._sync_layout()
+        for n in self.store.iter_nodes():
+            yield {"group": "nodes", **self._node_element(n)}
+        for t in self.store.iter_edges():
+            yield {"group": "edges", **self._edge_element(t)}
+
+    def _node_element(self, node: str) -> dict:
+        element: dict[str, Any] = {"data": {"id": node, "label": node}}
+        if self.layout is not None:
+            pos = self.layout.position(node)
+            if pos is not None:
+                element["position"] = {"x": pos[0], "y": pos[1]}
+        return element
+
+    def _sync_layout(self) -> None:
+        """
+        讓預先計算的佈局跟上圖譜：只為新節點計算座標；
+        尚無完整佈局時只在背景啟動計算，不阻塞請求。
+        """
+        if self.layout is not None:
+            self.layout.update(self.store)
+
+    def _layout_epoch(self) -> int:
+        """目前座標所屬的佈局 epoch；沒有伺服器佈局時為 0。"""
+        return self.layout.epoch if self.layout is not None else 0
+
+    def _layout_changed(self, since: int, layout_epoch: int | None) -> bool:
+        """前端持有的座標是否已被新的完整佈局取代。"""
+        if self.layout is None or not self.layout.ready:
+            return False
+        if layout_epoch is not None and layout_epoch != self.layout.epoch:
+            return True
+        return since < self.layout.epoch_version
+
+    def _layout_name(self) -> str:
+        """前端應使用的 Cytoscape layout：伺服器座標已就緒時為 preset，否則 cose。"""
+        return "preset" if self.layout is not None and self.layout.ready else "cose"
+
+    @staticmethod
+    def _edge_element(t: dict) -> dict:
+        return {"data": {
+            "source": t["subject"],
+            "target": t["object"],
+            "label": t["predicate"] or "",
+        }}
+
+    @staticmethod
+    def _encode_cursor(phase: str, after: Any) -> str:
+        """cursor 為 {"p": 階段, "k": 最後一個元素} 的 base64url JSON（名稱可含任意字元）。"""
+        raw = json.dumps({"p": phase, "k": after}, ensure_ascii=False, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _parse_cursor(cursor: str | None) -> tuple[str, Any]:
+        if not cursor:
+            return "n", None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+            phase, key = data["p"], data["k"]
+            if phase == "n" and (key is None or isinstance(key, str)):
+                return "n", key
+            if phase == "e" and key is None:
+                return "e", None
+            if (
+                phase == "e"
+                and isinstance(key, list)
+                and len(key) == 3
+                and isinstance(key[0], str)
+                and isinstance(key[2], str)
+                and (key[1] is None or isinstance(key[1], str))
+            ):
+                return "e", tuple(key)
+        except (ValueError, UnicodeError, TypeError, KeyError):
+            pass
+        raise ValueError(f"無效的 cursor: {cursor!r}")
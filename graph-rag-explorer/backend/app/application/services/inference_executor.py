@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+
+# ===== 可調參數 =====
+INFERENCE_WORKERS        = 1     # 同時執行的推論數（共用同一個 LLM，多開只會互搶 CPU/GPU）
+INFERENCE_MAX_IN_FLIGHT  = 8     # 排隊 + 執行中的請求上限，超過即拒絕
+DISCONNECT_POLL_INTERVAL = 0.5   # 等待結果時檢查 client 是否斷線的間隔（秒）
+
+
+T = TypeVar("T")
+
+
+class InferenceOverloadedError(RuntimeError):
+    """進行中的推論請求已達上限。"""
+
+
+class InferenceCancelledError(RuntimeError):
+    """推論請求已被取消（client 斷線）。"""
+
+
+class InferenceExecutor:
+    """
+    InferenceExecutor 把同步的推論流程（embedding、LLM 生成）移出 event loop，
+    交給專用且有上限的執行緒池執行。
+
+    - 排隊 + 執行中的請求數超過 max_in_flight 時立即拒絕，避免無限排隊
+    - 每個請求記錄排隊時間、執行時間與總延遲
+    - client 斷線時：尚未開始的請求直接從佇列移除；執行中的請求
+      透過 cancel event 通知工作函式在下一個階段前停止
+    """
+
+    def __init__(
+        self,
+        max_workers: int = INFERENCE_WORKERS,
+        max_in_flight: int = INFERENCE_MAX_IN_FLIGHT,
+    ) -> None:
+        """
+        建立 InferenceExecutor。
+
+        Args:
+            max_workers: 同時執行的推論數。
+            max_in_flight: 排隊 + 執行中的請求上限。
+        """
+        self.max_in_flight: int = max(1, max_in_flight)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="inference",
+        )
+        self._lock = threading.Lock()
+        self._in_flight: int = 0
+
+        self.completed: int = 0
+        self.cancelled: int = 0
+        self.rejected: int = 0
+        self.failed: int = 0
+
+    async def run(
+        self,
+        fn: Callable[[threading.Event], T],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> Tuple[T, Dict[str, float]]:
+        """
+        在推論執行緒池中執行 fn，並在等待期間監看 client 是否斷線。
+
+        Args:
+            fn: 工作函式，接收 cancel event（被設定時應盡快停止）。
+            is_disconnected: 回傳 client 是否已斷線的 coroutine function。
+
+        Returns:
+            (fn 的回傳值, 計時資訊 queue_time / run_time / latency（秒）)。
+
+        Raises:
+            InferenceOverloadedError: 進行中的請求已達上限。
+            InferenceCancelledError: client 斷線而取消。
+        """
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self.rejected += 1
+                raise InferenceOverloadedError(
+                    f"推論請求已達上限（{self.max_in_flight}），請稍後再試"
+                )
+            self._in_flight += 1
+
+        cancel = threading.Event()
+        marks: Dict[str, float] = {"submitted": time.perf_counter()}
+
+        def _call() -> T:
+            marks["started"] = time.perf_counter()
+            try:
+                if cancel.is_set():
+                    raise InferenceCancelledError("請求在開始前已取消")
+                return fn(cancel)
+            finally:
+                marks["finished"] = time.perf_counter()
+
+        future = self._executor.submit(_call)
+        future.add_done_callback(self._release)
+        waiter = asyncio.wrap_future(future)
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({waiter}, timeout=DISCONNECT_POLL_INTERVAL)
+                if done:
+                    break
+                if is_disconnected is not None and await is_disconnected():
+                    cancel.set()
+                    waiter.cancel()
+                    raise InferenceCancelledError("client 已斷線")
+            result = waiter.result()
+        except InferenceCancelledError:
+            self._count("cancelled")
+            print(f"🛑 InferenceExecutor：請求已取消（{self._timing(marks)}）")
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+
+        timing = self._timing(marks)
+        self._count("completed")
+        print(f"⏱️ InferenceExecutor：{timing}")
+        return result, timing
+
+    def stats(self) -> Dict[str, int]:
+        """目前進行中的請求數與累計完成 / 取消 / 拒絕 / 失敗次數。"""
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "rejected": self.rejected,
+                "failed": self.failed,
+            }
+
+    def shutdown(self) -> None:
+        """取消尚未開始的推論。"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _release(self, _future: object) -> None:
+        # 執行緒真正結束（或從佇列移除）才釋放名額
+        with self._lock:
+            self._in_flight -= 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _timing(marks: Dict[str, float]) -> Dict[str, float]:
+        now = time.perf_counter()
+        started = marks.get("started", now)
+        finished = marks.get("finished", now)
+        return {
+            "queue_time": round(started - marks["submitted"], 4),
+            "run_time": round(max(finished - started, 0.0), 4),
+            "latency": round(now - marks["submitted"], 4),
+        }
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+# ===== 可調參數 =====
+JOB_WORKERS       = 2      # 背景 worker 數（抽取 / 向量化皆吃滿 CPU，不宜過多）
+JOB_HISTORY_SIZE  = 200    # 保留最近幾個已結束的 job 供查詢
+JOB_PARTIAL_LIMIT = 500    # 狀態查詢中最多附帶幾筆部分三元組
+
+
+class Job:
+    """
+    單一背景工作的狀態。
+
+    - status：queued → running → succeeded / failed
+    - progress：已完成 / 總 chunk 數，及目前階段
+    - partial_triples：執行中已產生的三元組（抽圖譜時）
+    - events：依序追加的事件，供 SSE 串流以游標讀取
+
+    狀態欄位由 worker 執行緒寫入、由請求執行緒讀取，一律在 _lock 內讀寫；
+    狀態變更與對應的事件在同一個臨界區內完成，事件順序與狀態一致。
+    """
+
+    def __init__(self, kind: str) -> None:
+        self.id: str = uuid.uuid4().hex
+        self.kind: str = kind
+        self.status: str = "queued"
+        self.stage: Optional[str] = None
+        self.done: int = 0
+        self.total: int = 0
+        self.partial_triples: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+        self.created_at: float = time.time()
+        self._created: float = time.perf_counter()
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+        self._emit("status", status=self.status)
+
+    @property
+    def finished(self) -> bool:
+        with self._lock:
+            return self.status in ("succeeded", "failed")
+
+    # ----------------------------------------------------------
+    # 由 worker 回報
+    # ----------------------------------------------------------
+    def report(
+        self,
+        done: int,
+        total: int,
+        triples: Optional[List[Any]] = None,
+        stage: Optional[str] = None,
+    ) -> None:
+        """
+        回報進度（供 use case 的 progress callback 使用）。
+
+        Args:
+            done: 已完成的 chunk 數。
+            total: chunk 總數。
+            triples: 本次新產生的三元組。
+            stage: 目前階段名稱。
+        """
+        with self._lock:
+            self.done, self.total = done, total
+            if stage is not None:
+                self.stage = stage
+            if triples:
+                self.partial_triples.extend(triples)
+
+            self._append_event(
+                "progress",
+                stage=self.stage,
+                done=done,
+                total=total,
+                triples=list(triples or []),
+                elapsed=round(self._elapsed(), 3),
+            )
+
+    def _start(self) -> None:
+        with self._lock:
+            self._started = time.perf_counter()
+            self.status = "running"
+            self._append_event("status", status=self.status, queue_time=round(self._queue_time(), 3))
+
+    def _finish(self, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        with self._lock:
+            self._finished = time.perf_counter()
+            self.result, self.error = result, error
+            self.status = "failed" if error is not None else "succeeded"
+            if error is not None:
+                self._append_event("error", status=self.status, error=error, timing=self._timing())
+            else:
+                self._append_event("result", status=self.status, result=result, timing=self._timing())
+
+    # ----------------------------------------------------------
+    # 查詢
+    # ----------------------------------------------------------
+    def events_since(self, cursor: int) -> List[Dict[str, Any]]:
+        """取出游標之後的事件。"""
+        with self._lock:
+            return self._events[cursor:]
+
+    def timing(self) -> Dict[str, Optional[float]]:
+        """排隊時間、執行時間與吞吐量（秒 / chunks/s）。"""
+        with self._lock:
+            return self._timing()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """工作狀態（/jobs/{id} 的回應）。"""
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": {"done": self.done, "total": self.total},
+                "partial_triples": self.partial_triples[-JOB_PARTIAL_LIMIT:],
+                "partial_triple_count": len(self.partial_triples),
+                "timing": self._timing(),
+                "result": self.result,
+                "error": self.error,
+            }
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _timing(self) -> Dict[str, Optional[float]]:
+        """（持有 _lock）timing 的實作。"""
+        run_time = self._elapsed() if self._started is not None else None
+        return {
+            "queue_time": round(self._queue_time(), 3),
+            "run_time": None if run_time is None else round(run_time, 3),
+            "chunks_per_sec": (
+                round(self.done / run_time, 3) if run_time and self.done else None
+            ),
+        }
+
+    def _emit(self, event: str, **data: Any) -> None:
+        with self._lock:
+            self._append_event(event, **data)
+
+    def _append_event(self, event: str, **data: Any) -> None:
+        """（持有 _lock）追加事件。"""
+        self._events.append({"event": event, "job_id": self.id, **data})
+
+    def _queue_time(self) -> float:
+        end = self._started if self._started is not None else time.perf_counter()
+        return end - self._created
+
+    def _elapsed(self) -> float:
+        if self._started is None:
+            return 0.0
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return end - self._started
+
+
+class JobService:
+    """
+    JobService 是行程內的背景工作子系統（Application Service）。
+
+    - submit 立即回傳 Job，實際工作交給固定大小的 worker pool 執行，
+      不佔用 event loop
+    - 工作函式會收到 Job 本身，可透過 job.report 回報進度
+    - 只保留最近 JOB_HISTORY_SIZE 個已結束的 job
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS) -> None:
+        """
+        建立 JobService。
+
+        Args:
+            max_workers: worker 執行緒數。
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="job-worker",
+        )
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[[Job], Dict[str, Any]]) -> Job:
+        """
+        提交背景工作。
+
+        Args:
+            kind: 工作類型（例如 "extract_graph"、"upload"）。
+            fn: 工作函式，接收 Job 並回傳結果 dict。
+
+        Returns:
+            已排入佇列的 Job。
+        """
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, fn)
+        print(f"📨 JobService：已排入 {kind} 工作 {job.id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        """取消尚未開始的工作，並等待執行中的工作結束。"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    @staticmethod
+    def _run(job: Job, fn: Callable[[Job], Dict[str, Any]]) -> None:
+        job._start()
+        try:
+            result = fn(job)
+        except Exception as e:
+            traceback.print_exc()
+            print(f"❌ JobService：{job.kind} 工作 {job.id} 失敗: {e}")
+            job._finish(None, str(e))
+            return
+
+        job._finish(result, None)
+        print(f"✅ JobService：{job.kind} 工作 {job.id} 完成（{job.timing()}）")
+
+    def _prune(self) -> None:
+        """移除超出保留數量的已結束 job（呼叫端需持有 _lock）。"""
+        finished = [jid for jid, j in self._jobs.items() if j.finished]
+        for jid in finished[: max(0, len(finished) - JOB_HISTORY_SIZE)]:
+            del self._jobs[jid]
@@ -1,11 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.embedding.bigram_index import BigramIndex
+from app.core.embedding.embedder import chunk_id
+from app.core.embedding.embedding_cache import normalize_text
+from app.core.graph.entity_matcher import EntityMatcher
+from app.core.graph.graph_store import GraphStore
 from app.infrastructure.models.model_provider import ModelProvider
 
+# 檢索結果快取筆數上限（LRU）與存活時間（秒）
+RETRIEVAL_CACHE_SIZE = 512
+RETRIEVAL_CACHE_TTL = 300.0
+
+# hybrid 模式：每一路先取 top_k × 此倍數的候選，再以 RRF 融合
+HYBRID_CANDIDATE_FACTOR = 4
+RRF_K = 60
+
+# 圖譜擴充：問題中出現的 entity 經由 entity → chunk postings 補上的段落數上限
+GRAPH_PASSAGES = 3
+
+RETRIEVAL_MODES = ("dense", "keyword", "hybrid")
+
 
 class RetrievalService:
-    def __init__(self, provider: ModelProvider):
+    def __init__(
+        self,
+        provider: ModelProvider,
+        cache_size: int = RETRIEVAL_CACHE_SIZE,
+        cache_ttl: float = RETRIEVAL_CACHE_TTL,
+        keyword_index: BigramIndex | None = None,
+        mode: str = "dense",
+        graph_store: GraphStore | None = None,
+        graph_passages: int = GRAPH_PASSAGES,
+        entity_matcher: EntityMatcher | None = None,
+    ):
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"不支援的檢索模式：{mode}（可用：{RETRIEVAL_MODES}）")
+        if mode != "dense" and keyword_index is None:
+            raise ValueError(f"{mode} 模式需要 keyword_index")
+
         self.provider = provider
-        
-    def retrieve(self, query: str) -> list[str]:
-        embedder = self.provider.get_embedder()
-        docs = embedder.query(query)
-        return [d["text"] for d in docs]
+        self.keyword_index = keyword_index
+        self.mode = mode
+        self.graph_store = graph_store
+        self.graph_passages = graph_passages
+        # 與 EntityLinkingService 共用同一個自動機（未提供時自行建立）
+        self.entity_matcher = entity_matcher
+        if self.entity_matcher is None and graph_store is not None:
+            self.entity_matcher = EntityMatcher(graph_store)
+
+        # (正規化問題, top_k, 索引版本) -> (寫入時間, passages)
+        self._cache: "OrderedDict[tuple, tuple[float, list[str]]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._cache_version: tuple | None = None
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def retrieve(self, query: str, top_k: int = 5) -> list[str]:
+        """
+        檢索與問題最相關的段落，結果依索引版本與 TTL 快取。
+
+        - dense：向量檢索
+        - keyword：bigram BM25，不需要 embedding 模型
+        - hybrid：兩路各取候選後以 reciprocal rank fusion 融合
+
+        有 graph_store 時，另外找出問題中提到的 entity，經由出處 postings
+        補上最多 graph_passages 段與其相關、且尚未被檢索到的 chunk。
+
+        命中快取時不需要 embedding 模型，也不查詢任何索引；
+        新 chunk 寫入（索引版本改變）時整個快取即失效。
+        """
+        version = self._version()
+        key = (normalize_text(query), top_k, version)
+        now = time.monotonic()
+
+        with self._cache_lock:
+            if version != self._cache_version:
+                self._cache.clear()
+                self._cache_version = version
+
+            hit = self._cache.get(key)
+            if hit is not None and now - hit[0] <= self._cache_ttl:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(hit[1])
+            self.misses += 1
+
+        passages = self._search(query, top_k)
+        if self.graph_store is not None and self.graph_passages > 0:
+            passages = passages + self._graph_passages(query, passages)
+
+        with self._cache_lock:
+            if version == self._cache_version:
+                self._cache[key] = (now, passages)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+
+        return list(passages)
+
+    def cache_stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _version(self) -> tuple:
+        dense = self.provider.get_embedder().version if self.mode != "keyword" else None
+        keyword = self.keyword_index.version if self.keyword_index is not None else None
+        graph = self.graph_store.provenance_version if self.graph_store is not None else None
+        return (dense, keyword, graph)
+
+    def _linked_entities(self, query: str) -> list[str]:
+        """
+        找出問題中出現的圖譜節點：以 EntityMatcher 的自動機比對（不分大小寫），
+        成本只與問題長度有關，與圖譜大小無關。
+        """
+        assert self.entity_matcher is not None
+        return self.entity_matcher.entities(query)
+
+    def _graph_passages(self, query: str, passages: list[str]) -> list[str]:
+        """以 entity → chunk postings 取回與問題 entity 相關、尚未檢索到的段落。"""
+        assert self.graph_store is not None
+        entities = self._linked_entities(query)
+        if not entities:
+            return []
+
+        seen = {chunk_id(p) for p in passages}
+        ids = [
+            cid
+            for cid in self.graph_store.chunks_for_entities(
+                entities, limit=self.graph_passages + len(seen)
+            )
+            if cid not in seen
+        ][: self.graph_passages]
+        if not ids:
+            return []
+
+        texts = self.keyword_index.texts(ids) if self.keyword_index is not None else {}
+        missing = [cid for cid in ids if cid not in texts]
+        if missing:
+            texts.update(self.provider.get_embedder().get_texts(missing))
+
+        # 只有圖譜、尚未上傳向量化的 chunk 取不到原文，直接略過
+        return [texts[cid] for cid in ids if cid in texts]
+
+    def _search(self, query: str, top_k: int) -> list[str]:
+        if self.mode == "dense":
+            return [d["text"] for d in self.provider.get_embedder().query(query, top_k=top_k)]
+
+        assert self.keyword_index is not None
+        if self.mode == "keyword":
+            return [h["text"] for h in self.keyword_index.search(query, top_k=top_k)]
+
+        depth = top_k * HYBRID_CANDIDATE_FACTOR
+        dense = self.provider.get_embedder().query(query, top_k=depth)
+        keyword = self.keyword_index.search(query, top_k=depth)
+
+        # Reciprocal rank fusion：以 chunk id 對齊兩路結果
+        scores: dict[str, float] = {}
+        texts: dict[str, str] = {}
+        for ranked in ([d["text"] for d in dense], [h["text"] for h in keyword]):
+            for rank, text in enumerate(ranked):
+                cid = chunk_id(text)
+                texts[cid] = text
+                scores[cid] = scores.get(cid, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+        best = sorted(scores, key=lambda cid: scores[cid], reverse=True)[:top_k]
+        return [texts[cid] for cid in best]
@@ -1,9 +1,16 @@
-from typing import Any
+from typing import Any, Callable, Optional
 
+from app.application.services.answer_cache import AnswerCache
+from app.application.services.entity_linking_service import EntityLinkingService
+from app.application.services.inference_executor import InferenceCancelledError
 from app.application.services.retrieval_service import RetrievalService
 from app.application.services.answer_generation_service import AnswerGenerationService
 from app.application.services.graph_extraction_service import GraphExtractionService
 
+# 回答附帶的三元組來源：
+# "llm"：再呼叫一次 LLM 從回答抽取；"match"：比對問題與回答中的已知 entity，取圖譜既有三元組
+TRIPLES_MODES = ("llm", "match")
+
 
 class AskQuestionUseCase:
     def __init__(
@@ -11,18 +18,60 @@ class AskQuestionUseCase:
         retrieval: RetrievalService,
         answer_generator: AnswerGenerationService,
         graph_extractor: GraphExtractionService,
+        entity_linker: Optional[EntityLinkingService] = None,
+        triples_mode: str = "llm",
+        answer_cache: Optional[AnswerCache] = None,
     ):
+        if triples_mode not in TRIPLES_MODES:
+            raise ValueError(f"不支援的 triples_mode：{triples_mode}（可用：{TRIPLES_MODES}）")
+        if triples_mode == "match" and entity_linker is None:
+            raise ValueError("match 模式需要 entity_linker")
+
         self.retrieval = retrieval
         self.answer_generator = answer_generator
         self.graph_extractor = graph_extractor
+        self.entity_linker = entity_linker
+        self.triples_mode = triples_mode
+        self.answer_cache = answer_cache
+
+    def execute(
+        self,
+        question: str,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> dict[str, Any]:
+        # 每個耗時階段開始前檢查是否已取消（client 斷線）
+        def _check() -> None:
+            if cancelled is not None and cancelled():
+                raise InferenceCancelledError("請求已取消")
 
-    def execute(self, question: str) -> dict[str, Any]:
         passages = self.retrieval.retrieve(question)
-        answer = self.answer_generator.generate(question, passages)
-        triples = self.graph_extractor.extract(answer)
+        _check()
+
+        # 相同問題且檢索段落不變時，直接取用先前的回答（與 llm 模式的三元組）；
+        # match 模式的三元組取自目前的圖譜，不需 LLM，每次重算
+        cache = self.answer_cache
+        key = cache.key(question, passages) if cache is not None else ""
+        cached = cache.get(key) if cache is not None else None
+
+        if cached is not None:
+            answer, triples = cached
+        else:
+            answer = self.answer_generator.generate(question, passages)
+            _check()
+            triples = None
+
+        if self.triples_mode == "match":
+            assert self.entity_linker is not None
+            triples = self.entity_linker.extract(f"{question}\n{answer}")
+        elif triples is None:
+            triples = self.graph_extractor.extract(answer)
+
+        if cache is not None and cached is None:
+            cache.put(key, answer, triples if self.triples_mode == "llm" else None)
 
         return {
             "question": question,
             "answer": answer,
             "triples": triples,
+            "cached": cached is not None,
         }
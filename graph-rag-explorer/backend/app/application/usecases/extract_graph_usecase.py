@@ -1,16 +1,23 @@
-from typing import Any
+from typing import Any, Optional
 
 from app.application.services.graph_ingest_service import GraphIngestService
+from app.core.graph.graph_builder import ProgressCallback
 
 
 class ExtractGraphUseCase:
     def __init__(self, ingest_service: GraphIngestService):
         self.ingest_service = ingest_service
 
-    def execute(self, file_path: str, max_chunks: int) -> dict[str, Any]:
+    def execute(
+        self,
+        file_path: str,
+        max_chunks: int,
+        progress: Optional[ProgressCallback] = None,
+    ) -> dict[str, Any]:
         triples = self.ingest_service.ingest_from_file(
             file_path=file_path,
             max_chunks=max_chunks,
+            progress=progress,
         )
 
         return {
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from app.application.services.document_chunking_service import CHUNK_BATCH_SIZE, DocumentChunkingService
+from app.application.services.embedding_ingest_service import EmbeddingIngestService
+from app.application.services.graph_ingest_service import GraphIngestService
+from app.core.embedding.bigram_index import BigramIndex
+from app.core.embedding.chunker import DocumentChunk
+from app.core.embedding.embedder import chunk_id
+
+
+# ===== 可調參數 =====
+MAX_PENDING_BATCHES = 2   # 每個分支最多排隊的批次數（切得比處理快時不會無限堆積）
+
+
+# 進度回報：(階段 "embed" / "extract", 已完成數, 總數, 本批新產生的三元組)
+IngestProgress = Callable[[str, int, int, List[Any]], None]
+
+
+class IngestUseCase:
+    """
+    IngestUseCase 是「上傳 + 抽圖譜」合併的 UseCase / Orchestrator。
+
+    職責：
+    - 只切分一次文件（串流切分，每批 chunk 切好就交給下游）
+    - 同一批 chunk 同時送進 embedding ingest 與圖譜抽取（兩個執行緒並行）
+    - 兩邊使用相同的內容 hash chunk id，向量、關鍵字索引與三元組出處可互相對應
+    - 組合並回傳各階段的結果與耗時
+    """
+
+    def __init__(
+        self,
+        chunker: DocumentChunkingService,
+        ingestor: EmbeddingIngestService,
+        graph_ingest: GraphIngestService,
+        keyword_index: Optional[BigramIndex] = None,
+        batch_size: int = CHUNK_BATCH_SIZE,
+    ) -> None:
+        self.chunker: DocumentChunkingService = chunker
+        self.ingestor: EmbeddingIngestService = ingestor
+        self.graph_ingest: GraphIngestService = graph_ingest
+        self.keyword_index: Optional[BigramIndex] = keyword_index
+        self.batch_size: int = batch_size
+
+    def execute(
+        self,
+        file_path: Path,
+        max_chunks: Optional[int] = None,
+        progress: Optional[IngestProgress] = None,
+    ) -> Dict[str, object]:
+        """
+        執行合併 ingest 流程（同步、CPU / GPU 密集，應在背景 worker 中執行）。
+
+        流程：
+        1. 串流切分文件（只做一次），每累積 batch_size 個 chunk 為一批
+        2. 每批分別排進兩個執行緒，與後續的切分重疊進行：
+           - 向量化並寫入向量索引，再加入關鍵字倒排索引
+           - 抽取三元組並寫入圖譜（出處記錄相同的 chunk id）
+        3. 回傳結果
+
+        有 max_chunks 時，圖譜抽取需要整份文件的 chunk 才能挑出關係句優先處理，
+        因此等切分完成後才一次抽取；向量化仍逐批進行。
+
+        Args:
+            file_path: 已存放完成的文件路徑。
+            max_chunks: 圖譜抽取最多處理的 chunk 數（None 表示不限制；向量化不受限）。
+            progress: 進度回報 (階段, 已完成數, 總數, 本批三元組)；
+                      總數在檔案讀完前會隨切分增加。
+
+        Returns:
+            檔名、chunk（含 chunk_id）、向量新增 / 略過數、三元組與各階段耗時。
+
+        Raises:
+            Exception: 任一分支失敗時，等另一分支結束後拋出其例外。
+        """
+        started = time.perf_counter()
+        doc_id: str = Path(file_path).name
+
+        chunks: List[Dict[str, Any]] = []
+        graph_texts: List[str] = []   # 送進圖譜抽取的 chunk 文字（跨批去重）
+        seen: Set[str] = set()
+        chunk_seconds = 0.0
+
+        def _embed(texts: List[str], ids: List[str], done: int) -> Dict[str, Any]:
+            t0 = time.perf_counter()
+            counts = self.ingestor.ingest(
+                texts,
+                progress=None if progress is None else (
+                    lambda n, _total: progress("embed", done + n, len(chunks), [])
+                ),
+            )
+            if self.keyword_index is not None:
+                self.keyword_index.add(ids, texts)
+            return {**counts, "seconds": time.perf_counter() - t0}
+
+        def _extract(texts: List[str], done: int) -> Dict[str, Any]:
+            t0 = time.perf_counter()
+            triples = self.graph_ingest.ingest_chunks(
+                doc_id,
+                texts,
+                max_chunks=max_chunks,
+                progress=None if progress is None else (
+                    lambda n, total, batch: progress(
+                        "extract",
+                        done + n,
+                        len(graph_texts) if max_chunks is None else total,
+                        batch,
+                    )
+                ),
+            )
+            return {"triples": triples, "seconds": time.perf_counter() - t0}
+
+        finished: List[Future] = []
+        embeds: Deque[Future] = deque()
+        extracts: Deque[Future] = deque()
+
+        def _submit(pool: ThreadPoolExecutor, pending: Deque[Future], fn: Callable[..., Any], *args: Any) -> None:
+            # 排隊的批次過多時，先等最早的一批完成（失敗則在此拋出）
+            pending.append(pool.submit(fn, *args))
+            while len(pending) > MAX_PENDING_BATCHES:
+                pending[0].result()
+                finished.append(pending.popleft())
+
+        # 向量化與圖譜抽取各一個執行緒（兩者都在釋放 GIL 的模型運算中度過大部分時間），
+        # 主執行緒同時繼續切後面的 chunk
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-embed") as embed_pool, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-extract") as extract_pool:
+            batches = self.chunker.iter_batches(file_path, self.batch_size)
+            while True:
+                # 1️⃣ 切 chunk（只做一次）
+                t0 = time.perf_counter()
+                batch = next(batches, None)
+                chunk_seconds += time.perf_counter() - t0
+                if batch is None:
+                    break
+
+                texts: List[str] = [c["text"] for c in batch]
+                ids: List[str] = [chunk_id(t) for t in texts]
+                done = len(chunks)
+                chunks.extend({**c, "chunk_id": cid} for c, cid in zip(batch, ids))
+
+                # 2️⃣ 逐批向量化與抽取
+                _submit(embed_pool, embeds, _embed, texts, ids, done)
+
+                fresh = [t for t, cid in zip(texts, ids) if cid not in seen]
+                seen.update(ids)
+                extracted_before = len(graph_texts)
+                graph_texts.extend(fresh)
+                if fresh and max_chunks is None:
+                    _submit(extract_pool, extracts, _extract, fresh, extracted_before)
+
+            if max_chunks is not None and graph_texts:
+                _submit(extract_pool, extracts, _extract, graph_texts, 0)
+
+            finished.extend(embeds)
+            finished.extend(extracts)
+            results = [f.result() for f in finished]
+
+        if self.keyword_index is not None:
+            self.keyword_index.save()
+
+        embedded = [r for r in results if "triples" not in r]
+        extracted = [r for r in results if "triples" in r]
+        triples: List[Any] = [t for r in extracted for t in r["triples"]]
+
+        # 3️⃣ 回傳
+        return {
+            "filename": str(file_path),
+            "chunks_stored": len(chunks),
+            "chunks_new": sum(r["new"] for r in embedded),
+            "chunks_skipped": sum(r["skipped"] for r in embedded),
+            "chunks": chunks,
+            "triples": triples,
+            "count": len(triples),
+            "timing": {
+                "chunk_seconds": round(chunk_seconds, 3),
+                "embed_seconds": round(sum(r["seconds"] for r in embedded), 3),
+                "extract_seconds": round(sum(r["seconds"] for r in extracted), 3),
+                "wall_seconds": round(time.perf_counter() - started, 3),
+            },
+        }
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 
-from app.application.services.document_chunking_service import DocumentChunkingService
+from app.application.services.document_chunking_service import CHUNK_BATCH_SIZE, DocumentChunkingService
 from app.application.services.embedding_ingest_service import EmbeddingIngestService
+from app.core.embedding.bigram_index import BigramIndex
 from app.core.embedding.chunker import DocumentChunk
+from app.core.embedding.embedder import chunk_id
 
 
 # ⚠️ 注意
@@ -17,8 +19,9 @@ class UploadUseCase:
     UploadUseCase 是 Upload 流程的 UseCase / Orchestrator。
 
     職責：
-    - 協調文件切分
+    - 協調文件切分（串流切分，每批 chunk 切好就向量化）
     - 協調 embedding ingest
+    - 建立關鍵字（bigram）倒排索引
     - 組合並回傳開發期結果
     """
 
@@ -26,40 +29,76 @@ class UploadUseCase:
         self,
         chunker: DocumentChunkingService,
         ingestor: EmbeddingIngestService,
+        keyword_index: Optional[BigramIndex] = None,
+        batch_size: int = CHUNK_BATCH_SIZE,
     ) -> None:
         self.chunker: DocumentChunkingService = chunker
         self.ingestor: EmbeddingIngestService = ingestor
+        self.keyword_index: Optional[BigramIndex] = keyword_index
+        self.batch_size: int = batch_size
 
-    async def execute(self, file_path: Path) -> Dict[str, object]:
+    def execute(
+        self,
+        file_path: Path,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, object]:
         """
         執行 Upload 的完整流程。
 
+        整個流程皆為同步、CPU 密集的工作，應在背景 worker 中執行，
+        不要直接在 event loop 上呼叫。
+
         流程：
         1.（預留）存檔
-        2. 切分文件為 chunks
-        3. 將 chunk text 送入 embedding ingest
-        4. 回傳開發期使用的結果資訊
+        2. 串流切分文件，每累積 batch_size 個 chunk 為一批
+        3. 將該批 chunk text 送入 embedding ingest
+        4. 將該批 chunk text 加入關鍵字倒排索引
+        5. 全部批次完成後儲存關鍵字索引，回傳開發期使用的結果資訊
 
         Args:
             file_path: 已存放完成的文件路徑。
+            progress: 進度回報 (已向量化 chunk 數, 目前已切出的 chunk 數)；
+                      總數在檔案讀完前會隨切分增加。
 
         Returns:
-            包含檔名、chunk 數量與 chunk 內容的結果 dict。
+            包含檔名、chunk 數量（含新增 / 已存在而略過）與 chunk 內容的結果 dict。
         """
         # 1️⃣ 存檔（目前由外部處理）
 
-        # 2️⃣ 切 chunk
-        chunks: List[DocumentChunk] = self.chunker.split(file_path)
+        chunks: List[DocumentChunk] = []
+        counts: Dict[str, int] = {"new": 0, "skipped": 0}
+
+        # 2️⃣ 串流切 chunk：不必等整份檔案切完才開始向量化
+        for batch in self.chunker.iter_batches(file_path, self.batch_size):
+            done = len(chunks)
+            chunks.extend(batch)
+            texts: List[str] = [c["text"] for c in batch]
+            if progress is not None:
+                progress(done, len(chunks))
+
+            # 3️⃣ 向量化
+            batch_counts = self.ingestor.ingest(
+                texts,
+                progress=None if progress is None else (
+                    lambda n, _total, done=done: progress(done + n, len(chunks))
+                ),
+            )
+            counts["new"] += batch_counts["new"]
+            counts["skipped"] += batch_counts["skipped"]
 
-        texts: List[str] = [c["text"] for c in chunks]
+            # 4️⃣ 關鍵字索引（與向量共用內容 hash 的 chunk id）
+            if self.keyword_index is not None:
+                self.keyword_index.add([chunk_id(t) for t in texts], texts)
 
-        # 3️⃣ 向量化
-        self.ingestor.ingest(texts)
+        if self.keyword_index is not None:
+            self.keyword_index.save()
 
-        # 4️⃣ 回傳（開發期 API）
+        # 5️⃣ 回傳（開發期 API）
         return {
             "filename": str(file_path),
-            "chunks_stored": len(texts),
+            "chunks_stored": len(chunks),
+            "chunks_new": counts["new"],
+            "chunks_skipped": counts["skipped"],
             "message": "文件分割並已加入向量資料庫",
             "chunks": chunks,
         }
@@ -29,3 +29,29 @@ class TextGenerator(Protocol):
             文字生成結果清單（至少包含 generated_text 欄位）。
         """
         ...
+
+
+class BatchTextGenerator(TextGenerator, Protocol):
+    """
+    支援批次生成的 TextGenerator。
+
+    GraphExtractor 會優先使用 generate_batch；
+    只實作 generate 的物件仍可使用（逐筆生成）。
+    """
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        batch_size: int = 8,
+    ) -> List[List[GeneratedText]]:
+        """
+        一次產生多個 prompt 的文字。
+
+        Args:
+            prompts: 輸入提示詞清單。
+            batch_size: 每次 forward 的 prompt 數。
+
+        Returns:
+            與 prompts 等長、順序相同的生成結果。
+        """
+        ...
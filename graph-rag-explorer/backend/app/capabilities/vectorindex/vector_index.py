@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import Dict, List, Protocol, Sequence, Set, TypedDict
+
+
+class VectorHit(TypedDict):
+    """
+    單筆向量查詢結果。
+
+    score 為距離（越小越相近），對正規化向量而言即 2 - 2·cos。
+    """
+    id: str
+    text: str
+    score: float
+
+
+class VectorIndex(Protocol):
+    """
+    VectorIndex 是「向量儲存與近鄰查詢能力」的最小行為介面。
+
+    Embedder 只依賴此介面，底層可以是 ChromaDB、
+    記憶體映射的 NumPy 矩陣、或測試用假物件。
+    """
+
+    @property
+    def max_batch_size(self) -> int:
+        """單次 add / existing_ids 可接受的最大筆數。"""
+        ...
+
+    def existing_ids(self, ids: Sequence[str]) -> Set[str]:
+        """
+        找出已存在於索引中的 id。
+
+        Args:
+            ids: 欲檢查的 id。
+
+        Returns:
+            已存在的 id 集合。
+        """
+        ...
+
+    def add(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+    ) -> None:
+        """
+        寫入一批向量與原文。
+
+        Args:
+            ids: chunk id。
+            documents: chunk 原文。
+            embeddings: 向量。
+        """
+        ...
+
+    def query(self, embedding: Sequence[float], top_k: int) -> List[VectorHit]:
+        """
+        查詢最相近的 top_k 筆。
+
+        Args:
+            embedding: 查詢向量。
+            top_k: 回傳筆數。
+
+        Returns:
+            依距離由小到大排序的結果。
+        """
+        ...
+
+    def get(self, ids: Sequence[str]) -> Dict[str, str]:
+        """
+        依 id 取回原文。
+
+        Args:
+            ids: chunk id。
+
+        Returns:
+            id → 原文；不存在的 id 不會出現在結果中。
+        """
+        ...
+
+    def count(self) -> int:
+        """索引中的向量數。"""
+        ...
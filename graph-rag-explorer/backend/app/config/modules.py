@@ -14,9 +14,35 @@ class ModulesConfig:
 
     # --- LLM ---
     llm_model: str = "Qwen/Qwen2.5-1.5B-Instruct"
+    # 固定 prompt 前綴（抽取指令、answer 系統區塊）的 KV cache 只計算一次並重用
+    llm_prefix_cache: bool = True
 
     # --- Embedder ---
     embedder_model: str = "sentence-transformers/all-MiniLM-L6-v2"
 
+    # --- Vector Index ---
+    # "chroma"：ChromaDB；"numpy"：memory-mapped NumPy 矩陣（單機部署較輕量）
+    vector_index_backend: str = "chroma"
+    # numpy 後端的儲存精度："float32" / "float16" / "int8"
+    vector_index_dtype: str = "float32"
+
+    # --- Retrieval ---
+    # "dense"：只用向量檢索；"keyword"：只用 bigram BM25（不需 embedding 模型）；
+    # "hybrid"：兩者以 reciprocal rank fusion 融合
+    retrieval_mode: str = "hybrid"
+
+    # --- Ask ---
+    # 回答附帶的三元組："llm"：再呼叫一次 LLM 抽取；
+    # "match"：以 Aho-Corasick 比對問答中的已知 entity，直接取圖譜既有三元組（不需 LLM）
+    answer_triples_mode: str = "llm"
+    # 回答快取：相同問題且檢索段落不變時直接回傳先前的回答（0 表示停用）
+    answer_cache_entries: int = 1024
+    # 回答快取是否寫入磁碟（重啟後保留）
+    answer_cache_persist: bool = True
+
     # --- Graph / Triple Extractor ---
     graph_extractor_model: str = "microsoft/Phi-3.5-mini-instruct"
+
+    # --- Graph Store ---
+    # "json"：node-link JSON；"binary"：可 memory-map 的 CSR snapshot
+    graph_snapshot_format: str = "json"
@@ -14,9 +14,24 @@ UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", DATA_DIR / "uploads"))
 # 向量資料庫
 CHROMA_DIR = Path(os.getenv("CHROMA_DIR", DATA_DIR / "chroma" / "database"))
 
+# 向量資料庫（NumPy memmap 後端）
+VECTOR_INDEX_DIR = Path(os.getenv("VECTOR_INDEX_DIR", DATA_DIR / "vector_index"))
+
+# 關鍵字倒排索引（中文 bigram + BM25）
+KEYWORD_INDEX_DIR = Path(os.getenv("KEYWORD_INDEX_DIR", DATA_DIR / "keyword_index"))
+
+# PDF 解析結果快取（檔案內容 hash → 逐頁文字）
+PDF_TEXT_CACHE_DIR = Path(os.getenv("PDF_TEXT_CACHE_DIR", DATA_DIR / "cache" / "pdf_text"))
+
+# /api/ask 回答快取（問題 + 檢索段落 → 回答與三元組）
+ANSWER_CACHE_PATH = Path(os.getenv("ANSWER_CACHE_PATH", DATA_DIR / "cache" / "answer_cache.sqlite3"))
+
 # 三元圖
 GRAPH_STORE_PATH = Path(os.getenv("GRAPH_STORE_PATH", DATA_DIR / "graph" / "graph_store.json"))
 
+# 三元組抽取快取（chunk hash → LLM 抽取結果）
+EXTRACTION_CACHE_PATH = Path(os.getenv("EXTRACTION_CACHE_PATH", DATA_DIR / "graph" / "extraction_cache.sqlite3"))
+
 
 # --- Model cache paths (預載入模型) ---
 MODEL_CACHE_DIR = Path(os.getenv("MODEL_CACHE_DIR", DATA_DIR / "models_cache"))
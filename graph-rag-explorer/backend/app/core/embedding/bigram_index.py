@@ -0,0 +1,446 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import re
+import struct
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, TypedDict
+
+
+# ===== 可調參數 =====
+BM25_K1 = 1.2    # 詞頻飽和度
+BM25_B  = 0.75   # 文件長度正規化強度
+MERGE_SEGMENTS = 8   # 追加的 postings 段數達此數量時，整份合併回 postings.bin
+
+MAGIC = b"BGIDX\x00\x01\x00"
+
+# CJK 統一表意文字（含擴充 A）與相容表意文字；其餘以英數字詞切分
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[0-9a-z]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+
+class KeywordHit(TypedDict):
+    id: str
+    text: str
+    score: float
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    將文字切成索引詞：CJK 連續字串取重疊 bigram（單字則取 unigram），
+    英數字以整個詞為單位（小寫）。
+
+    Args:
+        text: 原始文字。
+
+    Returns:
+        詞清單（保留重複，供計算詞頻）。
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    terms: List[str] = []
+    for run in _TOKEN_RE.findall(text):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                terms.append(run)
+            else:
+                terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return terms
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_postings(data: bytes) -> Iterator[Tuple[int, int]]:
+    """解碼 (doc 差值, tf) varint 序列為 (doc, tf)。"""
+    doc = 0
+    value = shift = 0
+    pending_doc: Optional[int] = None
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if pending_doc is None:
+            doc += value
+            pending_doc = doc
+        else:
+            yield pending_doc, value
+            pending_doc = None
+        value = shift = 0
+
+
+class BigramIndex:
+    """
+    BigramIndex 是 chunk 層級的中文 bigram 倒排索引（BM25 排序）。
+
+    - 不需要 embedding 模型，可作為檢索的低成本第一階段，或與向量檢索融合
+    - postings 以「doc 差值 + tf」的 varint 壓縮，於記憶體與磁碟皆維持壓縮形式，
+      查詢時才解碼
+    - 文件只會追加（chunk id 已存在者略過），doc 編號單調遞增，
+      postings 可直接在尾端追加
+    - 磁碟：
+      - `docs.jsonl`：依 doc 編號追加的 (chunk id, text, 長度)
+      - `postings.bin`：MAGIC + header（doc 數、各詞的 offset / 長度 / df）+ postings
+      - `postings.<seq>.seg`：同格式的追加段，只含上次 save 之後新增的 postings
+        （doc 差值接續前面的資料，載入時直接接在各詞 postings 尾端）
+    - save 只寫一個新的追加段（原子建立）；段數達 merge_segments 時才整份
+      原子改寫 postings.bin 並刪除已合併的段。最後一個有效段（或 postings.bin）
+      的 doc 數為提交點，docs.jsonl 多出的行載入時截掉
+    """
+
+    def __init__(self, index_dir: Path, merge_segments: int = MERGE_SEGMENTS) -> None:
+        """
+        建立 BigramIndex。
+
+        Args:
+            index_dir: 索引目錄。
+            merge_segments: 追加段數達此數量時合併回 postings.bin。
+        """
+        self.dir: Path = Path(index_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.merge_segments: int = max(1, merge_segments)
+
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._lengths: List[int] = []
+        self._row: Dict[str, int] = {}
+        self._total_length: int = 0
+
+        # term -> [壓縮 postings, df, 最後一個 doc]
+        self._postings: Dict[str, List] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._saved_docs: int = 0
+
+        # 上次 save 之後有變動的詞：term -> (已儲存的 postings 長度, 已儲存的 df)
+        self._dirty_terms: Dict[str, Tuple[int, int]] = {}
+        self._segment_seq: int = 0    # 最後一個已寫入（或已合併）的追加段編號
+        self._segments: int = 0       # postings.bin 之後的追加段數
+
+        # 每次新增文件即遞增，供上層快取判斷是否失效
+        self.version: int = 0
+
+        self._load()
+
+    # ----------------------------------------------------------
+    # 寫入
+    # ----------------------------------------------------------
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> int:
+        """
+        加入 chunk（已存在的 id 會略過）。
+
+        Args:
+            ids: chunk id。
+            texts: chunk 文字。
+
+        Returns:
+            實際新增的 chunk 數。
+        """
+        added = 0
+        with self._lock:
+            for cid, text in zip(ids, texts):
+                if cid in self._row:
+                    continue
+
+                doc = len(self._ids)
+                terms = tokenize(text)
+                self._row[cid] = doc
+                self._ids.append(cid)
+                self._texts.append(text)
+                self._lengths.append(len(terms))
+                self._total_length += len(terms)
+
+                for term, tf in Counter(terms).items():
+                    entry = self._postings.get(term)
+                    if entry is None:
+                        entry = self._postings[term] = [bytearray(), 0, 0]
+                    if term not in self._dirty_terms:
+                        self._dirty_terms[term] = (len(entry[0]), entry[1])
+                    _encode_varint(doc - entry[2], entry[0])
+                    _encode_varint(tf, entry[0])
+                    entry[1] += 1
+                    entry[2] = doc
+                added += 1
+
+            if added:
+                self._dirty = True
+                self.version += 1
+
+        return added
+
+    def save(self) -> None:
+        """
+        將新增的文件與 postings 寫回磁碟（無變更時略過）。
+
+        只追加一個包含新 postings 的段；段數達 merge_segments 時整份合併。
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+
+            docs_path = self.dir / "docs.jsonl"
+            with open(docs_path, "ab") as f:
+                for doc in range(self._saved_docs, len(self._ids)):
+                    f.write(
+                        json.dumps(
+                            [self._ids[doc], self._texts[doc], self._lengths[doc]],
+                            ensure_ascii=False,
+                        ).encode("utf-8")
+                        + b"\n"
+                    )
+                f.flush()
+                os.fsync(f.fileno())
+
+            if not (self.dir / "postings.bin").exists() or self._segments + 1 >= self.merge_segments:
+                self._write_base()
+            else:
+                self._write_segment()
+
+            self._saved_docs = len(self._ids)
+            self._dirty_terms.clear()
+            self._dirty = False
+
+    # ----------------------------------------------------------
+    # 查詢
+    # ----------------------------------------------------------
+    def search(self, query: str, top_k: int = 5) -> List[KeywordHit]:
+        """
+        以 BM25 查詢最相關的 chunk。
+
+        Args:
+            query: 查詢文字。
+            top_k: 回傳筆數。
+
+        Returns:
+            依分數由高到低排序的結果（score 越大越相關）。
+        """
+        terms = set(tokenize(query))
+
+        with self._lock:
+            n = len(self._ids)
+            if n == 0 or not terms or top_k <= 0:
+                return []
+
+            avgdl = self._total_length / n
+            scores: Dict[int, float] = {}
+
+            for term in terms:
+                entry = self._postings.get(term)
+                if entry is None:
+                    continue
+                data, df, _ = entry
+                idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+                for doc, tf in _decode_postings(data):
+                    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self._lengths[doc] / avgdl)
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+
+            best = heapq.nlargest(top_k, scores.items(), key=lambda kv: kv[1])
+            return [
+                {"id": self._ids[doc], "text": self._texts[doc], "score": score}
+                for doc, score in best
+            ]
+
+    def texts(self, ids: Sequence[str]) -> Dict[str, str]:
+        """
+        依 chunk id 取回原文。
+
+        Args:
+            ids: chunk id。
+
+        Returns:
+            id → 原文；不存在的 id 不會出現在結果中。
+        """
+        with self._lock:
+            return {i: self._texts[self._row[i]] for i in ids if i in self._row}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def postings_bytes(self) -> int:
+        """壓縮後 postings 的總位元組數。"""
+        return sum(len(e[0]) for e in self._postings.values())
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _write_base(self) -> None:
+        """整份原子改寫 postings.bin，並刪除已合併的追加段。"""
+        terms: Dict[str, List[int]] = {}
+        blobs: List[bytes] = []
+        offset = 0
+        for term, (data, df, last) in self._postings.items():
+            terms[term] = [offset, len(data), df, last]
+            blobs.append(bytes(data))
+            offset += len(data)
+
+        self._write_file(
+            self.dir / "postings.bin",
+            {
+                "docs": len(self._ids),
+                "total_length": self._total_length,
+                "segment": self._segment_seq,
+                "terms": terms,
+            },
+            blobs,
+        )
+
+        for seq, path in self._segment_files():
+            if seq <= self._segment_seq:
+                self._remove(path)
+        self._segments = 0
+        print(f"🔤 BigramIndex：已儲存 {len(self._ids)} 個 chunk、{len(terms)} 個詞")
+
+    def _write_segment(self) -> None:
+        """追加一段只含上次 save 之後新增 postings 的檔案。"""
+        terms: Dict[str, List[int]] = {}
+        blobs: List[bytes] = []
+        offset = 0
+        for term, (saved_len, saved_df) in self._dirty_terms.items():
+            data, df, last = self._postings[term]
+            blob = bytes(data[saved_len:])
+            terms[term] = [offset, len(blob), df - saved_df, last]
+            blobs.append(blob)
+            offset += len(blob)
+
+        seq = self._segment_seq + 1
+        self._write_file(
+            self._segment_path(seq),
+            {
+                "base_docs": self._saved_docs,
+                "docs": len(self._ids),
+                "total_length": self._total_length,
+                "terms": terms,
+            },
+            blobs,
+        )
+        self._segment_seq = seq
+        self._segments += 1
+        print(f"🔤 BigramIndex：追加 {len(self._ids) - self._saved_docs} 個 chunk、{len(terms)} 個詞（段 {seq}）")
+
+    @staticmethod
+    def _write_file(path: Path, header: dict, blobs: List[bytes]) -> None:
+        encoded = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(encoded)))
+            f.write(encoded)
+            for blob in blobs:
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read_file(path: Path) -> Tuple[dict, memoryview]:
+        raw = path.read_bytes()
+        if raw[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"不是 BigramIndex 檔案：{path}")
+
+        (header_len,) = struct.unpack_from("<Q", raw, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(raw[start : start + header_len].decode("utf-8"))
+        return header, memoryview(raw)[start + header_len :]
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.dir / f"postings.{seq}.seg"
+
+    def _segment_files(self) -> List[Tuple[int, Path]]:
+        """依編號排序的追加段檔案。"""
+        found: List[Tuple[int, Path]] = []
+        for path in self.dir.glob("postings.*.seg"):
+            seq = path.name[len("postings.") : -len(".seg")]
+            if seq.isdigit():
+                found.append((int(seq), path))
+        return sorted(found)
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _load(self) -> None:
+        """讀取已提交的 postings（含追加段）與 docs，截掉未提交的 docs 尾段。"""
+        path = self.dir / "postings.bin"
+        docs_path = self.dir / "docs.jsonl"
+        segments = self._segment_files()
+
+        if not path.exists():
+            # 沒有任何提交：殘留的 docs 行都未提交，清空以免之後的 doc 編號錯位
+            for _, seg in segments:
+                self._remove(seg)
+            if docs_path.exists() and docs_path.stat().st_size:
+                with open(docs_path, "r+b") as f:
+                    f.truncate(0)
+                print("🧹 BigramIndex：清除未提交的 docs.jsonl")
+            return
+
+        header, blob = self._read_file(path)
+        count = int(header["docs"])
+        self._total_length = int(header["total_length"])
+        self._segment_seq = int(header.get("segment", 0))
+        for term, (offset, length, df, last) in header["terms"].items():
+            self._postings[term] = [bytearray(blob[offset : offset + length]), df, last]
+
+        for seq, seg in segments:
+            if seq <= self._segment_seq:
+                # 已合併進 postings.bin（合併後刪檔前中斷）
+                self._remove(seg)
+                continue
+
+            seg_header, seg_blob = self._read_file(seg)
+            if seq != self._segment_seq + 1 or int(seg_header["base_docs"]) != count:
+                print(f"⚠️ BigramIndex：追加段 {seg.name} 與前面的資料不連續，略過其後的段")
+                for later_seq, later in segments:
+                    if later_seq >= seq:
+                        self._remove(later)
+                break
+
+            for term, (offset, length, df, last) in seg_header["terms"].items():
+                entry = self._postings.get(term)
+                if entry is None:
+                    entry = self._postings[term] = [bytearray(), 0, 0]
+                entry[0] += seg_blob[offset : offset + length]
+                entry[1] += df
+                entry[2] = last
+            count = int(seg_header["docs"])
+            self._total_length = int(seg_header["total_length"])
+            self._segment_seq = seq
+            self._segments += 1
+
+        valid_end = 0
+        with open(docs_path, "rb") as f:
+            for line in f:
+                if len(self._ids) >= count or not line.endswith(b"\n"):
+                    break
+                cid, text, length = json.loads(line)
+                self._row[cid] = len(self._ids)
+                self._ids.append(cid)
+                self._texts.append(text)
+                self._lengths.append(int(length))
+                valid_end += len(line)
+
+        if len(self._ids) < count:
+            raise ValueError(f"docs.jsonl 只有 {len(self._ids)} 行，少於 header 記錄的 {count} 行")
+        if valid_end < docs_path.stat().st_size:
+            with open(docs_path, "r+b") as f:
+                f.truncate(valid_end)
+
+        self._saved_docs = count
+        print(f"🔤 BigramIndex：載入 {count} 個 chunk、{len(self._postings)} 個詞（{self._segments} 個追加段）")
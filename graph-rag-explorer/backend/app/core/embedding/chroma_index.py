@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Sequence, Set
+
+import chromadb
+
+from app.capabilities.vectorindex.vector_index import VectorHit
+
+
+class ChromaVectorIndex:
+    """
+    以 ChromaDB PersistentClient 實作的 VectorIndex。
+
+    沿用原本的 `docs` collection（預設 L2 距離），既有資料可直接使用。
+    """
+
+    def __init__(self, persist_dir: Path, collection: str = "docs") -> None:
+        """
+        建立 ChromaVectorIndex。
+
+        Args:
+            persist_dir: Chroma 資料庫目錄。
+            collection: collection 名稱。
+        """
+        Path(persist_dir).mkdir(parents=True, exist_ok=True)
+        self.client = chromadb.PersistentClient(path=str(persist_dir))
+        self.collection = self.client.get_or_create_collection(collection)
+
+    @property
+    def max_batch_size(self) -> int:
+        return int(self.client.get_max_batch_size())
+
+    def existing_ids(self, ids: Sequence[str]) -> Set[str]:
+        return set(self.collection.get(ids=list(ids), include=[])["ids"])
+
+    def add(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+    ) -> None:
+        self.collection.add(
+            ids=list(ids),
+            documents=list(documents),
+            embeddings=[list(e) for e in embeddings],  # type: ignore[arg-type]
+        )
+
+    def query(self, embedding: Sequence[float], top_k: int) -> List[VectorHit]:
+        results = self.collection.query(
+            query_embeddings=[list(embedding)],  # type: ignore[arg-type]
+            n_results=top_k,
+        )
+
+        ids = results.get("ids", [[]])[0]  # type: ignore
+        docs = results.get("documents", [[]])[0]  # type: ignore
+        scores = results.get("distances", [[]])[0]  # type: ignore
+
+        return [
+            {"id": i, "text": text, "score": float(score)}
+            for i, text, score in zip(ids, docs, scores)
+        ]
+
+    def get(self, ids: Sequence[str]) -> Dict[str, str]:
+        if not len(ids):
+            return {}
+        results = self.collection.get(ids=list(ids), include=["documents"])  # type: ignore[list-item]
+        return dict(zip(results["ids"], results["documents"] or []))  # type: ignore[arg-type]
+
+    def count(self) -> int:
+        return int(self.collection.count())
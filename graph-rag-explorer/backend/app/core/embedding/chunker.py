@@ -1,8 +1,12 @@
 # backend/app/core/chunker.py
 from llama_index.core import SimpleDirectoryReader
-from typing import List, Dict, TypedDict
+from collections import deque
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, List, Dict, TypedDict
 import re
 
+from app.core.embedding.pdf_text import default_pdf_cache
+
 # ===== 可調參數 =====
 # 以「字元數」近似控制 chunk 大小（避免跨句硬切）
 MAX_CHARS_PER_CHUNK = 400        # 每個 chunk 目標上限（字元）
@@ -12,6 +16,14 @@ MIN_SENT_LEN        = 2          # 太短的句子會與相鄰句合併
 END_TOKENS_PATTERN = r"(?:。|．|\.|！|!|？|\?|；|;|：|:|,)"
 JOINER_TOKENS      = r"(?:另外|此外|而且|並且|且)"
 
+# 串流切分（iter_document_chunks）
+STREAM_BLOCK_CHARS  = 1 << 20    # 每次從檔案讀取的字元數
+STREAM_MAX_PENDING  = 1 << 18    # 未遇到句尾符號時，暫存文字超過此長度即強制成句（避免無標點的巨檔吃光記憶體）
+STREAM_TEXT_SUFFIXES = {".txt", ".log", ".md", ".tsv", ".jsonl"}   # 可直接逐段讀取的純文字檔
+
+# 與 _split_sentences 相同的句尾符號
+_SENT_END_RE = re.compile(r"[。．\.！？!?；;：:]")
+
 SPLIT_RE = re.compile(
     rf"{END_TOKENS_PATTERN}\s*|(?:[，,]?\s*{JOINER_TOKENS}\s*)",
     flags=re.UNICODE
@@ -91,6 +103,95 @@ def _pack_chunks(sentences: List[str]) -> List[str]:
     return chunks
 
 
+def _iter_sentences(pieces: Iterable[str]) -> Iterator[str]:
+    """
+    _split_sentences 的串流版：逐段接收文字，跨段落邊界切句。
+
+    每次只把「最後一個句尾符號之前」的文字交給 _split_sentences，
+    其餘保留到下一段，因此結果與對整份文字呼叫 _split_sentences 相同
+    （唯一例外：超過 STREAM_MAX_PENDING 仍無句尾符號時強制成句）。
+    """
+    pending = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        pending += piece
+
+        # 暫存的尾段不含句尾符號，只需在新片段中找最後一個
+        last = None
+        for last in _SENT_END_RE.finditer(pending, len(pending) - len(piece)):
+            pass
+        if last is not None:
+            yield from _split_sentences(pending[: last.end()])
+            pending = pending[last.end():]
+        elif len(pending) > STREAM_MAX_PENDING:
+            yield from _split_sentences(pending)
+            pending = ""
+
+    if pending:
+        yield from _split_sentences(pending)
+
+
+def _iter_pack_chunks(sentences: Iterable[str]) -> Iterator[str]:
+    """
+    _pack_chunks 的串流版：只保留目前 chunk 的句子與前 SENTENCE_OVERLAP 句，
+    依相同規則（字元上限只計新句子、重疊句接在開頭）逐一產生 chunk。
+    """
+    overlap: Deque[str] = deque(maxlen=max(0, SENTENCE_OVERLAP))
+    buf: List[str] = []
+    length = 0
+
+    for s in sentences:
+        add_len = len(s) + (1 if buf else 0)
+        if buf and (length + add_len) > MAX_CHARS_PER_CHUNK:
+            chunk_text = " ".join([*overlap, *buf]).strip()
+            if chunk_text:
+                yield chunk_text
+            overlap.extend(buf)
+            buf, length = [], 0
+            add_len = len(s)
+        buf.append(s)
+        length += add_len
+
+    if buf:
+        chunk_text = " ".join([*overlap, *buf]).strip()
+        if chunk_text:
+            yield chunk_text
+
+
+def _iter_documents(file_path: str, block_chars: int) -> Iterator[Iterator[str]]:
+    """
+    逐份文件產生「文字片段的 iterator」。
+
+    - 純文字檔直接以 block_chars 為單位逐段讀取（整份檔案視為一份文件）
+    - PDF 以 process pool 平行解析、依頁序逐頁產生（每頁一份文件，與
+      SimpleDirectoryReader 的 PDFReader 相同），解析結果依檔案內容 hash 快取
+    - 其他格式交給 SimpleDirectoryReader，每份 Document 各自為一份文件
+    """
+    if Path(file_path).suffix.lower() in STREAM_TEXT_SUFFIXES:
+        def _blocks() -> Iterator[str]:
+            # 與 SimpleDirectoryReader 讀純文字檔的方式一致（utf-8、忽略無法解碼的位元組）
+            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+                while True:
+                    block = f.read(block_chars)
+                    if not block:
+                        return
+                    yield block
+
+        yield _blocks()
+        return
+
+    if Path(file_path).suffix.lower() == ".pdf":
+        for page in default_pdf_cache().iter_pages(Path(file_path)):
+            yield iter([page])
+        return
+
+    reader = SimpleDirectoryReader(input_files=[file_path])
+    for doc in reader.load_data():
+        text = doc.get_text() if hasattr(doc, "get_text") else getattr(doc, "text", "")
+        yield iter([text or ""])
+
+
 class DocumentChunk(TypedDict):
     id: int
     text: str
@@ -100,10 +201,14 @@ class DocumentChunk(TypedDict):
 def split_document(file_path: str) -> List[DocumentChunk]:
     """
     以「句界」切割文件為 chunks，避免多句黏在一起。
-    - 支援 PDF / TXT（由 LlamaIndex 讀取）
+    - 支援 PDF / TXT（PDF 走平行解析 + 解析結果快取，其餘由 LlamaIndex 讀取）
     - 僅在句界合併，不做跨句硬切
     - 可調整 MAX_CHARS_PER_CHUNK / SENTENCE_OVERLAP
     """
+    # PDF：同一份上傳檔被 upload 與 extract_graph 各切一次時，第二次直接讀快取
+    if Path(file_path).suffix.lower() == ".pdf":
+        return list(iter_document_chunks(file_path))
+
     reader = SimpleDirectoryReader(input_files=[file_path])
     documents = reader.load_data()
 
@@ -128,3 +233,29 @@ def split_document(file_path: str) -> List[DocumentChunk]:
             all_chunks.append({"id": 0, "text": content, "length": len(content)})
 
     return all_chunks
+
+
+def iter_document_chunks(
+    file_path: str,
+    block_chars: int = STREAM_BLOCK_CHARS,
+) -> Iterator[DocumentChunk]:
+    """
+    split_document 的串流版：逐段讀檔、跨段切句、逐一產生 chunk。
+
+    - 記憶體用量與 block_chars 及單一 chunk 大小有關，與檔案大小無關
+    - 切句與 SENTENCE_OVERLAP 重疊規則與 split_document 相同，
+      對同一份文字產生相同的 chunk 序列
+    - 下游可邊讀邊處理（例如分批向量化），不必等整份文件切完
+
+    Args:
+        file_path: 文件路徑。
+        block_chars: 每次讀取的字元數。
+
+    Yields:
+        DocumentChunk（id 自 0 起連續編號，跨文件延續）。
+    """
+    idx = 0
+    for pieces in _iter_documents(file_path, max(1, block_chars)):
+        for ch in _iter_pack_chunks(_iter_sentences(pieces)):
+            yield {"id": idx, "text": ch, "length": len(ch)}
+            idx += 1
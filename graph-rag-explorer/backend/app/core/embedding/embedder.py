@@ -1,15 +1,28 @@
 # app/core/embedding/embedder.py
 from __future__ import annotations
 
+import hashlib
 import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Optional, List, TypedDict
+from typing import Any, Callable, Dict, Optional, List, TypedDict
 
+import numpy as np
 import torch
 from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.api.types import Documents, Embeddings
-from app.config.paths import EMBEDDER_CACHE_DIR, CHROMA_DIR
+from app.capabilities.vectorindex.vector_index import VectorIndex
+from app.config.paths import EMBEDDER_CACHE_DIR, CHROMA_DIR, VECTOR_INDEX_DIR
+from app.core.embedding.chroma_index import ChromaVectorIndex
+from app.core.embedding.embedding_cache import EMBEDDING_CACHE_CAPACITY, EmbeddingCache
+from app.core.embedding.numpy_index import NumpyVectorIndex
+
+
+# ===== 可調參數 =====
+INGEST_BATCH_SIZE = 64   # 串流 ingest 每批編碼 / 寫入的 chunk 數
+
+VECTOR_INDEX_BACKENDS = ("chroma", "numpy")
 
 
 class ChunkResult(TypedDict):
@@ -17,11 +30,43 @@ class ChunkResult(TypedDict):
     score: float
 
 
+class AddChunksResult(TypedDict):
+    new: int
+    skipped: int
+
+
+class IngestStats(TypedDict):
+    chunks: int
+    batches: int
+    encode_seconds: float
+    write_seconds: float
+    wall_seconds: float
+    encode_chunks_per_sec: float
+    write_chunks_per_sec: float
+    chunks_per_sec: float
+
+
+def chunk_id(text: str) -> str:
+    """
+    以內容 hash 產生 chunk id：相同文字永遠得到相同 id，跨次上傳不會衝突。
+
+    Args:
+        text: chunk 文字。
+
+    Returns:
+        chunk id（`chunk_<md5>`）。
+    """
+    return "chunk_" + hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
 class Embedder:
     """
     Embedder
     ----------
-    封裝 SentenceTransformer 模型 + ChromaDB 資料庫。
+    封裝 SentenceTransformer 模型 + 向量索引（VectorIndex）。
+    向量索引後端可選：
+      - "chroma"：ChromaDB PersistentClient
+      - "numpy"：memory-mapped NumPy 矩陣（float32 / float16 / int8）
     用於：
       1. 新增文本段落（向量化並入庫）
       2. 根據 query 查詢最相似段落
@@ -32,20 +77,38 @@ class Embedder:
         model_id: str,
         device: Optional[str] = None,
         persist_dir: Optional[str] = None,
+        cache_dir: Optional[Path] = None,
+        vector_cache_capacity: int = EMBEDDING_CACHE_CAPACITY,
+        index_backend: str = "chroma",
+        index_dtype: str = "float32",
+        index: Optional[VectorIndex] = None,
     ) -> None:
         self.model_id: str = model_id
         self.device: str = device or ("cuda" if torch.cuda.is_available() else "cpu")
         
         # --- cache 路徑 ---
-        self.cache_dir = EMBEDDER_CACHE_DIR
+        self.cache_dir = Path(cache_dir) if cache_dir else EMBEDDER_CACHE_DIR
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
-        # --- 向量資料庫 ---
-        persist_dir = persist_dir or str(CHROMA_DIR)
-        Path(persist_dir).mkdir(parents=True, exist_ok=True)
+        # --- 向量快取（capacity 為 0 表示停用）---
+        self.vector_cache: Optional[EmbeddingCache] = (
+            EmbeddingCache(self.cache_dir / "vectors", model_id, vector_cache_capacity)
+            if vector_cache_capacity > 0
+            else None
+        )
+
+        # --- 向量索引 ---
+        self.index: VectorIndex = index or self._create_index(
+            index_backend, index_dtype, persist_dir
+        )
+
+        # collection 版本：每次寫入新向量就遞增，供上層快取判斷是否失效
+        self.version: int = 0
+        self.last_ingest_stats: Optional[IngestStats] = None
 
-        self.client = chromadb.PersistentClient(path=persist_dir)
-        self.collection = self.client.get_or_create_collection("docs")
+        # 「檢查已存在的 id → 編碼 → 寫入」整段序列化：
+        # 同時上傳相同文字時只會編碼、寫入一次
+        self._add_lock = threading.Lock()
 
         # --- 模型本體 ---
         self.model: Optional[SentenceTransformer] = None
@@ -73,6 +136,8 @@ class Embedder:
         if self.model:
             del self.model
         self.model = None
+        if self.vector_cache is not None:
+            self.vector_cache.flush()
         torch.cuda.empty_cache()
         print("✅ Embedder 已釋放。")
 
@@ -80,42 +145,167 @@ class Embedder:
     # 文字向量化
     # -------------------------------------------------------------------------
     def embed(self, texts: list[str]) -> list[list[float]]:
-        """將多段文字轉為向量"""
+        """
+        將多段文字轉為向量。
+
+        先查向量快取，只把未命中的文字送進模型；全部命中時不會載入模型。
+        """
+        if self.vector_cache is None:
+            return self._encode(texts).tolist()
+
+        cached = self.vector_cache.get_many(texts)
+        missing = [i for i, v in enumerate(cached) if v is None]
+
+        if missing:
+            fresh = self._encode([texts[i] for i in missing])
+            self.vector_cache.put_many([texts[i] for i in missing], fresh)
+            for i, vec in zip(missing, fresh):
+                cached[i] = vec
+
+        return [v.tolist() for v in cached]  # type: ignore[union-attr]
+
+    def cache_stats(self) -> Dict[str, float]:
+        """向量快取統計（hit rate、已用位元組等）；停用時為空 dict。"""
+        return self.vector_cache.stats() if self.vector_cache is not None else {}
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        """以模型編碼文字（必要時先載入模型）"""
         if not self.model:
             self.load()
 
         if self.model == None:
-            raise
+            raise RuntimeError("Embedder 模型尚未載入")
 
-        embeddings = self.model.encode(
+        return self.model.encode(
             texts,
             convert_to_numpy=True,
             show_progress_bar=False
         )
-        return embeddings.tolist()
 
     # -------------------------------------------------------------------------
     # 新增資料到向量資料庫
     # -------------------------------------------------------------------------
-    def add_chunks(self, texts: list[str]) -> None:
-        """將多段文本向量化後存入 Chroma 資料庫"""
+    def add_chunks(
+        self,
+        texts: list[str],
+        batch_size: int = INGEST_BATCH_SIZE,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> AddChunksResult:
+        """
+        將多段文本向量化後存入向量索引（Chroma 或 NumPy 後端）。
+
+        chunk id 由內容 hash 決定；索引中已存在（或本批重複）的文字
+        不會再送進模型編碼。多個執行緒同時呼叫時依序執行。新文字以串流方式分批處理：
+        - 依長度排序後切批（長度相近的文字同批，padding 浪費少）
+        - 編碼第 N+1 批的同時，背景執行緒寫入第 N 批
+        - 同時最多只有一批等待寫入，記憶體用量與文件大小無關
+
+        Args:
+            texts: 文本清單。
+            batch_size: 每批編碼 / 寫入的 chunk 數（上限為向量索引的 max_batch_size）。
+            progress: 每批寫入後的進度回報 (已處理 chunk 數, chunk 總數)。
+
+        Returns:
+            新增與略過的 chunk 數。
+        """
         if not texts:
             print("⚠️ add_chunks: 空文本列表，略過。")
-            return
+            return {"new": 0, "skipped": 0}
 
-        if not self.model:
-            self.load()
+        # 本批去重：id -> text
+        uniq: Dict[str, str] = {}
+        for t in texts:
+            uniq.setdefault(chunk_id(t), t)
 
-        print(f"🪣 新增 {len(texts)} 筆 chunk 至向量資料庫 ...")
-        embeddings = self.embed(texts)
-        ids = [f"chunk_{i}" for i in range(len(texts))]
+        batch_size = max(1, min(batch_size, self.index.max_batch_size))
 
-        self.collection.add(
-            documents=texts,
-            embeddings=embeddings,  # type: ignore[arg-type]
-            ids=ids
+        with self._add_lock:
+            all_ids = list(uniq)
+            existing: set[str] = set()
+            for i in range(0, len(all_ids), batch_size):
+                existing.update(self.index.existing_ids(all_ids[i : i + batch_size]))
+            new_ids = [i for i in all_ids if i not in existing]
+            skipped = len(texts) - len(new_ids)
+
+            if not new_ids:
+                print(f"🔁 add_chunks: {len(texts)} 筆 chunk 皆已存在，略過編碼。")
+                if progress is not None:
+                    progress(len(texts), len(texts))
+                return {"new": 0, "skipped": skipped}
+
+            # 長度分桶：依長度排序後切批
+            new_ids.sort(key=lambda i: len(uniq[i]))
+            print(f"🪣 新增 {len(new_ids)} 筆 chunk 至向量資料庫（略過 {skipped} 筆）...")
+
+            stats = self._ingest_stream(new_ids, uniq, batch_size, skipped, len(texts), progress)
+            self.last_ingest_stats = stats
+        print(
+            f"✅ 向量資料庫新增完成：{stats['batches']} 批，"
+            f"encode {stats['encode_chunks_per_sec']:.1f} chunks/s，"
+            f"write {stats['write_chunks_per_sec']:.1f} chunks/s，"
+            f"整體 {stats['chunks_per_sec']:.1f} chunks/s"
         )
-        print("✅ 向量資料庫新增完成。")
+        return {"new": len(new_ids), "skipped": skipped}
+
+    def _ingest_stream(
+        self,
+        ids: List[str],
+        texts_by_id: Dict[str, str],
+        batch_size: int,
+        done_offset: int,
+        total: int,
+        progress: Optional[Callable[[int, int], None]],
+    ) -> IngestStats:
+        """編碼與寫入重疊的分批 ingest，回傳各階段耗時與吞吐量。"""
+        encode_seconds = 0.0
+        write_seconds = [0.0]
+        batches = 0
+        started = time.perf_counter()
+
+        def _write(batch_ids: List[str], docs: List[str], embeddings: list[list[float]]) -> None:
+            t0 = time.perf_counter()
+            self.index.add(batch_ids, docs, embeddings)
+            write_seconds[0] += time.perf_counter() - t0
+            self.version += 1
+
+        pending: Optional[Future] = None
+        written = 0
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-writer") as writer:
+            for i in range(0, len(ids), batch_size):
+                batch_ids = ids[i : i + batch_size]
+                docs = [texts_by_id[j] for j in batch_ids]
+
+                t0 = time.perf_counter()
+                embeddings = self.embed(docs)
+                encode_seconds += time.perf_counter() - t0
+
+                # 等上一批寫完再送出這一批：編碼與寫入重疊，且只保留一批待寫
+                if pending is not None:
+                    pending.result()
+                    if progress is not None:
+                        progress(done_offset + written, total)
+
+                pending = writer.submit(_write, batch_ids, docs, embeddings)
+                written += len(batch_ids)
+                batches += 1
+
+            if pending is not None:
+                pending.result()
+                if progress is not None:
+                    progress(done_offset + written, total)
+
+        wall = time.perf_counter() - started
+        n = len(ids)
+        return {
+            "chunks": n,
+            "batches": batches,
+            "encode_seconds": round(encode_seconds, 4),
+            "write_seconds": round(write_seconds[0], 4),
+            "wall_seconds": round(wall, 4),
+            "encode_chunks_per_sec": round(n / max(encode_seconds, 1e-9), 2),
+            "write_chunks_per_sec": round(n / max(write_seconds[0], 1e-9), 2),
+            "chunks_per_sec": round(n / max(wall, 1e-9), 2),
+        }
 
     # -------------------------------------------------------------------------
     # 查詢相似文段
@@ -125,19 +315,38 @@ class Embedder:
         根據問題文字，查詢最相關的文段。
         回傳 [(text, score), ...]
         """
-        if not self.model:
-            self.load()
-
         query_vec = self.embed([question])[0]
-        results = self.collection.query(
-            query_embeddings=[query_vec],  # type: ignore[arg-type]
-            n_results=top_k,
-        )
-
-        docs = results.get("documents", [[]])[0] # type: ignore
-        scores = results.get("distances", [[]])[0] # type: ignore
+        hits = self.index.query(query_vec, top_k)
 
         return [
-            {"text": text, "score": float(score)}
-            for text, score in zip(docs, scores)
+            {"text": h["text"], "score": h["score"]}
+            for h in hits
         ]
+
+    def get_texts(self, ids: List[str]) -> Dict[str, str]:
+        """
+        依 chunk id 取回原文（不需要載入模型）。
+
+        Args:
+            ids: chunk id。
+
+        Returns:
+            id → 原文；不存在的 id 不會出現在結果中。
+        """
+        return self.index.get(ids)
+
+    # -------------------------------------------------------------------------
+    # 輔助
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def _create_index(
+        backend: str,
+        dtype: str,
+        persist_dir: Optional[str],
+    ) -> VectorIndex:
+        """依設定建立向量索引後端"""
+        if backend == "chroma":
+            return ChromaVectorIndex(Path(persist_dir) if persist_dir else CHROMA_DIR)
+        if backend == "numpy":
+            return NumpyVectorIndex(Path(persist_dir) if persist_dir else VECTOR_INDEX_DIR / dtype, dtype=dtype)
+        raise ValueError(f"不支援的向量索引後端：{backend}（可用：{VECTOR_INDEX_BACKENDS}）")
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# ===== 可調參數 =====
+EMBEDDING_CACHE_CAPACITY = 200_000   # 快取可容納的向量數（檔案為稀疏配置，未用到的槽位不佔磁碟）
+
+_KEY_BYTES = 16   # md5 digest
+
+
+def normalize_text(text: str) -> str:
+    """
+    快取 key 使用的文字正規化：NFKC、去頭尾空白、連續空白合併為一格。
+
+    Args:
+        text: 原始文字。
+
+    Returns:
+        正規化後的文字。
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class EmbeddingCache:
+    """
+    EmbeddingCache 是 Embedder 的磁碟向量快取。
+
+    - key 為 (model id, 正規化文字的 md5)；每個 model 使用獨立的子目錄
+    - 向量以 float16 存在固定槽位數的 memory-mapped 檔案（vectors.f16）
+    - 每個槽位的 key 與最近使用戳記同樣是 memmap（keys.bin / stamps.u64），
+      啟動時依戳記重建記憶體中的 LRU 索引，滿了就覆寫最久未用的槽位
+    - 統計 hit / miss 與已使用的位元組數
+
+    向量維度在第一次寫入時決定；之後若模型維度改變，整份快取會重建。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        model_id: str,
+        capacity: int = EMBEDDING_CACHE_CAPACITY,
+    ) -> None:
+        """
+        建立 EmbeddingCache。
+
+        Args:
+            cache_dir: 快取根目錄。
+            model_id: 模型名稱（不同模型的向量互不共用）。
+            capacity: 可容納的向量數。
+        """
+        slug = hashlib.md5(model_id.encode("utf-8")).hexdigest()[:12]
+        self.dir: Path = Path(cache_dir) / slug
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+        self.model_id: str = model_id
+        self.capacity: int = max(1, capacity)
+        self.dim: Optional[int] = None
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[bytes, int]" = OrderedDict()   # key → 槽位，LRU 順序
+        self._free: List[int] = []
+        self._clock: int = 0
+
+        self._vectors: Optional[np.memmap] = None
+        self._keys: Optional[np.memmap] = None
+        self._stamps: Optional[np.memmap] = None
+
+        self._load()
+
+    # ----------------------------------------------------------
+    # 讀寫
+    # ----------------------------------------------------------
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        查詢多段文字的快取向量，命中者更新為最近使用。
+
+        Args:
+            texts: 文字清單。
+
+        Returns:
+            與 texts 對齊的向量（float32）；未命中為 None。
+        """
+        keys = [self._key(t) for t in texts]
+        out: List[Optional[np.ndarray]] = [None] * len(keys)
+
+        with self._lock:
+            if self._vectors is None:
+                self.misses += len(keys)
+                return out
+
+            for i, key in enumerate(keys):
+                slot = self._index.get(key)
+                if slot is None:
+                    continue
+                self._index.move_to_end(key)
+                self._touch(slot)
+                out[i] = np.asarray(self._vectors[slot], dtype=np.float32)
+
+            found = sum(v is not None for v in out)
+            self.hits += found
+            self.misses += len(keys) - found
+
+        return out
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        寫入多段文字的向量，槽位不足時覆寫最久未用者。
+
+        Args:
+            texts: 文字清單。
+            vectors: (len(texts), dim) 向量。
+        """
+        if not len(texts):
+            return
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        with self._lock:
+            if self._vectors is None or self.dim != vectors.shape[1]:
+                self._create(int(vectors.shape[1]))
+            assert self._vectors is not None and self._keys is not None
+
+            for text, vec in zip(texts, vectors):
+                key = self._key(text)
+                slot = self._index.get(key)
+                if slot is None:
+                    slot = self._allocate()
+                    self._index[key] = slot
+                else:
+                    self._index.move_to_end(key)
+
+                # 先寫向量再寫 key，key 出現時向量必定已寫入
+                self._vectors[slot] = vec.astype(np.float16)
+                self._keys[slot] = key
+                self._touch(slot)
+
+    def flush(self) -> None:
+        """將 memmap 的變更寫回磁碟。"""
+        with self._lock:
+            for arr in (self._vectors, self._keys, self._stamps):
+                if arr is not None:
+                    arr.flush()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def bytes_used(self) -> int:
+        """已使用槽位所佔的位元組數（向量 + key + 戳記）。"""
+        per_slot = (self.dim or 0) * 2 + _KEY_BYTES + 8
+        return len(self._index) * per_slot
+
+    def stats(self) -> Dict[str, float]:
+        """
+        取得快取統計。
+
+        Returns:
+            entries / capacity / hits / misses / hit_rate / bytes_used。
+        """
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "bytes_used": self.bytes_used,
+        }
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.md5(normalize_text(text).encode("utf-8")).digest()
+
+    def _touch(self, slot: int) -> None:
+        assert self._stamps is not None
+        self._clock += 1
+        self._stamps[slot] = self._clock
+
+    def _allocate(self) -> int:
+        """取得空槽位；沒有空槽位時淘汰最久未用的 key。"""
+        if self._free:
+            return self._free.pop()
+        _, slot = self._index.popitem(last=False)
+        return slot
+
+    def _paths(self) -> Dict[str, Path]:
+        return {
+            "meta": self.dir / "meta.json",
+            "vectors": self.dir / "vectors.f16",
+            "keys": self.dir / "keys.bin",
+            "stamps": self.dir / "stamps.u64",
+        }
+
+    def _create(self, dim: int) -> None:
+        """建立（或重建）指定維度的空快取。"""
+        paths = self._paths()
+        for name in ("vectors", "keys", "stamps"):
+            paths[name].unlink(missing_ok=True)
+
+        self.dim = dim
+        self._vectors = np.memmap(paths["vectors"], dtype=np.float16, mode="w+", shape=(self.capacity, dim))
+        self._keys = np.memmap(paths["keys"], dtype=f"S{_KEY_BYTES}", mode="w+", shape=(self.capacity,))
+        self._stamps = np.memmap(paths["stamps"], dtype=np.uint64, mode="w+", shape=(self.capacity,))
+
+        self._index.clear()
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self._clock = 0
+
+        tmp = paths["meta"].with_name("meta.json.tmp")
+        tmp.write_text(
+            json.dumps({"model_id": self.model_id, "dim": dim, "capacity": self.capacity}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, paths["meta"])
+        print(f"🗄️ EmbeddingCache：建立快取（dim={dim}, capacity={self.capacity}）")
+
+    def _load(self) -> None:
+        """開啟既有快取，並依戳記重建 LRU 索引。"""
+        paths = self._paths()
+        if not paths["meta"].exists():
+            return
+
+        try:
+            meta = json.loads(paths["meta"].read_text(encoding="utf-8"))
+            dim, capacity = int(meta["dim"]), int(meta["capacity"])
+            vectors = np.memmap(paths["vectors"], dtype=np.float16, mode="r+", shape=(capacity, dim))
+            keys = np.memmap(paths["keys"], dtype=f"S{_KEY_BYTES}", mode="r+", shape=(capacity,))
+            stamps = np.memmap(paths["stamps"], dtype=np.uint64, mode="r+", shape=(capacity,))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ EmbeddingCache：快取損毀，將重建（{e}）")
+            return
+
+        if capacity != self.capacity:
+            print("⚠️ EmbeddingCache：容量設定改變，將重建快取")
+            return
+
+        self.dim = dim
+        self._vectors, self._keys, self._stamps = vectors, keys, stamps
+
+        used = np.flatnonzero(stamps > 0)
+        for slot in used[np.argsort(stamps[used], kind="stable")]:
+            key = bytes(keys[slot]).ljust(_KEY_BYTES, b"\x00")
+            self._index[key] = int(slot)
+
+        used_set = set(self._index.values())
+        self._free = [s for s in range(capacity - 1, -1, -1) if s not in used_set]
+        self._clock = int(stamps.max()) if len(used) else 0
+        print(f"🗄️ EmbeddingCache：載入 {len(self._index)} 筆向量快取")
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from app.capabilities.vectorindex.vector_index import VectorHit
+
+
+# ===== 可調參數 =====
+INITIAL_CAPACITY  = 1024      # 矩陣初始列數，不足時倍增
+QUERY_BLOCK_ROWS  = 8_192     # 查詢時每次轉成 float32 計算的列數（限制暫存記憶體、利於快取）
+MAX_BATCH_SIZE    = 5_000     # 單次 add 的建議上限
+
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+
+class NumpyVectorIndex:
+    """
+    以 memory-mapped NumPy 矩陣實作的 VectorIndex（單機用，免 ChromaDB）。
+
+    - 向量寫入前先正規化，查詢以矩陣乘法算 cosine，再用 argpartition 取 top-k
+    - 儲存精度可選 float32 / float16 / int8（int8 為每列對稱量化，另存 scale）
+    - 檔案：
+      - `vectors.bin`：(capacity, dim) 矩陣，容量不足時倍增
+      - `scales.f32`：int8 模式下每列的 scale
+      - `docs.jsonl`：依列順序追加的 (id, text)
+      - `meta.json`：dim / dtype / 已提交列數（原子改寫）
+    - 寫入順序為「向量 → docs → meta」，meta 的列數才是提交點；
+      崩潰時多出的向量列或 docs 行會在載入時忽略並截掉
+      （第一次提交前就崩潰、沒有 meta 時，殘留的檔案整份清空）
+
+    score 為 2 - 2·cos，與 Chroma 對正規化向量的 L2 距離一致。
+    """
+
+    def __init__(self, index_dir: Path, dtype: str = "float32") -> None:
+        """
+        建立 NumpyVectorIndex。
+
+        Args:
+            index_dir: 索引目錄。
+            dtype: 向量儲存精度（"float32" / "float16" / "int8"）。
+
+        Raises:
+            ValueError: dtype 不支援，或與既有索引不符。
+        """
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"不支援的 dtype：{dtype}（可用：{VECTOR_DTYPES}）")
+
+        self.dir: Path = Path(index_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.dtype: str = dtype
+        self.dim: Optional[int] = None
+
+        self._ids: List[str] = []
+        self._docs: List[str] = []
+        self._row: Dict[str, int] = {}
+        self._capacity: int = 0
+        self._vectors: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self._lock = threading.RLock()
+
+        self._load()
+
+    # ----------------------------------------------------------
+    # VectorIndex
+    # ----------------------------------------------------------
+    @property
+    def max_batch_size(self) -> int:
+        return MAX_BATCH_SIZE
+
+    def existing_ids(self, ids: Sequence[str]) -> Set[str]:
+        with self._lock:
+            return {i for i in ids if i in self._row}
+
+    def add(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+    ) -> None:
+        if not len(ids):
+            return
+
+        vecs = self._normalize(np.asarray(embeddings, dtype=np.float32))
+
+        with self._lock:
+            # 略過已存在的 id（與 Chroma 的行為一致）
+            keep = [k for k, i in enumerate(ids) if i not in self._row]
+            if not keep:
+                return
+            vecs = vecs[keep]
+
+            if self.dim is None:
+                self.dim = int(vecs.shape[1])
+            elif vecs.shape[1] != self.dim:
+                raise ValueError(f"向量維度不符：索引為 {self.dim}，輸入為 {vecs.shape[1]}")
+
+            start = len(self._ids)
+            self._reserve(start + len(keep))
+            assert self._vectors is not None
+
+            # 1️⃣ 向量
+            if self.dtype == "int8":
+                assert self._scales is not None
+                scales = np.maximum(np.abs(vecs).max(axis=1), 1e-12) / 127.0
+                self._vectors[start : start + len(keep)] = np.round(vecs / scales[:, None]).astype(np.int8)
+                self._scales[start : start + len(keep)] = scales
+                self._scales.flush()
+            else:
+                self._vectors[start : start + len(keep)] = vecs.astype(self.dtype)
+            self._vectors.flush()
+
+            # 2️⃣ docs
+            new_ids = [ids[k] for k in keep]
+            new_docs = [documents[k] for k in keep]
+            with open(self._path("docs"), "ab") as f:
+                for i, d in zip(new_ids, new_docs):
+                    f.write(json.dumps([i, d], ensure_ascii=False).encode("utf-8") + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            for row, i in enumerate(new_ids, start=start):
+                self._row[i] = row
+            self._ids.extend(new_ids)
+            self._docs.extend(new_docs)
+
+            # 3️⃣ 提交
+            self._write_meta()
+
+    def query(self, embedding: Sequence[float], top_k: int) -> List[VectorHit]:
+        q = self._normalize(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+
+        with self._lock:
+            n = len(self._ids)
+            if n == 0 or top_k <= 0 or self._vectors is None:
+                return []
+
+            sims = np.empty(n, dtype=np.float32)
+            for a in range(0, n, QUERY_BLOCK_ROWS):
+                b = min(a + QUERY_BLOCK_ROWS, n)
+                block = self._vectors[a:b]
+                if self.dtype == "float32":
+                    sims[a:b] = block @ q
+                else:
+                    sims[a:b] = block.astype(np.float32) @ q
+            if self.dtype == "int8":
+                assert self._scales is not None
+                sims *= self._scales[:n]
+
+            k = min(top_k, n)
+            top = np.argpartition(-sims, k - 1)[:k] if k < n else np.arange(n)
+            top = top[np.argsort(-sims[top], kind="stable")]
+
+            return [
+                {
+                    "id": self._ids[int(r)],
+                    "text": self._docs[int(r)],
+                    "score": float(2.0 - 2.0 * sims[int(r)]),
+                }
+                for r in top
+            ]
+
+    def get(self, ids: Sequence[str]) -> Dict[str, str]:
+        with self._lock:
+            return {i: self._docs[self._row[i]] for i in ids if i in self._row}
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    @property
+    def bytes_used(self) -> int:
+        """已提交向量所佔的位元組數。"""
+        itemsize = np.dtype(self.dtype).itemsize
+        per_row = (self.dim or 0) * itemsize + (4 if self.dtype == "int8" else 0)
+        return len(self._ids) * per_row
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    @staticmethod
+    def _normalize(vecs: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        return vecs / np.maximum(norms, 1e-12)
+
+    def _path(self, name: str) -> Path:
+        return self.dir / {
+            "meta": "meta.json",
+            "vectors": "vectors.bin",
+            "scales": "scales.f32",
+            "docs": "docs.jsonl",
+        }[name]
+
+    def _write_meta(self) -> None:
+        tmp = self._path("meta").with_name("meta.json.tmp")
+        tmp.write_text(
+            json.dumps({"dim": self.dim, "dtype": self.dtype, "count": len(self._ids)}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self._path("meta"))
+
+    def _map(self, capacity: int) -> None:
+        """以指定容量（重新）映射向量與 scale 檔案，檔案不足時延長。"""
+        assert self.dim is not None
+        specs = [("vectors", np.dtype(self.dtype), (capacity, self.dim))]
+        if self.dtype == "int8":
+            specs.append(("scales", np.dtype(np.float32), (capacity,)))
+
+        self._vectors = self._scales = None
+        for name, dtype, shape in specs:
+            path = self._path(name)
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            with open(path, "ab") as f:
+                if f.tell() < nbytes:
+                    f.truncate(nbytes)
+            mm = np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+            if name == "vectors":
+                self._vectors = mm
+            else:
+                self._scales = mm
+        self._capacity = capacity
+
+    def _reserve(self, rows: int) -> None:
+        if rows <= self._capacity:
+            return
+        capacity = max(self._capacity, INITIAL_CAPACITY)
+        while capacity < rows:
+            capacity *= 2
+        self._map(capacity)
+
+    def _load(self) -> None:
+        """讀取 meta 與 docs，忽略未提交的尾段。"""
+        if not self._path("meta").exists():
+            # 沒有任何提交：殘留的 docs 行與向量列都未提交，清空以免之後的列位錯位
+            for name in ("docs", "vectors", "scales"):
+                path = self._path(name)
+                if path.exists() and path.stat().st_size:
+                    with open(path, "r+b") as f:
+                        f.truncate(0)
+                    print(f"🧹 NumpyVectorIndex：清除未提交的 {path.name}")
+            return
+
+        meta = json.loads(self._path("meta").read_text(encoding="utf-8"))
+        if meta["dtype"] != self.dtype:
+            raise ValueError(
+                f"既有索引的 dtype 為 {meta['dtype']}，與設定的 {self.dtype} 不符"
+            )
+
+        count = int(meta["count"])
+        self.dim = None if meta["dim"] is None else int(meta["dim"])
+
+        valid_end = 0
+        with open(self._path("docs"), "rb") as f:
+            for line in f:
+                if len(self._ids) >= count or not line.endswith(b"\n"):
+                    break
+                i, d = json.loads(line)
+                self._row[i] = len(self._ids)
+                self._ids.append(i)
+                self._docs.append(d)
+                valid_end += len(line)
+
+        if len(self._ids) < count:
+            raise ValueError(f"docs.jsonl 只有 {len(self._ids)} 行，少於 meta 記錄的 {count} 行")
+
+        if valid_end < self._path("docs").stat().st_size:
+            with open(self._path("docs"), "r+b") as f:
+                f.truncate(valid_end)
+
+        if self.dim is not None:
+            size = self._path("vectors").stat().st_size
+            capacity = size // (self.dim * np.dtype(self.dtype).itemsize)
+            self._map(max(capacity, count, 1))
+
+        print(f"📐 NumpyVectorIndex：載入 {count} 筆向量（{self.dtype}）")
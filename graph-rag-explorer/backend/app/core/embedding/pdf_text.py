@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+from app.config.paths import PDF_TEXT_CACHE_DIR
+
+
+# ===== 可調參數 =====
+PDF_WORKERS         = min(4, os.cpu_count() or 1)   # 解析 PDF 的 process 數
+PDF_PAGES_PER_TASK  = 8                             # 每個 process 任務負責的頁數
+PDF_PARALLEL_MIN_PAGES = 32                         # 頁數少於此值時直接在目前的 process 逐頁抽取
+PDF_TEXT_CACHE_MAX_FILES = 256                      # 解析結果快取最多保留幾份檔案（依最近使用淘汰）
+
+_HASH_BLOCK = 1 << 20
+
+
+def file_hash(path: Path) -> str:
+    """
+    以檔案內容計算 md5（逐段讀取，不把整份檔案載入記憶體）。
+
+    Args:
+        path: 檔案路徑。
+
+    Returns:
+        md5 hex digest。
+    """
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(_HASH_BLOCK)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+# worker process 內重複使用的 PdfReader（同一份檔案的後續任務不必重新解析 xref）
+_worker_reader: Dict[Tuple[str, int, int], PdfReader] = {}
+
+
+def _extract_range(path: str, stamp: Tuple[int, int], start: int, stop: int) -> List[str]:
+    """
+    （worker process）抽取 [start, stop) 頁的文字。
+
+    pool 在多次匯入間共用，reader 以 (路徑, mtime, size) 為 key，
+    同名檔案被覆寫後不會沿用舊的解析結果。
+    """
+    key = (path, *stamp)
+    reader = _worker_reader.get(key)
+    if reader is None:
+        _worker_reader.clear()
+        reader = _worker_reader[key] = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+# 所有匯入共用的 process pool（第一次平行解析時才以 spawn 建立）
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _shared_pool(workers: int) -> ProcessPoolExecutor:
+    """取得（必要時建立）共用的 process pool；大小在建立時決定。"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    """關閉共用的 process pool（之後再解析時會重新建立）。"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_pdf_pool)
+
+
+def iter_pdf_pages(
+    path: Path,
+    workers: int = PDF_WORKERS,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+    min_pages: int = PDF_PARALLEL_MIN_PAGES,
+) -> Iterator[str]:
+    """
+    以 process pool 平行抽取 PDF 各頁文字，依頁序逐頁產生。
+
+    頁數少於 min_pages、不多於一個任務、或 workers <= 1 時直接在目前的 process 抽取；
+    否則第一段由目前的 process 以取得頁數時的 reader 抽取，其餘交給共用的 process pool。
+    pool 只在第一次平行解析時以 spawn 建立，不繼承主程式的執行緒與模型狀態。
+
+    Args:
+        path: PDF 路徑。
+        workers: process 數（只在建立共用 pool 時生效）。
+        pages_per_task: 每個任務負責的頁數。
+        min_pages: 平行抽取的最少頁數。
+
+    Yields:
+        每頁文字（無法抽取的頁為空字串）。
+    """
+    reader = PdfReader(str(path))
+    pages = len(reader.pages)
+    step = max(1, pages_per_task)
+
+    if workers <= 1 or pages <= step or pages < min_pages:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    executor = _shared_pool(workers)
+    futures = [
+        executor.submit(_extract_range, str(path), stamp, a, min(a + step, pages))
+        for a in range(step, pages, step)
+    ]
+    try:
+        for i in range(step):
+            yield reader.pages[i].extract_text() or ""
+        for future in futures:
+            yield from future.result()
+    finally:
+        # 呼叫端提前停止時，取消尚未開始的任務
+        for future in futures:
+            future.cancel()
+
+
+class PdfTextCache:
+    """
+    PdfTextCache 以「檔案內容 hash」快取 PDF 解析後的逐頁文字。
+
+    - 每份檔案一個 `<md5>.jsonl`，每行一頁（JSON 字串）
+    - 寫入時邊解析邊寫暫存檔，完整解析後才 os.replace 成正式檔；
+      中途中斷的解析不會留下不完整的快取
+    - 超過 max_files 時刪除最久未使用（mtime 最舊）的檔案
+    - 多個 process 共用同一目錄：快取檔可能隨時被其他 process 淘汰，
+      此時命中視為未命中、淘汰時略過已消失的檔案
+    """
+
+    def __init__(self, cache_dir: Path, max_files: int = PDF_TEXT_CACHE_MAX_FILES) -> None:
+        """
+        建立 PdfTextCache。
+
+        Args:
+            cache_dir: 快取目錄。
+            max_files: 最多保留的檔案數。
+        """
+        self.dir: Path = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_files: int = max(1, max_files)
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock = threading.Lock()
+
+    def iter_pages(self, path: Path, workers: Optional[int] = None) -> Iterator[str]:
+        """
+        逐頁產生 PDF 文字：命中快取則直接讀取，否則平行解析並同時寫入快取。
+
+        Args:
+            path: PDF 路徑。
+            workers: 未命中時解析用的 process 數（None 表示使用 PDF_WORKERS）。
+
+        Yields:
+            每頁文字。
+        """
+        key = file_hash(Path(path))
+        cached = self.dir / f"{key}.jsonl"
+
+        try:
+            hit = open(cached, "r", encoding="utf-8")
+        except FileNotFoundError:
+            hit = None
+
+        if hit is not None:
+            with hit:
+                try:
+                    os.utime(cached)
+                except FileNotFoundError:
+                    # 開檔後才被其他 process 淘汰：已開啟的檔案仍可讀完
+                    pass
+                with self._lock:
+                    self.hits += 1
+                print(f"📄 PdfTextCache：命中 {Path(path).name}，略過解析")
+                for line in hit:
+                    yield json.loads(line)
+            return
+
+        with self._lock:
+            self.misses += 1
+
+        tmp = cached.with_name(f"{cached.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        done = False
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for page in iter_pdf_pages(
+                    Path(path),
+                    workers=PDF_WORKERS if workers is None else workers,
+                ):
+                    f.write(json.dumps(page, ensure_ascii=False) + "\n")
+                    yield page
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, cached)
+            done = True
+        finally:
+            if not done:
+                tmp.unlink(missing_ok=True)
+
+        self._evict()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        取得快取統計。
+
+        Returns:
+            files / hits / misses / hit_rate。
+        """
+        total = self.hits + self.misses
+        return {
+            "files": len(list(self.dir.glob("*.jsonl"))),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _evict(self) -> None:
+        files = []
+        for cached in self.dir.glob("*.jsonl"):
+            try:
+                files.append((cached.stat().st_mtime, cached))
+            except FileNotFoundError:
+                continue   # 已被其他 process 淘汰
+        files.sort()
+
+        for _, old in files[: max(0, len(files) - self.max_files)]:
+            try:
+                old.unlink(missing_ok=True)
+            except OSError:
+                # 例如 Windows 上仍被其他 process 開啟讀取，留待下次淘汰
+                continue
+
+
+_default_cache: Optional[PdfTextCache] = None
+_default_lock = threading.Lock()
+
+
+def default_pdf_cache() -> PdfTextCache:
+    """取得（必要時建立）使用 PDF_TEXT_CACHE_DIR 的共用快取。"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PdfTextCache(PDF_TEXT_CACHE_DIR)
+        return _default_cache
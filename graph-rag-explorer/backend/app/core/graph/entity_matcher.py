@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+from app.core.graph.graph_store import GraphStore
+
+
+# ===== 可調參數 =====
+MIN_ENTITY_CHARS = 2           # 短於此字數的節點名稱不比對（單字 entity 在中文裡幾乎處處命中）
+REBUILD_PENDING_ENTITIES = 256 # 新名稱累積到此數量時，在背景重建主自動機
+
+
+class EntityMatch(TypedDict):
+    """
+    文字中的一次 entity 命中（start / end 為 casefold 後文字的位置）。
+    """
+    entity: str
+    start: int
+    end: int
+
+
+class _Automaton:
+    """
+    建好後不再修改的 Aho-Corasick 自動機，可在鎖外由多個執行緒同時比對。
+    """
+
+    def __init__(self, entries: Dict[str, Tuple[str, ...]]) -> None:
+        """
+        以 casefold 後的 key → 原始名稱建立 trie，再以一次 BFS 計算 failure link。
+
+        Args:
+            entries: casefold 後的名稱 → 原始名稱。
+        """
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.dict_link: List[int] = [0]   # 沿 failure link 最近一個有輸出的節點
+        self.depth: List[int] = [0]
+        self.names: List[Optional[Tuple[str, ...]]] = [None]
+
+        for key, names in entries.items():
+            if names:
+                self._insert(key, names)
+        self._build_links()
+
+    def scan(self, folded: str) -> List[Tuple[int, int, Tuple[str, ...]]]:
+        """
+        找出 casefold 後文字中的所有命中（可重疊）。
+
+        Args:
+            folded: casefold 後的文字。
+
+        Returns:
+            (start, end, 原始名稱) 清單。
+        """
+        goto, fail, dict_link, depth, names = self.goto, self.fail, self.dict_link, self.depth, self.names
+        found: List[Tuple[int, int, Tuple[str, ...]]] = []
+        state = 0
+        for i, ch in enumerate(folded):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            node = state if names[state] else dict_link[state]
+            while node:
+                found.append((i + 1 - depth[node], i + 1, names[node]))  # type: ignore[arg-type]
+                node = dict_link[node]
+        return found
+
+    def _insert(self, key: str, names: Tuple[str, ...]) -> None:
+        state = 0
+        for ch in key:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.dict_link.append(0)
+                self.depth.append(self.depth[state] + 1)
+                self.names.append(None)
+                self.goto[state][ch] = nxt
+            state = nxt
+        self.names[state] = names
+
+    def _build_links(self) -> None:
+        """以 BFS 計算所有節點的 failure link 與 dictionary link。"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+
+                fail = self.fail[child]
+                self.dict_link[child] = fail if self.names[fail] else self.dict_link[fail]
+                queue.append(child)
+
+
+class EntityMatcher:
+    """
+    EntityMatcher 以 Aho-Corasick 自動機比對文字中出現的圖譜節點名稱。
+
+    - 自動機涵蓋 GraphStore 所有節點（名稱 casefold 後比對，回傳原始名稱）
+    - 與圖譜同步透過 GraphStore.changes_since 的增量；
+      變更紀錄已被截斷時才走訪 iter_nodes 補上缺少的名稱
+    - 插入新名稱可能改變既有節點的 failure link，因此自動機建好後不再修改：
+      - 主自動機涵蓋某個時間點的所有名稱，在背景整份重建後整份替換
+      - 之後的新名稱另建一個小自動機（只含這些名稱），比對時兩者合併；
+        新名稱累積到 REBUILD_PENDING_ENTITIES 個時才背景重建主自動機
+      因此請求路徑上的重算成本只與新名稱數有關，與節點總數無關
+    - 比對為線性時間：O(文字長度 + 命中數)，與節點數無關，且不持有鎖
+
+    命中結果採 leftmost-longest：重疊的命中只保留起點最前、其次最長者。
+    """
+
+    def __init__(
+        self,
+        store: GraphStore,
+        min_chars: int = MIN_ENTITY_CHARS,
+        rebuild_pending: int = REBUILD_PENDING_ENTITIES,
+        background: bool = True,
+    ) -> None:
+        """
+        建立 EntityMatcher，並以目前的圖譜節點建立自動機。
+
+        Args:
+            store: 知識圖譜儲存層。
+            min_chars: 節點名稱的最少字數。
+            rebuild_pending: 新名稱累積到此數量時重建主自動機。
+            background: 主自動機是否在背景執行緒重建（False 時於比對前同步重建）。
+        """
+        self.store: GraphStore = store
+        self.min_chars: int = max(1, min_chars)
+        self.rebuild_pending: int = max(1, rebuild_pending)
+        self.background: bool = background
+
+        self._lock = threading.Lock()
+        self._version: int = -1
+        self._count: int = 0
+
+        # 所有已知名稱：casefold key -> 原始名稱
+        self._entries: Dict[str, List[str]] = {}
+
+        # 主自動機與其涵蓋的名稱；尚未涵蓋的名稱與其小自動機（None 表示需重建）
+        self._covered: Dict[str, Tuple[str, ...]] = {}
+        self._main: _Automaton = _Automaton({})
+        self._pending: Dict[str, List[str]] = {}
+        self._pending_automaton: Optional[_Automaton] = None
+
+        self._builder: Optional[threading.Thread] = None
+
+        with self._lock:
+            self._sync()
+        self._rebuild()
+
+    def find(self, text: str) -> List[EntityMatch]:
+        """
+        找出文字中出現的已知 entity。
+
+        Args:
+            text: 問題或回答文字。
+
+        Returns:
+            依出現位置排序、互不重疊的命中。
+        """
+        with self._lock:
+            self._sync()
+            self._maybe_rebuild()
+            if self._pending_automaton is None:
+                self._pending_automaton = _Automaton(
+                    {key: tuple(names) for key, names in self._pending.items()}
+                )
+            main, pending = self._main, self._pending_automaton
+
+        folded = text.casefold()
+        found = main.scan(folded) + pending.scan(folded)
+
+        # leftmost-longest，且不重疊；同一段文字在兩個自動機各有名稱時
+        #（casefold 相同的不同寫法）一併回傳，兩邊的名稱不會重複
+        found.sort(key=lambda m: (m[0], -m[1]))
+        matches: List[EntityMatch] = []
+        span = (0, 0)
+        for start, stop, names in found:
+            if start < span[1] and (start, stop) != span:
+                continue
+            matches.extend({"entity": name, "start": start, "end": stop} for name in names)
+            span = (start, stop)
+        return matches
+
+    def entities(self, text: str) -> List[str]:
+        """
+        找出文字中出現的已知 entity 名稱（去重、依出現順序）。
+
+        Args:
+            text: 問題或回答文字。
+
+        Returns:
+            節點名稱清單。
+        """
+        return list(dict.fromkeys(m["entity"] for m in self.find(text)))
+
+    def wait(self) -> None:
+        """等待背景重建結束。"""
+        builder = self._builder
+        if builder is not None:
+            builder.join()
+
+    def __len__(self) -> int:
+        """自動機中的名稱數。"""
+        return self._count
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _sync(self) -> None:
+        """（持有 _lock）依圖譜版本加入新節點名稱；增量不可用時走訪所有節點補上。"""
+        version = self.store.version
+        if version == self._version:
+            return
+
+        changes = self.store.changes_since(self._version) if self._version >= 0 else None
+        if changes is None:
+            # 節點只增不減：重複的名稱在 _add 中略過
+            for name in self.store.iter_nodes():
+                self._add(name)
+        else:
+            for change in changes:
+                for name in change["nodes"]:
+                    self._add(name)
+        self._version = version
+
+    def _add(self, name: str) -> None:
+        key = name.strip().casefold()
+        if len(key) < self.min_chars:
+            return
+
+        names = self._entries.setdefault(key, [])
+        if name in names:
+            return
+        names.append(name)
+        self._count += 1
+
+        if name not in self._covered.get(key, ()):
+            self._pending.setdefault(key, []).append(name)
+            self._pending_automaton = None
+
+    def _maybe_rebuild(self) -> None:
+        """（持有 _lock）新名稱夠多時重建主自動機：背景執行，或在 background=False 時同步執行。"""
+        if len(self._pending) < self.rebuild_pending:
+            return
+        if not self.background:
+            snapshot = self._snapshot()
+            self._install(snapshot, _Automaton(snapshot))
+            return
+        if self._builder is not None and self._builder.is_alive():
+            return
+        self._builder = threading.Thread(target=self._rebuild, name="entity-matcher", daemon=True)
+        self._builder.start()
+
+    def _rebuild(self) -> None:
+        """以目前所有名稱建立新的主自動機（不持有鎖），完成後整份替換。"""
+        with self._lock:
+            snapshot = self._snapshot()
+        automaton = _Automaton(snapshot)
+        with self._lock:
+            self._install(snapshot, automaton)
+        print(f"🔎 EntityMatcher：已建立 {len(snapshot)} 個 entity 的自動機")
+
+    def _snapshot(self) -> Dict[str, Tuple[str, ...]]:
+        return {key: tuple(names) for key, names in self._entries.items()}
+
+    def _install(self, snapshot: Dict[str, Tuple[str, ...]], automaton: _Automaton) -> None:
+        """（持有 _lock）替換主自動機，並從待處理名稱中移除已涵蓋者。"""
+        self._main = automaton
+        self._covered = snapshot
+
+        pending: Dict[str, List[str]] = {}
+        for key, names in self._pending.items():
+            rest = [n for n in names if n not in snapshot.get(key, ())]
+            if rest:
+                pending[key] = rest
+        self._pending = pending
+        self._pending_automaton = None
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config.paths import EXTRACTION_CACHE_PATH
+from app.core.graph.graph_store import Triple
+
+
+# ===== 可調參數 =====
+EXTRACTION_CACHE_MAX_ENTRIES = 50_000   # 快取筆數上限，超過即淘汰最久未用的紀錄
+EXTRACTION_CACHE_EVICT_RATIO = 0.1      # 每次淘汰時額外騰出的比例，避免每次寫入都觸發淘汰
+
+
+# 快取 key：(chunk hash, model id, prompt template hash, max_input_chars)
+CacheKey = Tuple[str, str, str, int]
+
+
+class ExtractionCache:
+    """
+    ExtractionCache 是 LLM 三元組抽取結果的磁碟快取（SQLite）。
+
+    - key 為 (chunk hash, model id, prompt 模板 hash, max_input_chars)，
+      任一項改變都會視為不同結果
+    - 以 last_used 記錄最近使用順序，筆數超過上限時淘汰最久未用者；
+      筆數在記憶體中累計，寫入時不需 COUNT(*)
+    - 空結果（chunk 沒有三元組）同樣快取
+    - 統計 hit / miss / eviction 次數
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES,
+    ) -> None:
+        """
+        建立 ExtractionCache。
+
+        Args:
+            path: SQLite 檔案路徑（None 時使用 EXTRACTION_CACHE_PATH）。
+            max_entries: 快取筆數上限。
+        """
+        self.path: Path = Path(path) if path else EXTRACTION_CACHE_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries: int = max(1, max_entries)
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                chunk_hash      TEXT    NOT NULL,
+                model_id        TEXT    NOT NULL,
+                prompt_hash     TEXT    NOT NULL,
+                max_input_chars INTEGER NOT NULL,
+                triples         TEXT    NOT NULL,
+                last_used       INTEGER NOT NULL,
+                PRIMARY KEY (chunk_hash, model_id, prompt_hash, max_input_chars)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_used "
+            "ON extraction_cache (last_used)"
+        )
+        self._conn.commit()
+
+        row = self._conn.execute(
+            "SELECT MAX(last_used), COUNT(*) FROM extraction_cache"
+        ).fetchone()
+        self._clock: int = int(row[0] or 0)
+        self._count: int = int(row[1])
+
+    # ----------------------------------------------------------
+    # 讀寫
+    # ----------------------------------------------------------
+    def get_many(self, keys: Iterable[CacheKey]) -> Dict[CacheKey, List[Triple]]:
+        """
+        批次查詢快取，命中的紀錄會更新為最近使用。
+
+        Args:
+            keys: 快取 key 清單。
+
+        Returns:
+            命中的 key → 三元組清單。
+        """
+        keys = list(dict.fromkeys(keys))
+        found: Dict[CacheKey, List[Triple]] = {}
+
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute(
+                    "SELECT triples FROM extraction_cache "
+                    "WHERE chunk_hash=? AND model_id=? AND prompt_hash=? AND max_input_chars=?",
+                    key,
+                ).fetchone()
+                if row is not None:
+                    found[key] = json.loads(row[0])
+
+            if found:
+                self._clock += 1
+                self._conn.executemany(
+                    "UPDATE extraction_cache SET last_used=? "
+                    "WHERE chunk_hash=? AND model_id=? AND prompt_hash=? AND max_input_chars=?",
+                    [(self._clock, *key) for key in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def put_many(self, entries: Dict[CacheKey, List[Triple]]) -> None:
+        """
+        批次寫入抽取結果，必要時淘汰最久未用的紀錄。
+
+        Args:
+            entries: key → 三元組清單。
+        """
+        if not entries:
+            return
+
+        with self._lock:
+            self._clock += 1
+            rows = [
+                (json.dumps(triples, ensure_ascii=False), self._clock, *key)
+                for key, triples in entries.items()
+            ]
+            # 先插入新 key（rowcount 即新增筆數），已存在的 key 再以 UPDATE 覆寫
+            added = self._conn.executemany(
+                "INSERT OR IGNORE INTO extraction_cache "
+                "(triples, last_used, chunk_hash, model_id, prompt_hash, max_input_chars) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            ).rowcount
+            if added < len(rows):
+                self._conn.executemany(
+                    "UPDATE extraction_cache SET triples=?, last_used=? "
+                    "WHERE chunk_hash=? AND model_id=? AND prompt_hash=? AND max_input_chars=?",
+                    rows,
+                )
+            self._count += added
+            self._evict()
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count
+
+    def stats(self) -> Dict[str, float]:
+        """
+        取得快取統計。
+
+        Returns:
+            entries / hits / misses / evictions / hit_rate。
+        """
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _evict(self) -> None:
+        """筆數超過上限時，淘汰最久未用的紀錄（呼叫端需持有 _lock）。"""
+        if self._count <= self.max_entries:
+            return
+
+        target = int(self.max_entries * (1.0 - EXTRACTION_CACHE_EVICT_RATIO))
+        removed = self._conn.execute(
+            "DELETE FROM extraction_cache WHERE rowid IN ("
+            "SELECT rowid FROM extraction_cache ORDER BY last_used LIMIT ?)",
+            (self._count - target,),
+        ).rowcount
+        self._count -= removed
+        self.evictions += removed
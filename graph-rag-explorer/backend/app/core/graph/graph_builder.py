@@ -1,14 +1,26 @@
 from __future__ import annotations
 
 import hashlib
-from typing import Dict, List, Optional
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
+from app.core.graph.extraction_cache import CacheKey, ExtractionCache
 from app.core.graph.graph_extractor import GraphExtractor
-from app.core.graph.graph_store import GraphStore
-from app.core.embedding.chunker import split_document, DocumentChunk
+from app.core.graph.graph_store import GraphStore, SourcedTriple, Triple
+from app.core.embedding.chunker import iter_document_chunks
+from app.core.embedding.embedder import chunk_id
 from app.infrastructure.models.model_provider import ModelProvider
 
 
+# ===== 可調參數 =====
+EXTRACTION_BATCH_SIZE = 8   # 每次送進 LLM 的 chunk 數
+
+
+# 進度回報：(已處理 chunk 數, chunk 總數, 本批新產生的三元組)
+ProgressCallback = Callable[[int, int, List[Triple]], None]
+
+
 def _h(s: str) -> str:
     """
     計算字串的 MD5 雜湊值，用於內容去重。
@@ -30,14 +42,15 @@ class GraphBuilder:
     - 文件切 chunk
     - chunk 去重
     - 根據語意優先排序（關係句優先）
-    - 呼叫 LLM 抽取三元組
-    - 寫入圖譜儲存層
+    - 查詢抽取快取，只對未命中的 chunk 呼叫 LLM 抽取三元組
+    - 寫入圖譜儲存層（附上出處：檔名為 doc id，chunk id 與向量索引一致）
     """
 
     def __init__(
         self,
         provider: ModelProvider,
         store: GraphStore,
+        cache: Optional[ExtractionCache] = None,
     ) -> None:
         """
         建立 GraphBuilder。
@@ -45,66 +58,174 @@ class GraphBuilder:
         Args:
             provider: 提供 LLM 的 ModelProvider。
             store: 用於儲存三元組的 GraphStore。
+            cache: 抽取結果快取（None 表示不使用）。
         """
         self.extractor: GraphExtractor = GraphExtractor(
             llm=provider.get_llm()
         )
         self.store: GraphStore = store
+        self.cache: Optional[ExtractionCache] = cache
 
     def build_from_file(
         self,
         file_path: str,
         max_chunks: Optional[int] = 50,
-    ) -> List[Dict[str, str]]:
+        batch_size: int = EXTRACTION_BATCH_SIZE,
+        progress: Optional[ProgressCallback] = None,
+    ) -> List[SourcedTriple]:
         """
         從檔案建立知識圖譜三元組。
 
         流程：
-        1. 切分文件為多個 chunk
+        1. 串流切分文件為多個 chunk
         2. 依文字內容進行去重
         3. 將「看起來像關係句」的 chunk 排在前面
         4. 限制最大處理 chunk 數量
-        5. 抽取三元組並寫入 GraphStore
+        5. 以批次抽取三元組，附上出處 (doc id, chunk id) 後寫入 GraphStore
 
         Args:
             file_path: 文件路徑。
             max_chunks: 最多處理的 chunk 數量（None 表示不限制）。
+            batch_size: 每批送進 LLM 的 chunk 數。
+            progress: 每批完成後呼叫的進度回報（None 表示不回報）。
 
         Returns:
-            從此檔案中抽取出的所有三元組清單。
+            從此檔案中抽取出的所有三元組清單（含 doc_id / chunk_id）。
         """
-        chunks: List[DocumentChunk] = split_document(file_path)
+        doc_id: str = Path(file_path).name
+
+        # 逐一切出 chunk 即去重，不保留完整的 chunk 清單
+        return self.build_from_chunks(
+            ((doc_id, c["text"]) for c in iter_document_chunks(file_path)),
+            max_chunks=max_chunks,
+            batch_size=batch_size,
+            progress=progress,
+        )
 
-        # 去重：hash -> text
+    def build_from_chunks(
+        self,
+        chunks: Iterable[Tuple[str, str]],
+        max_chunks: Optional[int] = None,
+        batch_size: int = EXTRACTION_BATCH_SIZE,
+        progress: Optional[ProgressCallback] = None,
+    ) -> List[SourcedTriple]:
+        """
+        從已切好的 chunk（可跨多份文件）建立知識圖譜三元組。
+
+        去重時同一段文字只保留第一次出現的出處。
+
+        Args:
+            chunks: (doc id, chunk 文字)，可為串流（只走訪一次）。
+            max_chunks: 最多處理的 chunk 數量（None 表示不限制）。
+            batch_size: 每批送進 LLM 的 chunk 數。
+            progress: 每批完成後呼叫的進度回報（None 表示不回報）。
+
+        Returns:
+            抽取出的所有三元組清單（含 doc_id / chunk_id）。
+        """
+        # 去重：hash -> text / doc id
         uniq: Dict[str, str] = {}
-        for c in chunks:
-            text: str = c["text"].strip()
+        docs: Dict[str, str] = {}
+        for doc_id, raw in chunks:
+            text: str = raw.strip()
             if not text:
                 continue
 
             h: str = _h(text)
             if h not in uniq:
                 uniq[h] = text
-
-        texts: List[str] = list(uniq.values())
+                docs[h] = doc_id
 
         # 關係句優先排序
-        texts.sort(
-            key=lambda t: 0 if self.extractor.looks_like_relation(t) else 1
+        hashes: List[str] = sorted(
+            uniq,
+            key=lambda h: 0 if self.extractor.looks_like_relation(uniq[h]) else 1,
         )
 
         if max_chunks is not None:
-            texts = texts[:max_chunks]
+            hashes = hashes[:max_chunks]
+
+        texts: List[str] = [uniq[h] for h in hashes]
+
+        all_triples: List[SourcedTriple] = []
+        batch_size = max(1, batch_size)
+        started = time.perf_counter()
+
+        for i in range(0, len(texts), batch_size):
+            results = self._extract_batch(
+                hashes[i : i + batch_size],
+                texts[i : i + batch_size],
+                batch_size,
+            )
+
+            batch_triples: List[SourcedTriple] = [
+                {**t, "doc_id": docs[h], "chunk_id": chunk_id(uniq[h])}  # type: ignore[typeddict-item]
+                for h, r in zip(hashes[i : i + batch_size], results)
+                for t in r
+            ]
+            if batch_triples:
+                # 寫入三元圖（每批一次，共用同一筆 WAL 紀錄）
+                self.store.add_triples(batch_triples)
+                all_triples.extend(batch_triples)
+
+            if progress is not None:
+                progress(min(i + batch_size, len(texts)), len(texts), batch_triples)
+
+        elapsed = time.perf_counter() - started
+        if texts:
+            print(
+                f"⏱️ GraphBuilder：{len(texts)} 個 chunk，耗時 {elapsed:.2f}s，"
+                f"{len(texts) / max(elapsed, 1e-9):.2f} chunks/s"
+            )
+        if self.cache is not None:
+            stats = self.cache.stats()
+            print(
+                f"🗃️ ExtractionCache：hit {stats['hits']} / miss {stats['misses']}"
+                f"（hit rate {stats['hit_rate']:.1%}，{stats['entries']} 筆）"
+            )
 
-        all_triples: List[Dict[str, str]] = []
+        return all_triples
 
-        for t in texts:
-            triples: List[Dict[str, str]] = self.extractor.extract_triples(t)
-            if not triples:
-                continue
+    def _extract_batch(
+        self,
+        hashes: List[str],
+        texts: List[str],
+        batch_size: int,
+    ) -> List[List[Triple]]:
+        """
+        抽取一批 chunk：先查快取，只把未命中的 chunk 送進 LLM，
+        並將結果寫回快取（沒有三元組的 chunk 也快取；抽取失敗者不快取，下次重試）。
 
-            # 寫入三元圖
-            self.store.add_triples(triples)
-            all_triples.extend(triples)
+        Args:
+            hashes: chunk 內容 hash。
+            texts: chunk 文字（與 hashes 對齊）。
+            batch_size: 每次 forward 的 prompt 數。
 
-        return all_triples
+        Returns:
+            與 texts 等長、順序相同的三元組清單。
+        """
+        if self.cache is None:
+            return self.extractor.extract_triples_batch(texts, batch_size=batch_size)
+
+        keys: List[CacheKey] = [
+            (
+                h,
+                self.extractor.model_id,
+                self.extractor.prompt_hash,
+                self.extractor.max_input_chars,
+            )
+            for h in hashes
+        ]
+        cached = self.cache.get_many(keys)
+
+        missing = [i for i, k in enumerate(keys) if k not in cached]
+        fresh = self.extractor.try_extract_triples_batch(
+            [texts[i] for i in missing],
+            batch_size=batch_size,
+        )
+        self.cache.put_many({keys[i]: r for i, r in zip(missing, fresh) if r is not None})
+
+        results: List[List[Triple]] = [cached.get(k, []) for k in keys]
+        for i, r in zip(missing, fresh):
+            results[i] = r or []
+        return results
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import re
 from typing import Any, Dict, List, Optional, Protocol
@@ -8,6 +9,25 @@ from app.capabilities.textgen.text_generator import TextGenerator
 from app.core.llm.llm import LLM
 from app.core.graph.graph_store import Triple
 
+
+# 三元組抽取 prompt；{text} 為截斷後的輸入文字
+EXTRACTION_PROMPT = """
+我要做知識圖譜, 請幫我找三元組. 只輸出 JSON 陣列.
+格式為[{{"subject":"","predicate":"","object":""}}]
+請用繁體中文。
+不要給json以外的描述.
+object是連接詞的意思.
+
+文字如下：
+{text}
+
+請輸出結果：
+        """
+
+# 以 {text} 為界切成固定前綴與後段；前綴的 KV cache 可由 LLM 預先計算並重用
+EXTRACTION_PROMPT_PREFIX, EXTRACTION_PROMPT_SUFFIX = EXTRACTION_PROMPT.format(text="\0").split("\0")
+
+
 class GraphExtractor:
     """
     GraphExtractor
@@ -27,7 +47,13 @@ class GraphExtractor:
         max_input_chars: int = 400,
     ) -> None:
         self._generate = llm.generate
+        self._generate_batch = getattr(llm, "generate_batch", None)
+        self._generate_prefixed = getattr(llm, "generate_batch_with_prefix", None)
         self.max_input_chars: int = max_input_chars
+        self.model_id: str = getattr(llm, "model_id", type(llm).__name__)
+        self.prompt_hash: str = hashlib.md5(
+            EXTRACTION_PROMPT.encode("utf-8")
+        ).hexdigest()
 
 
     # ----------------------------------------------------------
@@ -41,31 +67,127 @@ class GraphExtractor:
             text: 原始輸入文字。
 
         Returns:
-            正規化後的 Triple 清單。
+            正規化後的 Triple 清單（抽取失敗時為空清單）。
         """
-        truncated_text: str = text[: self.max_input_chars]
+        return self._try_extract(text) or []
 
-        prompt = f"""
-我要做知識圖譜, 請幫我找三元組. 只輸出 JSON 陣列.
-格式為[{{"subject":"","predicate":"","object":""}}]
-請用繁體中文。
-不要給json以外的描述.
-object是連接詞的意思.
+    def extract_triples_batch(
+        self,
+        texts: List[str],
+        batch_size: int = 8,
+    ) -> List[List[Triple]]:
+        """
+        批次抽取多段文字的三元組（抽取失敗的文字對應空清單）。
 
-文字如下：
-{truncated_text.strip()}
+        Args:
+            texts: 原始輸入文字清單。
+            batch_size: 每次 forward 的 prompt 數。
 
-請輸出結果：
+        Returns:
+            與 texts 等長、順序相同的 Triple 清單。
+        """
+        return [r or [] for r in self.try_extract_triples_batch(texts, batch_size=batch_size)]
+
+    def try_extract_triples_batch(
+        self,
+        texts: List[str],
+        batch_size: int = 8,
+    ) -> List[Optional[List[Triple]]]:
         """
+        批次抽取多段文字的三元組，並區分「沒有三元組」與「抽取失敗」。
 
+        LLM 支援 generate_batch 時，多個 prompt 會合併成同一次 forward；
+        支援 generate_batch_with_prefix 時，固定的指令前綴只 prefill 一次，
+        每段只需 prefill 自己的文字。
+        否則（或批次生成失敗時）退回逐筆抽取。
+
+        Args:
+            texts: 原始輸入文字清單。
+            batch_size: 每次 forward 的 prompt 數。
+
+        Returns:
+            與 texts 等長、順序相同的 Triple 清單；生成或解析失敗者為 None。
+        """
+        if not texts:
+            return []
+
+        if self._generate_batch is None and self._generate_prefixed is None:
+            return [self._try_extract(t) for t in texts]
+
+        try:
+            if self._generate_prefixed is not None:
+                outputs = self._generate_prefixed(
+                    EXTRACTION_PROMPT_PREFIX,
+                    [self._build_suffix(t) for t in texts],
+                    batch_size=batch_size,
+                )
+            else:
+                prompts = [self._build_prompt(t) for t in texts]
+                outputs = self._generate_batch(prompts, batch_size=batch_size)
+        except Exception as e:
+            print(f"❌ GraphExtractor 批次抽取失敗，改為逐筆: {e}")
+            return [self._try_extract(t) for t in texts]
+
+        results: List[Optional[List[Triple]]] = []
+        for out in outputs:
+            try:
+                results.append(self._parse_triples(out[0]["generated_text"]))
+            except Exception as e:
+                print(f"❌ GraphExtractor 解析失敗: {e}")
+                results.append(None)
+
+        print(
+            f"📊 GraphExtractor：批次 {len(texts)} 段，"
+            f"解析到 {sum(len(r) for r in results if r)} 個三元組。"
+        )
+        return results
+
+    def _try_extract(self, text: str) -> Optional[List[Triple]]:
+        """抽取單段文字；生成或解析失敗時回傳 None。"""
         try:
-            result: str = self._generate(prompt)[0]["generated_text"]
+            if self._generate_prefixed is not None:
+                outputs = self._generate_prefixed(
+                    EXTRACTION_PROMPT_PREFIX, [self._build_suffix(text)], batch_size=1
+                )[0]
+            else:
+                outputs = self._generate(self._build_prompt(text))
+            result: str = outputs[0]["generated_text"]
             triples = self._parse_triples(result)
             print(f"📊 GraphExtractor：解析到 {len(triples)} 個三元組。")
             return triples
         except Exception as e:
             print(f"❌ GraphExtractor 抽取失敗: {e}")
-            return []
+            return None
+
+    # ----------------------------------------------------------
+    # 輔助：組 prompt
+    # ----------------------------------------------------------
+    def _build_prompt(self, text: str) -> str:
+        """
+        組出三元組抽取的 prompt（輸入先截斷至 max_input_chars）。
+
+        Args:
+            text: 原始輸入文字。
+
+        Returns:
+            prompt 字串。
+        """
+        truncated_text: str = text[: self.max_input_chars]
+
+        return EXTRACTION_PROMPT.format(text=truncated_text.strip())
+
+    def _build_suffix(self, text: str) -> str:
+        """
+        組出 prompt 在固定前綴之後的部分；
+        EXTRACTION_PROMPT_PREFIX + _build_suffix(text) == _build_prompt(text)。
+
+        Args:
+            text: 原始輸入文字。
+
+        Returns:
+            prompt 後段字串。
+        """
+        return text[: self.max_input_chars].strip() + EXTRACTION_PROMPT_SUFFIX
 
     # ----------------------------------------------------------
     # 輔助：解析 JSON / 類 JSON
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, List, Optional, Tuple
+
+
+# 一筆 WAL 紀錄：(序號, 該次 add_triples 寫入的三元組)
+JournalRecord = Tuple[int, List[Any]]
+
+
+def fsync_dir(path: Path) -> None:
+    """
+    對目錄做 fsync，確保 rename / 新檔案的目錄項目已落盤。
+
+    部分平台（例如 Windows）不支援對目錄開檔，此時直接略過。
+
+    Args:
+        path: 目錄路徑。
+    """
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class GraphJournal:
+    """
+    GraphJournal 是 GraphStore 的追加式寫前日誌（write-ahead log）。
+
+    - 每筆紀錄佔一行：`<crc32 hex> <json payload>\\n`
+    - payload 帶有單調遞增的 seq，snapshot 會記錄已涵蓋的最後 seq
+    - 每次 append 都會 flush 到 OS（行程崩潰不遺失），
+      fsync 則批次進行（筆數或時間達門檻才落盤）
+    - 讀取時遇到 CRC 不符或半截行即停止，並截掉該尾段
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fsync_every: int = 32,
+        fsync_interval: float = 1.0,
+    ) -> None:
+        """
+        建立 GraphJournal。
+
+        Args:
+            path: WAL 檔案路徑。
+            fsync_every: 累積多少筆未落盤紀錄後 fsync。
+            fsync_interval: 距上次 fsync 超過幾秒後，下一次 append 會 fsync。
+        """
+        self.path: Path = path
+        self.fsync_every: int = fsync_every
+        self.fsync_interval: float = fsync_interval
+
+        self._fh: Optional[BinaryIO] = None
+        self._unsynced: int = 0
+        self._last_sync: float = time.monotonic()
+
+    # ----------------------------------------------------------
+    # 寫入
+    # ----------------------------------------------------------
+    def append(self, seq: int, triples: List[Any]) -> None:
+        """
+        追加一筆紀錄，必要時批次 fsync。
+
+        Args:
+            seq: 紀錄序號。
+            triples: 本次寫入的三元組。
+        """
+        fh = self._open()
+        fh.write(self._encode(seq, triples))
+        fh.flush()
+
+        self._unsynced += 1
+        if (
+            self._unsynced >= self.fsync_every
+            or time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        """將尚未落盤的紀錄 fsync 到磁碟。"""
+        if self._fh is None or self._unsynced == 0:
+            return
+        os.fsync(self._fh.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def rewrite(self, records: Iterable[JournalRecord]) -> None:
+        """
+        以原子方式改寫整份 WAL（compaction 後只保留 snapshot 尚未涵蓋的紀錄）。
+
+        Args:
+            records: 需保留的紀錄。
+        """
+        self.close()
+
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            for seq, triples in records:
+                f.write(self._encode(seq, triples))
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, self.path)
+        fsync_dir(self.path.parent)
+
+    def close(self) -> None:
+        """fsync 並關閉檔案。"""
+        if self._fh is None:
+            return
+        self.sync()
+        self._fh.close()
+        self._fh = None
+
+    # ----------------------------------------------------------
+    # 讀取 / 復原
+    # ----------------------------------------------------------
+    def replay(self) -> List[JournalRecord]:
+        """
+        讀出所有完整紀錄，並截掉崩潰留下的不完整尾段。
+
+        Returns:
+            依寫入順序排列的紀錄清單。
+        """
+        if not self.path.exists():
+            return []
+
+        self.close()
+
+        records: List[JournalRecord] = []
+        valid_end = 0
+
+        with open(self.path, "rb") as f:
+            for line in f:
+                record = self._decode(line)
+                if record is None:
+                    break
+                records.append(record)
+                valid_end += len(line)
+
+        if valid_end < self.path.stat().st_size:
+            print(f"⚠️ GraphJournal：偵測到不完整紀錄，截斷於 byte {valid_end}")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_end)
+                os.fsync(f.fileno())
+
+        return records
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _open(self) -> BinaryIO:
+        if self._fh is None:
+            self._fh = open(self.path, "ab")
+        return self._fh
+
+    @staticmethod
+    def _encode(seq: int, triples: List[Any]) -> bytes:
+        payload = json.dumps(
+            {"seq": seq, "triples": triples},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+    @staticmethod
+    def _decode(line: bytes) -> Optional[JournalRecord]:
+        if not line.endswith(b"\n"):
+            return None
+
+        crc_hex, _, payload = line.rstrip(b"\n").partition(b" ")
+        try:
+            if int(crc_hex, 16) != zlib.crc32(payload):
+                return None
+            data = json.loads(payload)
+            return int(data["seq"]), list(data["triples"])
+        except (ValueError, KeyError, TypeError):
+            return None
@@ -0,0 +1,390 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.graph.graph_store import GraphStore
+
+
+# ===== 可調參數 =====
+LAYOUT_ITERATIONS       = 60         # 完整佈局的迭代次數
+INCREMENTAL_ITERATIONS  = 30         # 只移動新節點時的迭代次數
+REPULSION_BLOCK_ELEMS   = 4_000_000  # 斥力分塊計算時每塊的 (列 × 節點) 上限，約 32MB
+LAYOUT_SCALE            = 80.0       # 單位座標轉成像素時，每 √節點數 的寬度（完整佈局時固定）
+RELAYOUT_GROWTH         = 4.0        # 節點數成長到上次完整佈局的幾倍時，背景重新完整佈局
+SAVE_INTERVAL           = 30.0       # 增量佈局後寫回 .npz 的最短間隔（秒）；完整佈局與 close 時一律寫回
+
+
+def force_directed_layout(
+    pos: np.ndarray,
+    edges: np.ndarray,
+    movable: Optional[np.ndarray] = None,
+    iterations: int = LAYOUT_ITERATIONS,
+) -> np.ndarray:
+    """
+    向量化的 Fruchterman-Reingold 力導向佈局（單位正方形內）。
+
+    - 斥力：對所有節點兩兩計算，分塊進行以限制記憶體
+    - 引力：沿邊計算，以 np.add.at 累加
+    - 只更新 movable 節點；其餘節點固定，作為增量佈局的錨點
+
+    Args:
+        pos: (n, 2) 初始座標，會被就地更新。
+        edges: (m, 2) 邊的端點索引。
+        movable: (n,) bool，None 表示全部可移動。
+        iterations: 迭代次數。
+
+    Returns:
+        更新後的座標（即 pos）。
+    """
+    n = len(pos)
+    if n == 0:
+        return pos
+
+    rows = np.arange(n) if movable is None else np.flatnonzero(movable)
+    if len(rows) == 0:
+        return pos
+
+    k2 = np.float32(1.0 / n)  # k = 1/√n
+    k = np.sqrt(k2)
+    block = max(1, REPULSION_BLOCK_ELEMS // n)
+    temperature = 0.1
+
+    for it in range(iterations):
+        disp = np.zeros((n, 2), dtype=np.float32)
+        x, y = pos[:, 0], pos[:, 1]
+
+        # 斥力 k² / d：Σ_j (p_i - p_j)·w_ij = p_i·Σ_j w_ij - (W @ p)_i，
+        # 以矩陣乘法取代逐對的向量運算
+        for b in range(0, len(rows), block):
+            r = rows[b : b + block]
+            dx = x[r, None] - x[None, :]
+            dy = y[r, None] - y[None, :]
+            w = dx * dx
+            w += dy * dy
+            np.maximum(w, 1e-6, out=w)
+            np.divide(k2, w, out=w)
+            w_sum = w.sum(axis=1)
+            disp[r, 0] += x[r] * w_sum - w @ x
+            disp[r, 1] += y[r] * w_sum - w @ y
+
+        # 引力 d² / k
+        if len(edges):
+            delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+            dist = np.sqrt(np.maximum((delta * delta).sum(axis=-1), 1e-6))
+            force = delta * (dist / k)[:, None]
+            np.add.at(disp, edges[:, 0], -force)
+            np.add.at(disp, edges[:, 1], force)
+
+        # 位移受溫度限制，溫度線性冷卻
+        step = disp[rows]
+        length = np.sqrt(np.maximum((step * step).sum(axis=-1), 1e-12))
+        pos[rows] += step / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature = 0.1 * (1.0 - (it + 1) / iterations) + 1e-3
+
+    return pos
+
+
+class GraphLayout:
+    """
+    GraphLayout 為 GraphStore 預先計算節點座標並快取到磁碟。
+
+    - 完整佈局（O(n²) × LAYOUT_ITERATIONS）與增量佈局都在同一條背景執行緒計算，
+      請求只讀取上一份不可變檢視、不等待也不持有鎖；
+      尚無完整佈局時 ready 為 False，前端改用瀏覽器端佈局
+    - 之後只為新節點找位置：放在已佈局鄰居的重心附近，
+      再以既有節點為固定錨點做少量迭代
+    - 增量佈局後的 .npz 至多每 SAVE_INTERVAL 秒寫回一次，close 時補寫
+    - 像素比例在完整佈局時決定並固定，新增節點不會改變既有節點的像素座標；
+      節點數成長到上次完整佈局的 RELAYOUT_GROWTH 倍時，背景重新完整佈局，
+      完成後 epoch 遞增，持有舊座標的前端應重新取得完整圖
+    - 座標、比例與 epoch 存在 snapshot 旁的 .npz，重啟後沿用
+    """
+
+    def __init__(self, path: Path, background: bool = True) -> None:
+        """
+        建立 GraphLayout。
+
+        Args:
+            path: 座標快取檔路徑（.npz）。
+            background: 佈局是否在背景執行緒計算（False 時於 update 內同步計算）。
+        """
+        self.path: Path = Path(path)
+        self.background: bool = background
+        self.synced_version: Optional[int] = None
+
+        # 完整佈局的 epoch，以及該次佈局生效時的圖譜版本
+        self.epoch: int = 0
+        self.epoch_version: int = 0
+
+        self._names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._pos: np.ndarray = np.zeros((0, 2), dtype=np.float32)
+        self._scale: Optional[float] = None     # 單位座標 → 像素；None 表示尚無完整佈局
+        self._full_count: int = 0               # 上次完整佈局的節點數
+
+        # 讀取端使用的不可變檢視：(index, pos, scale)，更新完成後整份替換
+        self._view: Tuple[Dict[str, int], np.ndarray, Optional[float]] = ({}, self._pos, None)
+
+        self._dirty: bool = False               # 有尚未寫回 .npz 的增量佈局
+        self._saved_at: float = 0.0
+
+        # _update_lock 串行化佈局計算（背景執行緒或同步模式的呼叫端）；讀取端不取鎖
+        self._update_lock = threading.Lock()
+        self._builder_lock = threading.Lock()
+        self._builder: Optional[threading.Thread] = None
+        self._rng = np.random.default_rng(0)
+
+        self.load()
+
+    @property
+    def ready(self) -> bool:
+        """是否已有完整佈局（否則前端應自行佈局）。"""
+        return self._view[2] is not None
+
+    def position(self, node: str) -> Optional[Tuple[float, float]]:
+        """
+        取得節點的像素座標（比例固定，不隨節點數改變）。
+
+        Args:
+            node: 節點名稱。
+
+        Returns:
+            (x, y)；節點尚未佈局則為 None。
+        """
+        index, pos, scale = self._view
+        i = index.get(node)
+        if i is None or scale is None:
+            return None
+        x, y = pos[i]
+        return float(x * scale), float(y * scale)
+
+    def update(self, store: GraphStore) -> int:
+        """
+        讓佈局跟上圖譜。
+
+        背景模式下只在版本落後時喚起背景執行緒並立即返回，期間沿用上一份檢視；
+        同步模式（background=False）則在呼叫端完成佈局。
+
+        Args:
+            store: 圖譜儲存層。
+
+        Returns:
+            本次新佈局的節點數（背景計算時為 0）。
+        """
+        if store.version == self.synced_version:
+            return 0
+
+        if not self.background:
+            try:
+                return self._sync(store)
+            except Exception as e:
+                print(f"❌ GraphLayout 佈局失敗: {e}")
+                return 0
+
+        with self._builder_lock:
+            if self._builder is None or not self._builder.is_alive():
+                self._builder = threading.Thread(
+                    target=self._run_builder,
+                    args=(store,),
+                    name="graph-layout",
+                    daemon=True,
+                )
+                self._builder.start()
+        return 0
+
+    def wait(self) -> None:
+        """等待背景佈局結束。"""
+        builder = self._builder
+        if builder is not None:
+            builder.join()
+
+    def close(self) -> None:
+        """等待背景佈局結束，並寫回尚未存檔的增量佈局。"""
+        self.wait()
+        self.flush()
+
+    def flush(self) -> None:
+        """寫回尚未存檔的增量佈局。"""
+        with self._update_lock:
+            if self._dirty:
+                self.save()
+
+    def save(self) -> None:
+        """（持有 _update_lock）原子寫入座標快取。"""
+        tmp = self.path.with_name(self.path.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            names=np.array(self._names, dtype=str),
+            pos=self._pos,
+            meta=np.array(
+                [self._scale or 0.0, self._full_count, self.epoch, self.epoch_version],
+                dtype=np.float64,
+            ),
+        )
+        os.replace(tmp, self.path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def load(self) -> None:
+        """讀取座標快取（若存在）。"""
+        if not self.path.exists():
+            return
+
+        with np.load(self.path, allow_pickle=False) as data:
+            self._names = [str(n) for n in data["names"]]
+            self._pos = data["pos"].astype(np.float32)
+            meta = data["meta"] if "meta" in data.files else None
+        self._index = {n: i for i, n in enumerate(self._names)}
+
+        if meta is not None and meta[0] > 0:
+            self._scale = float(meta[0])
+            self._full_count = int(meta[1])
+            self.epoch, self.epoch_version = int(meta[2]), int(meta[3])
+        elif self._names:
+            # 舊版快取沒有記錄比例：以目前節點數固定下來
+            self._scale = LAYOUT_SCALE * float(np.sqrt(len(self._names)))
+            self._full_count = len(self._names)
+
+        self._view = (dict(self._index), self._pos, self._scale)
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _run_builder(self, store: GraphStore) -> None:
+        """背景執行緒：反覆佈局直到追上圖譜版本；期間寫入的新版本在下一輪補上。"""
+        try:
+            while store.version != self.synced_version:
+                self._sync(store)
+        except Exception as e:
+            print(f"❌ GraphLayout 佈局失敗: {e}")
+
+    def _sync(self, store: GraphStore) -> int:
+        """
+        做一輪佈局：尚無完整佈局時完整佈局，否則為新節點增量佈局，
+        節點數成長到 RELAYOUT_GROWTH 倍時再完整佈局一次。
+
+        Returns:
+            本輪新佈局的節點數（增量時為新節點數）。
+        """
+        with self._update_lock:
+            if self._scale is None:
+                return self._full_layout(store)
+
+            count = self._incremental_layout(store)
+            if len(self._names) >= RELAYOUT_GROWTH * max(self._full_count, 1):
+                self._full_layout(store)
+            return count
+
+    def _incremental_layout(self, store: GraphStore) -> int:
+        """（持有 _update_lock）只為尚未有座標的節點計算位置，完成後整份替換檢視。"""
+        version = store.version
+        new_nodes = [n for n in store.iter_nodes() if n not in self._index]
+        if not new_nodes:
+            self.synced_version = version
+            return 0
+
+        start = len(self._names)
+        for n in new_nodes:
+            self._index[n] = len(self._names)
+            self._names.append(n)
+
+        init = self._initial_positions(store, new_nodes)
+        pos = np.vstack([self._pos, init]).astype(np.float32)
+
+        movable = np.zeros(len(self._names), dtype=bool)
+        movable[start:] = True
+        edges = self._edge_array(store, new_nodes)
+        force_directed_layout(
+            pos,
+            edges,
+            movable=movable,
+            iterations=INCREMENTAL_ITERATIONS,
+        )
+
+        self._pos = pos
+        self._view = (dict(self._index), pos, self._scale)
+        self.synced_version = version
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+            self.save()
+        print(f"🗺️ GraphLayout：增量佈局 {len(new_nodes)} 個節點")
+        return len(new_nodes)
+
+    def _full_layout(self, store: GraphStore) -> int:
+        """
+        （持有 _update_lock）對整張圖做完整佈局，完成後整份替換並寫回。
+
+        計算期間新增的節點不在結果中；synced_version 設為開始時的版本，
+        下一輪會以增量方式補上。
+        """
+        version = store.version
+        names = list(store.iter_nodes())
+        if not names:
+            self.synced_version = version
+            return 0
+
+        index = {n: i for i, n in enumerate(names)}
+        rng = np.random.default_rng(0)
+        pos = (
+            rng.uniform(0.0, 1.0, size=(len(names), 2))
+            + rng.uniform(-0.02, 0.02, size=(len(names), 2))
+        ).astype(np.float32)
+
+        pairs = [
+            (index[t["subject"]], index[t["object"]])
+            for t in store.iter_edges()
+            if t["subject"] in index and t["object"] in index
+        ]
+        edges = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        force_directed_layout(pos, edges, iterations=LAYOUT_ITERATIONS)
+
+        self._names, self._index, self._pos = names, index, pos
+        self._scale = LAYOUT_SCALE * float(np.sqrt(len(names)))
+        self._full_count = len(names)
+        self.epoch += 1
+        self.epoch_version = store.version
+        self.synced_version = version
+        self._view = (dict(index), pos, self._scale)
+        self.save()
+        print(f"🗺️ GraphLayout：完整佈局 {len(names)} 個節點（epoch {self.epoch}）")
+        return len(names)
+
+    def _initial_positions(self, store: GraphStore, new_nodes: List[str]) -> np.ndarray:
+        """新節點的起始座標：已佈局鄰居的重心（沒有鄰居時取整體重心）。"""
+        jitter = self._rng.uniform(-0.02, 0.02, size=(len(new_nodes), 2))
+        placed = len(self._names) - len(new_nodes)
+        init = np.empty((len(new_nodes), 2), dtype=np.float32)
+        center = self._pos[:placed].mean(axis=0) if placed else np.array([0.5, 0.5])
+
+        for row, n in enumerate(new_nodes):
+            anchors = [
+                self._index[other]
+                for other in self._neighbors(store, n)
+                if self._index.get(other, placed) < placed
+            ]
+            init[row] = self._pos[anchors].mean(axis=0) if anchors else center
+
+        return init + jitter
+
+    def _edge_array(self, store: GraphStore, nodes: List[str]) -> np.ndarray:
+        """與 nodes 相連、且兩端都已有座標的邊的端點索引。"""
+        pairs: List[Tuple[int, int]] = []
+        for n in nodes:
+            i = self._index[n]
+            for other in self._neighbors(store, n):
+                j = self._index.get(other)
+                if j is not None:
+                    pairs.append((i, j))
+        return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+    @staticmethod
+    def _neighbors(store: GraphStore, node: str) -> List[str]:
+        return [t["object"] for t in store.search_related(node)] + [
+            t["subject"] for t in store.search_incoming(node)
+        ]
@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+
+# 一條邊：(subject, object, relation)
+Edge = Tuple[str, str, Optional[str]]
+
+MAGIC = b"GRSNAP\x00\x01"
+FORMAT_VERSION = 3   # v3：CSR 每列依 (端點, relation) 排序
+NO_REL = np.uint32(0xFFFFFFFF)   # relation 為 None 時的 id
+_ALIGN = 8
+
+
+def edge_key(relation: Optional[str]) -> str:
+    """
+    MultiDiGraph 的邊 key：同一對節點間每種 relation 各一條邊。
+
+    Args:
+        relation: 關係名稱（可為 None）。
+
+    Returns:
+        邊 key。
+    """
+    return "" if relation is None else relation
+
+
+def write_snapshot(
+    path: Path,
+    nodes: Iterable[str],
+    edges: Iterable[Edge],
+    wal_seq: int = 0,
+) -> None:
+    """
+    將圖寫成可 memory-map 的二進位 snapshot。
+
+    檔案結構：
+    - MAGIC + header 長度（uint64）+ JSON header（陣列名稱、dtype、offset、長度）
+    - 字串表：所有節點名稱（依字典序，id 即排序位置）後接所有 relation 字串，
+      每個字串只存一次（str_offsets + str_blob）
+    - 出邊 CSR：out_indptr / out_dst / out_rel，每列依 (dst, relation) 排序
+    - 入邊 CSR：in_indptr / in_src / in_rel，每列依 (src, relation) 排序
+    - relation 倒排：rel_indptr / rel_edge（relation → 出邊陣列中的位置）
+
+    nodes 與 edges 皆只走訪一次：名稱先依首次出現給暫時 id，邊直接以
+    uint32 (src, dst, rel) 累積在緊湊陣列中（每條邊 12 bytes，不保留 tuple），
+    最後以 numpy 一次重排成字典序 id 並建立 CSR。
+
+    寫入採「暫存檔 → fsync → os.replace」，不會留下半份 snapshot。
+    path 不應是目前正被 map 的檔案（Windows 無法取代 map 中的檔案），
+    GraphStore 每次 compaction 都寫到新的檔名。
+
+    Args:
+        path: snapshot 路徑。
+        nodes: 節點名稱（可重複，會去重；邊上的端點會自動補入）。
+        edges: 邊清單（可為 generator）。
+        wal_seq: 此 snapshot 涵蓋到的 WAL 序號。
+    """
+    node_id: Dict[str, int] = {}
+    rel_id: Dict[str, int] = {}
+
+    def _nid(name: str) -> int:
+        i = node_id.get(name)
+        if i is None:
+            i = node_id[name] = len(node_id)
+        return i
+
+    for n in nodes:
+        _nid(n)
+
+    src_ids, dst_ids, rel_ids = array("I"), array("I"), array("I")
+    for s, o, r in edges:
+        src_ids.append(_nid(s))
+        dst_ids.append(_nid(o))
+        if r is None:
+            rel_ids.append(int(NO_REL))
+        else:
+            rid = rel_id.get(r)
+            if rid is None:
+                rid = rel_id[r] = len(rel_id)
+            rel_ids.append(rid)
+
+    # --- 暫時 id → 字典序 id ---
+    node_names: List[str] = sorted(node_id)
+    rel_names: List[str] = sorted(rel_id)
+    n = len(node_names)
+
+    node_rank = np.empty(n, dtype=np.uint32)
+    node_rank[[node_id[name] for name in node_names]] = np.arange(n, dtype=np.uint32)
+    rel_rank = np.empty(len(rel_names), dtype=np.uint32)
+    rel_rank[[rel_id[r] for r in rel_names]] = np.arange(n, n + len(rel_names), dtype=np.uint32)
+    del node_id, rel_id
+
+    m = len(src_ids)
+    src = node_rank[np.frombuffer(src_ids, dtype=np.uint32)] if m else np.zeros(0, np.uint32)
+    dst = node_rank[np.frombuffer(dst_ids, dtype=np.uint32)] if m else np.zeros(0, np.uint32)
+    rel = np.frombuffer(rel_ids, dtype=np.uint32).copy() if m else np.zeros(0, np.uint32)
+    has = rel != NO_REL
+    rel[has] = rel_rank[rel[has]]
+    del src_ids, dst_ids, rel_ids
+
+    # --- 字串表 ---
+    encoded = [s.encode("utf-8") for s in node_names + rel_names]
+    str_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    if encoded:
+        str_offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+    str_blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    del encoded
+
+    # --- 邊：列內排序，查詢單一邊可二分搜尋 ---
+    out_order = np.lexsort((rel, dst, src))
+    in_order = np.lexsort((rel, src, dst))
+    out_indptr = _indptr(src, n)
+    in_indptr = _indptr(dst, n)
+
+    # relation 倒排：以 out 排序後的位置為 posting，None relation 不建索引
+    out_rel = rel[out_order]
+    has_rel = np.flatnonzero(out_rel != NO_REL).astype(np.uint32)
+    local_rel = (out_rel[has_rel] - n).astype(np.uint32)
+    rel_order = np.argsort(local_rel, kind="stable")
+    rel_indptr = _indptr(local_rel, len(rel_names))
+
+    arrays: Dict[str, np.ndarray] = {
+        "str_offsets": str_offsets,
+        "str_blob": str_blob,
+        "out_indptr": out_indptr,
+        "out_dst": dst[out_order],
+        "out_rel": out_rel,
+        "in_indptr": in_indptr,
+        "in_src": src[in_order],
+        "in_rel": rel[in_order],
+        "rel_indptr": rel_indptr,
+        "rel_edge": has_rel[rel_order],
+    }
+
+    _write_arrays(
+        path,
+        arrays,
+        {
+            "version": FORMAT_VERSION,
+            "node_count": n,
+            "relation_count": len(rel_names),
+            "edge_count": m,
+            "wal_seq": wal_seq,
+            "rows_sorted": True,
+        },
+    )
+
+
+class GraphSnapshot:
+    """
+    GraphSnapshot 以 memory-map 方式開啟 write_snapshot 產生的檔案，
+    直接在 CSR 陣列上查詢，不建立 NetworkX 物件。
+
+    - 開檔只解析 header，成本與圖大小無關
+    - 節點查找為字串表上的二分搜尋（O(log n)）
+    - 出邊 / 入邊查詢為 O(degree)
+    - 單一邊是否存在為 O(log degree)（v3 起每列已排序；舊版以向量化掃描）
+    """
+
+    def __init__(self, path: Path) -> None:
+        """
+        開啟 snapshot。
+
+        Args:
+            path: snapshot 路徑。
+
+        Raises:
+            ValueError: 檔案格式不符。
+        """
+        self.path: Path = Path(path)
+        self._mm = np.memmap(self.path, dtype=np.uint8, mode="r")
+
+        if bytes(self._mm[: len(MAGIC)]) != MAGIC:
+            raise ValueError(f"不是 GraphSnapshot 檔案：{self.path}")
+
+        (header_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(bytes(self._mm[start : start + header_len]).decode("utf-8"))
+
+        self.node_count: int = int(header["node_count"])
+        self.relation_count: int = int(header.get("relation_count", 0))
+        self.edge_count: int = int(header["edge_count"])
+        self.wal_seq: int = int(header.get("wal_seq", 0))
+        self.rows_sorted: bool = bool(header.get("rows_sorted", False))
+
+        self._arrays: Dict[str, np.ndarray] = {
+            name: np.frombuffer(self._mm, dtype=np.dtype(dtype), count=count, offset=offset)
+            for name, (dtype, offset, count) in header["arrays"].items()
+        }
+
+        self._str_offsets = self._arrays["str_offsets"]
+        self._str_blob = self._arrays["str_blob"]
+
+    # ----------------------------------------------------------
+    # 字串表
+    # ----------------------------------------------------------
+    def string(self, i: int) -> str:
+        """取出字串表第 i 個字串。"""
+        a, b = int(self._str_offsets[i]), int(self._str_offsets[i + 1])
+        return bytes(self._str_blob[a:b]).decode("utf-8")
+
+    def relation(self, rel_id: int) -> Optional[str]:
+        """將 relation id 轉回字串（NO_REL 轉為 None）。"""
+        return None if rel_id == NO_REL else self.string(int(rel_id))
+
+    def node_id(self, name: str) -> Optional[int]:
+        """
+        以二分搜尋找出節點 id。
+
+        Args:
+            name: 節點名稱。
+
+        Returns:
+            節點 id；不存在則為 None。
+        """
+        return self._find(name, 0, self.node_count)
+
+    def has_node(self, name: str) -> bool:
+        return self.node_id(name) is not None
+
+    # ----------------------------------------------------------
+    # 查詢
+    # ----------------------------------------------------------
+    def out_edges(self, name: str) -> Iterator[Tuple[str, Optional[str]]]:
+        """列出節點的出邊 (object, relation)。"""
+        yield from self._adjacent(name, "out_indptr", "out_dst", "out_rel")
+
+    def in_edges(self, name: str) -> Iterator[Tuple[str, Optional[str]]]:
+        """列出節點的入邊 (subject, relation)。"""
+        yield from self._adjacent(name, "in_indptr", "in_src", "in_rel")
+
+    def has_edge(self, subject: str, obj: str, relation: Optional[str]) -> bool:
+        """
+        判斷邊 (subject, relation, object) 是否存在。
+
+        Args:
+            subject: subject 節點。
+            obj: object 節點。
+            relation: 關係名稱（可為 None）。
+
+        Returns:
+            是否存在。
+        """
+        s = self.node_id(subject)
+        if s is None:
+            return False
+        o = self.node_id(obj)
+        if o is None:
+            return False
+
+        if relation is None:
+            rid = int(NO_REL)
+        else:
+            found = self._find(relation, self.node_count, self.node_count + self.relation_count)
+            if found is None:
+                return False
+            rid = found
+
+        indptr = self._arrays["out_indptr"]
+        a, b = int(indptr[s]), int(indptr[s + 1])
+        dst = self._arrays["out_dst"][a:b]
+        rel = self._arrays["out_rel"][a:b]
+
+        if self.rows_sorted:
+            lo = int(np.searchsorted(dst, o, side="left"))
+            hi = int(np.searchsorted(dst, o, side="right"))
+            return bool((rel[lo:hi] == rid).any())
+        return bool(((dst == o) & (rel == rid)).any())
+
+    def by_relation(self, relation: str) -> Iterator[Tuple[str, str]]:
+        """
+        列出帶有指定 relation 的所有邊 (subject, object)，成本 O(結果數)。
+
+        Args:
+            relation: 關係名稱。
+        """
+        rel_indptr = self._arrays.get("rel_indptr")
+        if rel_indptr is None:
+            # 舊版（v1）snapshot 沒有 relation 倒排，只能全表掃描
+            for s, o, r in self.iter_edges():
+                if r == relation:
+                    yield s, o
+            return
+
+        start = self.node_count
+        rid = self._find(relation, start, start + self.relation_count)
+        if rid is None:
+            return
+
+        out_indptr = self._arrays["out_indptr"]
+        out_dst = self._arrays["out_dst"]
+        rel_edge = self._arrays["rel_edge"]
+
+        local = rid - start
+        for j in range(int(rel_indptr[local]), int(rel_indptr[local + 1])):
+            pos = int(rel_edge[j])
+            src = int(np.searchsorted(out_indptr, pos, side="right")) - 1
+            yield self.string(src), self.string(int(out_dst[pos]))
+
+    def iter_nodes(self, start: int = 0) -> Iterator[str]:
+        """依 id（即字典序）列出節點，從第 start 個開始。"""
+        for i in range(start, self.node_count):
+            yield self.string(i)
+
+    def bisect_node(self, name: str, inclusive: bool = False) -> int:
+        """
+        節點名稱在字典序中的位置。
+
+        Args:
+            name: 節點名稱（不必存在）。
+            inclusive: True 時回傳第一個 >= name 的 id，否則為第一個 > name 的 id。
+
+        Returns:
+            節點 id（可能等於 node_count）。
+        """
+        lo, hi = 0, self.node_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = self.string(mid)
+            if probe < name or (probe == name and not inclusive):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def iter_edges(self) -> Iterator[Edge]:
+        indptr = self._arrays["out_indptr"]
+        dst = self._arrays["out_dst"]
+        rel = self._arrays["out_rel"]
+        for i in range(self.node_count):
+            a, b = int(indptr[i]), int(indptr[i + 1])
+            if a == b:
+                continue
+            s = self.string(i)
+            for j in range(a, b):
+                yield s, self.string(int(dst[j])), self.relation(rel[j])
+
+    def to_networkx(self) -> nx.MultiDiGraph:
+        """將整份 snapshot 轉為 NetworkX MultiDiGraph（會完整載入記憶體）。"""
+        g = nx.MultiDiGraph()
+        g.add_nodes_from(self.iter_nodes(), type="entity")
+        for s, o, r in self.iter_edges():
+            g.add_edge(s, o, key=edge_key(r), relation=r)
+        return g
+
+    def _find(self, name: str, lo: int, hi: int) -> Optional[int]:
+        """在字串表 [lo, hi) 的已排序區段上二分搜尋。"""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = self.string(mid)
+            if probe < name:
+                lo = mid + 1
+            elif probe > name:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def _adjacent(
+        self,
+        name: str,
+        indptr_key: str,
+        other_key: str,
+        rel_key: str,
+    ) -> Iterator[Tuple[str, Optional[str]]]:
+        i = self.node_id(name)
+        if i is None:
+            return
+
+        indptr = self._arrays[indptr_key]
+        other = self._arrays[other_key]
+        rel = self._arrays[rel_key]
+
+        for j in range(int(indptr[i]), int(indptr[i + 1])):
+            yield self.string(int(other[j])), self.relation(rel[j])
+
+
+# ----------------------------------------------------------
+# 輔助
+# ----------------------------------------------------------
+def _indptr(keys: np.ndarray, n: int) -> np.ndarray:
+    """依 keys（列號）建立 CSR 的 indptr。"""
+    indptr = np.zeros(n + 1, dtype=np.uint64)
+    if n:
+        indptr[1:] = np.cumsum(np.bincount(keys, minlength=n), dtype=np.uint64)
+    return indptr
+
+
+def _write_arrays(path: Path, arrays: Dict[str, np.ndarray], meta: Dict[str, object]) -> None:
+    # 先算出每個陣列的 offset，header 長度固定後再寫入
+    layout: Dict[str, List[object]] = {}
+    header = dict(meta, arrays=layout)
+
+    def _encode_header() -> bytes:
+        raw = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        return raw + b" " * (-(len(MAGIC) + 8 + len(raw)) % _ALIGN)
+
+    # header 長度取決於 offset 位數，反覆計算直到穩定
+    for name, arr in arrays.items():
+        layout[name] = [arr.dtype.str, 0, int(arr.size)]
+    while True:
+        offset = len(MAGIC) + 8 + len(_encode_header())
+        changed = False
+        for name, arr in arrays.items():
+            if layout[name][1] != offset:
+                layout[name][1] = offset
+                changed = True
+            offset += arr.nbytes + (-arr.nbytes % _ALIGN)
+        if not changed:
+            break
+
+    raw_header = _encode_header()
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(raw_header)))
+        f.write(raw_header)
+        for arr in arrays.values():
+            data = np.ascontiguousarray(arr).tobytes()
+            f.write(data)
+            f.write(b"\x00" * (-len(data) % _ALIGN))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, path)
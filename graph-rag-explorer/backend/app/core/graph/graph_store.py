@@ -1,13 +1,33 @@
 from __future__ import annotations
 
 import json
+import os
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional, TypedDict
+from collections import deque
+from glob import escape as glob_escape
+import heapq
+from bisect import bisect_left, bisect_right
+from itertools import islice, zip_longest
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, TypedDict, Union
 
 import networkx as nx
 from networkx.readwrite import json_graph
 
 from app.config.paths import GRAPH_STORE_PATH
+from app.core.graph.graph_journal import GraphJournal, JournalRecord, fsync_dir
+from app.core.graph.graph_snapshot import Edge, GraphSnapshot, edge_key, write_snapshot
+from app.core.graph.provenance_index import EdgeKey, ProvenanceIndex, Source
+
+
+# ===== 可調參數 =====
+WAL_FSYNC_EVERY    = 32     # 累積幾筆 WAL 紀錄後 fsync
+WAL_FSYNC_INTERVAL = 1.0    # 距上次 fsync 超過幾秒，下一筆 WAL 紀錄即 fsync
+COMPACT_EVERY      = 256    # WAL 累積幾筆紀錄後觸發背景 compaction
+CHANGE_LOG_SIZE    = 1024   # 保留最近幾次圖譜變更，供 changes_since 增量查詢
+PROVENANCE_FOLD_EVERY = 32  # 出處追加檔累積幾行後，於 snapshot 寫入時併回出處檔
+
+SNAPSHOT_FORMATS = ("json", "binary")
 
 
 class Triple(TypedDict):
@@ -19,47 +39,295 @@ class Triple(TypedDict):
     object: str
 
 
+class SourcedTriple(Triple, total=False):
+    """
+    帶有出處的三元組：doc_id 為來源文件、chunk_id 為來源 chunk
+    （與向量 / 關鍵字索引相同的內容 hash id）。
+    """
+    doc_id: str
+    chunk_id: str
+
+
+class GraphChange(TypedDict):
+    """
+    單次 add_triples 造成的圖譜變更。
+    """
+    version: int
+    nodes: List[str]
+    triples: List[Triple]
+
+
+def _edge_order(edge: Tuple[str, Optional[str]]) -> Tuple[str, bool, str]:
+    """同一 subject 下出邊 (object, relation) 的排序鍵：依 object、再依 relation（None 最後）。"""
+    o, rel = edge
+    return o, rel is None, rel or ""
+
+
 class GraphStore:
     """
     GraphStore 負責知識圖譜的儲存與查詢。
 
-    - 內部使用 NetworkX DiGraph
+    - 內部使用 NetworkX MultiDiGraph：同一對節點間不同 relation 各自成邊，
+      相同 (subject, predicate, object) 不重複
     - 對外僅暴露「三元組層級」的操作
+
+    索引（隨 add_triples 增量維護）：
+    - predicate → 邊：`_by_relation`，search_by_relation 為 O(結果數)
+    - object → 入邊 subject：MultiDiGraph 本身的 predecessor 鄰接表，
+      search_incoming 為 O(入度)
+    - 出處：邊 / 節點 → 來源 (doc id, chunk id)，以及 entity → chunk 的 postings
+      （ProvenanceIndex），chunks_for_entities 為 O(postings)
+
+    持久化（journaled 模式，預設）：
+    - add_triples 只把新三元組追加到 WAL（`<path>.wal`），不重寫整份圖
+    - WAL 累積到 compact_every 筆時，背景執行緒把圖寫成 snapshot
+      並截短 WAL
+    - load 時讀 snapshot，再重播 snapshot 尚未涵蓋的 WAL 紀錄
+    - 出處另存於 `<path>.prov.json`（記錄涵蓋的 WAL 序號），因此 binary snapshot
+      也保有出處；每次寫 snapshot 只把新出處追加一行到 `<path>.prov.log`，
+      累積 PROVENANCE_FOLD_EVERY 行後才由檔案重建、整份改寫 `.prov.json`
+      並清空追加檔（在寫 snapshot 的執行緒中進行，不持有 _lock）
+
+    鎖順序：
+    - 兩把鎖同時持有時一律先 _snapshot_lock 再 _lock
+    - 持有 _lock 時不得呼叫 save / compact（兩者會取 _snapshot_lock）；
+      add_triples 在鎖內只決定是否需要落盤，釋放 _lock 後才觸發
+
+    崩潰安全：
+    - snapshot 與 WAL 改寫皆為「寫暫存檔 → fsync → os.replace」
+    - snapshot 記錄已涵蓋的 WAL 序號，重播時會略過，不會重複套用
+    - WAL 尾端的半截紀錄以 CRC 偵測並捨棄
+
+    snapshot 格式：
+    - "json"：NetworkX node-link JSON（`path`）
+    - "binary"：可 memory-map 的 CSR snapshot（`<stem>.<WAL 序號>.bin`），
+      載入時只 map 序號最大的檔案，記憶體中的圖僅保存 snapshot 之後的增量；
+      每次 compaction 寫成新檔名並改 map 新檔後才刪除舊檔，不會取代 map 中的
+      檔案（Windows 不允許）；舊檔仍被其他程式 map 而刪不掉時留待下次清理。
+      各查詢方法直接查詢 CSR 並合併增量。第一次存取 `graph` 屬性時才會
+      完整轉為 NetworkX（之後維持在記憶體中）。
     """
 
-    def __init__(self, path: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        journaled: bool = True,
+        compact_every: int = COMPACT_EVERY,
+        background_compaction: bool = True,
+        snapshot_format: str = "json",
+    ) -> None:
         """
         建立 GraphStore。
 
         Args:
             path: 圖譜儲存路徑，None 則使用預設 GRAPH_STORE_PATH。
+            journaled: 是否使用 WAL；False 時每次 add_triples 皆完整重寫 snapshot。
+            compact_every: WAL 累積幾筆紀錄後觸發 compaction。
+            background_compaction: compaction 是否在背景執行緒進行。
+            snapshot_format: snapshot 格式，"json" 或 "binary"。
+
+        Raises:
+            ValueError: snapshot_format 不支援。
         """
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"不支援的 snapshot_format: {snapshot_format!r}")
+
         self.path: Path = Path(path) if path else GRAPH_STORE_PATH
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.wal_path: Path = self.path.with_name(self.path.name + ".wal")
+        self.snapshot_format: str = snapshot_format
+        # binary 模式下為目前 map 中的檔案，load / compaction 時更新
+        self.snapshot_path: Path = (
+            self.path.with_suffix(".bin") if snapshot_format == "binary" else self.path
+        )
+        self.provenance_path: Path = self.path.with_name(self.path.name + ".prov.json")
+        self.provenance_log_path: Path = self.path.with_name(self.path.name + ".prov.log")
+
+        self.compact_every: int = compact_every
+        self.background_compaction: bool = background_compaction
+
+        # binary 模式下：_base 為 memory-mapped snapshot，_graph 只保存其後的增量
+        self._graph: nx.MultiDiGraph = nx.MultiDiGraph()
+        self._by_relation: Dict[Optional[str], Dict[Tuple[str, str], None]] = {}
+        self._base: Optional[GraphSnapshot] = None
+        self._materialized: bool = False
+        self._version: int = 0
+        self._changes: Deque[GraphChange] = deque(maxlen=CHANGE_LOG_SIZE)
+        self._changes_floor: int = 0            # changes 可回答的最舊 since
+        self._provenance: ProvenanceIndex = ProvenanceIndex()
+        self._sorted_nodes_cache: Optional[Tuple[nx.MultiDiGraph, int, List[str]]] = None
+
+        self._lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()  # 序列化 snapshot 寫入
+        self._seq: int = 0                      # 最後一筆 WAL 紀錄的序號
+        self._snapshot_seq: int = 0             # 目前 snapshot 涵蓋到的序號
+        self._provenance_seq: int = 0           # 出處檔 + 追加檔涵蓋到的序號
+        self._provenance_log_lines: int = 0     # 追加檔中尚未併入出處檔的行數
+        self._tail: List[JournalRecord] = []    # snapshot 尚未涵蓋的紀錄
+        self._compactor: Optional[threading.Thread] = None
+        self._journal: Optional[GraphJournal] = (
+            GraphJournal(
+                self.wal_path,
+                fsync_every=WAL_FSYNC_EVERY,
+                fsync_interval=WAL_FSYNC_INTERVAL,
+            )
+            if journaled
+            else None
+        )
 
-        self.graph: nx.DiGraph = nx.DiGraph()
         self.load()
 
-    def add_triples(self, triples: List[Triple]) -> None:
+    @property
+    def graph(self) -> nx.MultiDiGraph:
         """
-        將多個三元組加入圖譜並立即儲存。
+        完整的 NetworkX 圖。
+
+        binary 模式下第一次存取會把 memory-mapped snapshot 與增量合併
+        成 MultiDiGraph，之後不再回到 map 模式。
+        """
+        with self._lock:
+            if self._base is not None:
+                base = self._base.to_networkx()
+                base.add_nodes_from(self._graph.nodes(data=True))
+                base.add_edges_from(self._graph.edges(keys=True, data=True))
+                self._graph = base
+                self._base = None
+                self._reindex()
+            self._materialized = True
+            return self._graph
+
+    @property
+    def version(self) -> int:
+        """
+        圖譜版本：單調遞增，只在 add_triples 實際改變圖時前進。
+
+        版本取自該次寫入的 WAL 序號，會隨 snapshot / WAL 持久化，
+        因此重啟後仍延續（不會倒退）。供查詢快取與增量查詢使用。
+        """
+        return self._version
+
+    @property
+    def provenance_version(self) -> int:
+        """出處版本：每次新增出處（含既有邊的新出處）即前進，不持久化。"""
+        return self._provenance.version
+
+    def changes_since(self, since: int) -> Optional[List[GraphChange]]:
+        """
+        取出版本 since 之後的所有變更。
+
+        Args:
+            since: 呼叫端目前持有的版本。
+
+        Returns:
+            依版本排序的變更清單；若變更紀錄已被截斷（since 太舊，
+            或早於本次載入）或 since 大於目前版本，回傳 None，
+            呼叫端應改取完整圖譜。
+        """
+        with self._lock:
+            if since > self._version or since < self._changes_floor:
+                return None
+            return [c for c in self._changes if c["version"] > since]
+
+    def add_triples(self, triples: List[SourcedTriple]) -> None:
+        """
+        將多個三元組加入圖譜並寫入 WAL（非 journaled 模式則立即儲存）。
+
+        三元組若帶有 doc_id / chunk_id，會一併記錄出處；
+        已存在的邊也會累加新的出處。
 
         Args:
             triples: 三元組清單。
         """
+        valid: List[SourcedTriple] = []
         for t in triples:
-            s: Optional[str] = t.get("subject")
-            p: Optional[str] = t.get("predicate")
-            o: Optional[str] = t.get("object")
-
-            if not s or not o:
+            if not (t.get("subject") and t.get("object")):
                 continue
+            v: SourcedTriple = {
+                "subject": t["subject"],
+                "predicate": t.get("predicate"),
+                "object": t["object"],
+            }
+            if t.get("chunk_id"):
+                v["chunk_id"] = t["chunk_id"]
+                v["doc_id"] = t.get("doc_id") or ""
+            valid.append(v)
+
+        # 鎖內只套用變更並決定是否落盤；save / compact 須在釋放 _lock 後呼叫
+        needs_compact = False
+        with self._lock:
+            new_nodes: Dict[str, None] = {}
+            new_triples: List[Triple] = []
+
+            for t in valid:
+                fresh = [n for n in (t["subject"], t["object"]) if not self.has_node(n)]
+                self._provenance.add(t)  # type: ignore[arg-type]
+                if self._apply(t):
+                    new_nodes.update(dict.fromkeys(fresh))
+                    new_triples.append(
+                        {"subject": t["subject"], "predicate": t["predicate"], "object": t["object"]}
+                    )
+
+            if valid:
+                self._seq += 1
+                if new_triples:
+                    self._record_change(list(new_nodes), new_triples)
+
+                # 非 journaled 模式也保留：下一次 snapshot 只追加這些紀錄的出處
+                self._tail.append((self._seq, valid))  # type: ignore[arg-type]
+                if self._journal is not None:
+                    self._journal.append(self._seq, valid)  # type: ignore[arg-type]
+                    needs_compact = len(self._tail) >= self.compact_every
+
+        if self._journal is None:
+            self.save()
+        elif needs_compact:
+            self.compact(wait=not self.background_compaction)
+
+    def edge_sources(self, subject: str, predicate: Optional[str], obj: str) -> List[Source]:
+        """
+        查詢單一邊的出處。
+
+        Args:
+            subject: subject 節點。
+            predicate: 關係名稱。
+            obj: object 節點。
+
+        Returns:
+            出處清單 [{"doc_id", "chunk_id"}, ...]（依出現順序）。
+        """
+        with self._lock:
+            return self._provenance.edge_sources(subject, predicate, obj)
+
+    def node_sources(self, node: str, limit: Optional[int] = None) -> List[Source]:
+        """
+        查詢節點（作為 subject 或 object）的出處。
+
+        Args:
+            node: 節點名稱。
+            limit: 最多回傳筆數，None 表示不限制。
+
+        Returns:
+            出處清單（依出現順序）。
+        """
+        with self._lock:
+            return self._provenance.node_sources(node, limit)
 
-            self.graph.add_node(s, type="entity")
-            self.graph.add_node(o, type="entity")
-            self.graph.add_edge(s, o, relation=p)
+    def chunks_for_entities(self, entities: Sequence[str], limit: int = 5) -> List[str]:
+        """
+        透過 entity → chunk postings 找出與這些 entity 相關的 chunk。
 
-        self.save()
+        成本與 postings 長度成正比，不需要向量檢索。
+
+        Args:
+            entities: 節點名稱。
+            limit: 最多回傳筆數。
+
+        Returns:
+            chunk id 清單，連到越多 entity 的 chunk 越前面。
+        """
+        with self._lock:
+            return self._provenance.chunks_for_entities(entities, limit)
 
     def search_related(self, node: str) -> List[Triple]:
         """
@@ -71,39 +339,646 @@ class GraphStore:
         Returns:
             與該節點直接相連的三元組清單。
         """
-        if node not in self.graph:
-            return []
+        return self._adjacent(node, outgoing=True)
 
-        result: List[Triple] = []
+    def search_incoming(self, node: str) -> List[Triple]:
+        """
+        查詢指向指定節點的所有關係（node 作為 object）。
 
-        for neighbor in self.graph.neighbors(node): # type: ignore
-            rel: Optional[str] = self.graph.edges[node, neighbor].get("relation")
-            result.append(
-                {
-                    "subject": node,
-                    "predicate": rel,
-                    "object": neighbor,
-                }
-            )
+        Args:
+            node: 節點名稱。
 
-        return result
+        Returns:
+            以該節點為 object 的三元組清單。
+        """
+        return self._adjacent(node, outgoing=False)
+
+    def neighborhood(
+        self,
+        node: str,
+        hops: int = 2,
+        *,
+        direction: str = "both",
+        fanout: Union[int, Sequence[int]] = 20,
+        max_edges: int = 200,
+    ) -> Dict[str, Any]:
+        """
+        以 BFS 取出節點的 k-hop 鄰域子圖。
+
+        每一層中，每個節點最多展開 fanout 條邊（可逐層指定；direction="both"
+        時出邊與入邊交錯取用），
+        全部結果最多 max_edges 條邊；超過上限即停止並標記 truncated。
+        成本受 fanout 與 max_edges 約束，不隨節點度數成長。
 
+        Args:
+            node: 起點節點名稱。
+            hops: 展開層數。
+            direction: "out"、"in" 或 "both"。
+            fanout: 每個節點每層最多展開的邊數；序列則依層指定（不足者沿用最後一個）。
+            max_edges: 子圖最多邊數。
+
+        Returns:
+            {"nodes": [...], "triples": [...], "truncated": bool}；
+            起點不存在時 nodes 為空。
+
+        Raises:
+            ValueError: direction 不支援，或 fanout 為空、含有小於 1 的值。
+        """
+        if direction not in ("out", "in", "both"):
+            raise ValueError(f"不支援的 direction: {direction!r}")
+
+        per_hop: List[int] = [fanout] if isinstance(fanout, int) else list(fanout)
+        if not per_hop:
+            raise ValueError("fanout 不可為空")
+        if any(f < 1 for f in per_hop):
+            raise ValueError(f"fanout 必須大於等於 1：{per_hop}")
+
+        if not self.has_node(node):
+            return {"nodes": [], "triples": [], "truncated": False}
+
+        visited: Dict[str, None] = {node: None}
+        seen_edges = set()
+        triples: List[Triple] = []
+        frontier: List[str] = [node]
+        truncated = False
+
+        for hop in range(hops):
+            limit = per_hop[min(hop, len(per_hop) - 1)]
+            next_frontier: List[str] = []
+
+            for u in frontier:
+                out_edges: List[Tuple[Triple, str]] = []
+                in_edges: List[Tuple[Triple, str]] = []
+                if direction in ("out", "both"):
+                    out_edges = [(t, t["object"]) for t in self._adjacent(u, True, limit)]
+                if direction in ("in", "both"):
+                    in_edges = [(t, t["subject"]) for t in self._adjacent(u, False, limit)]
+
+                # 兩個方向交錯取用，fanout 不會全被出邊佔滿
+                candidates = [
+                    c
+                    for pair in zip_longest(out_edges, in_edges)
+                    for c in pair
+                    if c is not None
+                ]
+
+                for t, other in candidates[:limit]:
+                    edge = (t["subject"], t["predicate"], t["object"])
+                    if edge in seen_edges:
+                        continue
+                    if len(triples) >= max_edges:
+                        truncated = True
+                        break
+                    seen_edges.add(edge)
+                    triples.append(t)
+                    if other not in visited:
+                        visited[other] = None
+                        next_frontier.append(other)
+
+                if truncated:
+                    break
+
+            if truncated or not next_frontier:
+                break
+            frontier = next_frontier
+
+        return {"nodes": list(visited), "triples": triples, "truncated": truncated}
+
+    def iter_nodes(self, after: Optional[str] = None) -> Iterator[str]:
+        """
+        依名稱字典序逐一列出節點，不建立完整清單。
+
+        以名稱為 keyset：分頁時傳入前一頁最後一個名稱即可接續。
+        期間的寫入或 compaction（會重排 snapshot 節點表）都不會造成
+        略過或重複；排在 after 之前的新節點不會出現在本次走訪中。
+
+        Args:
+            after: 只列出名稱大於 after 的節點；None 表示從頭開始。
+
+        Yields:
+            節點名稱。
+        """
+        return self._iter_sorted_nodes(after, inclusive=False)
+
+    def iter_edges(self, after: Optional[EdgeKey] = None) -> Iterator[Triple]:
+        """
+        依 (subject, object, predicate) 排序逐一列出邊，記憶體用量只與單一節點的出度有關。
+
+        以邊本身為 keyset（predicate 為 None 者排在同一對節點的最後），
+        與 iter_nodes 相同，寫入或 compaction 不會造成略過或重複。
+
+        Args:
+            after: 只列出排在 (subject, predicate, object) 之後的邊；None 表示從頭開始。
+
+        Yields:
+            三元組。
+        """
+        first = after[0] if after is not None else None
+        after_key = _edge_order((after[2], after[1])) if after is not None else None
+
+        for s in self._iter_sorted_nodes(first, inclusive=True):
+            with self._lock:
+                base = self._base
+                delta = (
+                    sorted(
+                        ((o, rel) for _, o, rel in self._graph.out_edges(s, data="relation")),
+                        key=_edge_order,
+                    )
+                    if s in self._graph
+                    else []
+                )
+
+            base_edges: Iterator[Tuple[str, Optional[str]]] = iter(())
+            if base is not None:
+                base_edges = base.out_edges(s)
+                if not base.rows_sorted:
+                    base_edges = iter(sorted(base_edges, key=_edge_order))
+
+            last = None
+            for o, rel in heapq.merge(base_edges, delta, key=_edge_order):
+                key = _edge_order((o, rel))
+                if key == last:
+                    continue
+                last = key
+                if s == first and after_key is not None and key <= after_key:
+                    continue
+                yield {"subject": s, "predicate": rel, "object": o}
+
+    def has_node(self, node: str) -> bool:
+        """節點是否存在（不會觸發 binary snapshot 轉為 NetworkX）。"""
+        with self._lock:
+            if node in self._graph:
+                return True
+            base = self._base
+        return base is not None and base.has_node(node)
+
+    def search_by_relation(
+        self,
+        predicate: str,
+        limit: Optional[int] = None,
+    ) -> List[Triple]:
+        """
+        查詢所有帶有指定 predicate 的三元組，成本與結果數成正比。
+
+        Args:
+            predicate: 關係名稱。
+            limit: 最多回傳筆數，None 表示不限制。
+
+        Returns:
+            三元組清單。
+        """
+        with self._lock:
+            base = self._base
+            delta_pairs = list(islice(self._by_relation.get(predicate, {}), limit))
+
+        def _pairs() -> Iterator[Tuple[str, str]]:
+            yield from delta_pairs
+            if base is not None:
+                seen = set(delta_pairs)
+                for pair in base.by_relation(predicate):
+                    if pair not in seen:
+                        yield pair
+
+        return [
+            {"subject": s, "predicate": predicate, "object": o}
+            for s, o in islice(_pairs(), limit)
+        ]
+
+    # ----------------------------------------------------------
+    # 持久化
+    # ----------------------------------------------------------
     def save(self) -> None:
         """
-        將目前圖譜序列化為 JSON 儲存。
+        同步將目前圖譜寫成 snapshot，並截短 WAL。
+        """
+        with self._lock:
+            base, delta, seq = self._base, self._graph.copy(), self._seq
+            records, provenance = self._provenance_delta()
+        self._write_snapshot(base, delta, seq, records, provenance)
+
+    def compact(self, wait: bool = False) -> None:
         """
-        data = json_graph.node_link_data(self.graph, edges="links")
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        將目前圖譜寫成 snapshot，並從 WAL 移除已涵蓋的紀錄。
+
+        圖的複製在鎖內完成，序列化與寫檔在鎖外進行，
+        因此背景 compaction 期間 add_triples 仍可持續寫入。
+
+        Args:
+            wait: True 則同步執行；False 則交給背景執行緒（已有進行中則略過）。
+        """
+        if wait:
+            self.save()
+            return
+
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self._compact_worker,
+                args=(self._base, self._graph.copy(), self._seq, *self._provenance_delta()),
+                name="graph-store-compactor",
+                daemon=True,
+            )
+            self._compactor.start()
+
+    def flush(self) -> None:
+        """將尚未 fsync 的 WAL 紀錄落盤。"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.sync()
+
+    def close(self) -> None:
+        """等待背景 compaction 結束，並關閉 WAL。"""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
 
     def load(self) -> None:
         """
-        從儲存檔案載入圖譜（若存在）。
+        從儲存檔案載入圖譜（若存在），並重播 WAL。
+
+        binary 模式若找不到 .bin 但有舊的 JSON snapshot，會讀入 JSON，
+        下一次 compaction 即轉存為 binary。
+        """
+        snapshot_seq = 0
+        self._graph = nx.MultiDiGraph()
+        self._base = None
+
+        binary_files = self._binary_snapshots() if self.snapshot_format == "binary" else []
+        if binary_files:
+            self.snapshot_path = binary_files[-1][1]
+            self._base = GraphSnapshot(self.snapshot_path)
+            snapshot_seq = self._base.wal_seq
+            self._remove_old_snapshots(binary_files[-1][0])
+        elif self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            snapshot_seq = int(data.get("wal_seq", 0))
+            self._graph = self._to_multigraph(
+                json_graph.node_link_graph(data, edges="links")
+            )
+
+        self._reindex()
+        self._seq = snapshot_seq
+        self._snapshot_seq = snapshot_seq
+        self._tail = []
+
+        self._provenance, provenance_seq, self._provenance_log_lines = ProvenanceIndex.load_files(
+            self.provenance_path, self.provenance_log_path
+        )
+        self._provenance_seq = provenance_seq
+
+        records = self._journal.replay() if self._journal is not None else []
+
+        for seq, triples in records:
+            if seq > provenance_seq:
+                for t in triples:
+                    self._provenance.add(t)
+            if seq <= snapshot_seq:
+                continue
+            for t in triples:
+                self._apply(t)
+            self._tail.append((seq, triples))
+            self._seq = max(self._seq, seq)
+
+        # 載入前的變更沒有紀錄，增量查詢只能從目前版本開始
+        self._version = self._seq
+        self._changes.clear()
+        self._changes_floor = self._version
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _iter_sorted_nodes(self, start: Optional[str], inclusive: bool) -> Iterator[str]:
+        """合併 snapshot（已依字典序）與排序後的增量節點，從 start 開始依序列出。"""
+        with self._lock:
+            base = self._base
+            delta = self._sorted_delta_nodes()
+
+        if start is None:
+            delta_iter: Iterator[str] = iter(delta)
+            base_iter: Iterator[str] = base.iter_nodes() if base is not None else iter(())
+        else:
+            i = bisect_left(delta, start) if inclusive else bisect_right(delta, start)
+            delta_iter = islice(delta, i, None)
+            base_iter = (
+                base.iter_nodes(base.bisect_node(start, inclusive))
+                if base is not None
+                else iter(())
+            )
+
+        last: Optional[str] = None
+        for n in heapq.merge(base_iter, delta_iter):
+            if n != last:
+                last = n
+                yield n
+
+    def _sorted_delta_nodes(self) -> List[str]:
+        """
+        記憶體中（增量）節點的排序清單（呼叫端需持有 _lock）。
+
+        依 (圖物件, 版本) 快取：分頁期間圖未變動時不重複排序；
+        compaction 換掉增量圖時圖物件不同，快取即失效。
         """
-        if not self.path.exists():
+        cached = self._sorted_nodes_cache
+        if cached is not None and cached[0] is self._graph and cached[1] == self._version:
+            return cached[2]
+        names = sorted(self._graph)
+        self._sorted_nodes_cache = (self._graph, self._version, names)
+        return names
+
+    def _adjacent(
+        self,
+        node: str,
+        outgoing: bool,
+        limit: Optional[int] = None,
+    ) -> List[Triple]:
+        """
+        列出節點的出邊或入邊（合併增量與 snapshot），最多 limit 筆。
+
+        Args:
+            node: 節點名稱。
+            outgoing: True 為出邊（node 為 subject），False 為入邊。
+            limit: 最多回傳筆數，None 表示不限制。
+
+        Returns:
+            三元組清單。
+        """
+        result: List[Triple] = []
+        seen = set()
+
+        with self._lock:
+            graph, base = self._graph, self._base
+
+            if node in graph:
+                edges = (
+                    graph.out_edges(node, data="relation")
+                    if outgoing
+                    else graph.in_edges(node, data="relation")
+                )
+                for s, o, rel in islice(edges, limit):
+                    other = o if outgoing else s
+                    seen.add((other, rel))
+                    result.append({"subject": s, "predicate": rel, "object": o})
+
+        # snapshot 中的邊（與增量重複者略過）
+        if base is not None and (limit is None or len(result) < limit):
+            pairs = base.out_edges(node) if outgoing else base.in_edges(node)
+            for other, rel in pairs:
+                if (other, rel) in seen:
+                    continue
+                result.append(
+                    {"subject": node, "predicate": rel, "object": other}
+                    if outgoing
+                    else {"subject": other, "predicate": rel, "object": node}
+                )
+                if limit is not None and len(result) >= limit:
+                    break
+
+        return result
+
+    def _apply(self, t: Triple) -> bool:
+        """
+        將單一（已驗證）三元組套用到記憶體中的圖並更新索引。
+
+        Returns:
+            圖是否因此改變（三元組原本不存在）。
+        """
+        s, p, o = t["subject"], t.get("predicate"), t["object"]
+        key = edge_key(p)
+
+        if self._graph.has_edge(s, o, key=key):
+            return False
+        if self._base is not None and self._base.has_edge(s, o, p):
+            return False
+
+        self._graph.add_node(s, type="entity")
+        self._graph.add_node(o, type="entity")
+        self._graph.add_edge(s, o, key=edge_key(p), relation=p)
+        self._by_relation.setdefault(p, {})[(s, o)] = None
+        return True
+
+    def _record_change(self, nodes: List[str], triples: List[Triple]) -> None:
+        """以目前 WAL 序號作為新版本，記錄本次變更（超出上限時捨棄最舊者）。"""
+        if len(self._changes) == self._changes.maxlen:
+            self._changes_floor = self._changes[0]["version"]
+        self._version = self._seq
+        self._changes.append({"version": self._version, "nodes": nodes, "triples": triples})
+
+    def _reindex(self) -> None:
+        """依記憶體中的圖重建 predicate 索引。"""
+        self._by_relation = {}
+        for s, o, p in self._graph.edges(data="relation"):
+            self._by_relation.setdefault(p, {})[(s, o)] = None
+
+    @staticmethod
+    def _to_multigraph(graph: nx.Graph) -> nx.MultiDiGraph:
+        """將舊版（DiGraph）snapshot 轉為以 relation 為 key 的 MultiDiGraph。"""
+        if graph.is_multigraph():
+            return graph  # type: ignore[return-value]
+
+        multi = nx.MultiDiGraph()
+        multi.add_nodes_from(graph.nodes(data=True))
+        for s, o, d in graph.edges(data=True):
+            multi.add_edge(s, o, key=edge_key(d.get("relation")), **d)
+        return multi
+
+    def _provenance_delta(self) -> Tuple[List[JournalRecord], Optional[Dict[str, Any]]]:
+        """
+        （持有 _lock）取得下一次 snapshot 要寫入的出處。
+
+        Returns:
+            (snapshot 尚未涵蓋的紀錄, None)；出處檔落後於 snapshot（例如由沒有
+            出處檔的舊版資料升級）時改為 ([], 完整出處複本)。
+        """
+        if self._provenance_seq < self._snapshot_seq:
+            return [], self._provenance.to_dict()
+        return list(self._tail), None
+
+    def _compact_worker(
+        self,
+        base: Optional[GraphSnapshot],
+        delta: nx.MultiDiGraph,
+        seq: int,
+        records: List[JournalRecord],
+        provenance: Optional[Dict[str, Any]],
+    ) -> None:
+        try:
+            self._write_snapshot(base, delta, seq, records, provenance)
+        except Exception as e:
+            print(f"❌ GraphStore compaction 失敗: {e}")
+
+    def _write_snapshot(
+        self,
+        base: Optional[GraphSnapshot],
+        delta: nx.MultiDiGraph,
+        seq: int,
+        records: List[JournalRecord],
+        provenance: Optional[Dict[str, Any]],
+    ) -> None:
+        """
+        寫入出處與 snapshot（皆為崩潰安全），成功後從 WAL 移除序號 <= seq 的紀錄。
+
+        Args:
+            base: 目前 map 中的 snapshot（未 map 時為 None）。
+            delta: 記憶體中的圖（呼叫端提供的複本）。
+            seq: 此 snapshot 涵蓋到的 WAL 序號。
+            records: snapshot 尚未涵蓋的紀錄（其出處追加到 .prov.log）。
+            provenance: 需要整份改寫出處檔時的完整複本，否則為 None。
+        """
+        with self._snapshot_lock:
+            # 已有涵蓋更新序號的 snapshot（例如同步 save 搶先完成）
+            if seq < self._snapshot_seq:
+                return
+            # binary：相同序號的 snapshot 內容相同，且可能正被 map，不重寫
+            if (
+                self.snapshot_format == "binary"
+                and seq == self._snapshot_seq
+                and self.snapshot_path == self._binary_snapshot_path(seq)
+                and self.snapshot_path.exists()
+            ):
+                return
+
+            # 出處先寫：崩潰於兩者之間時，WAL 仍保有 snapshot 之後的紀錄
+            self._write_provenance(seq, records, provenance)
+
+            if self.snapshot_format == "binary":
+                # 寫到新檔名，不取代目前 map 中的檔案
+                new_path = self._binary_snapshot_path(seq)
+                write_snapshot(
+                    new_path,
+                    nodes=self._iter_merged_nodes(base, delta),
+                    edges=self._iter_merged_edges(base, delta),
+                    wal_seq=seq,
+                )
+            else:
+                data: Dict[str, Any] = json_graph.node_link_data(delta, edges="links")
+                data["wal_seq"] = seq
+
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                os.replace(tmp, self.path)
+
+            fsync_dir(self.path.parent)
+            self._snapshot_seq = seq
+
+            # 仍持有 _snapshot_lock（鎖順序：_snapshot_lock → _lock），
+            # 較舊的 snapshot 不會在此之後覆蓋 _base 與 WAL
+            with self._lock:
+                self._tail = [r for r in self._tail if r[0] > seq]
+                self._provenance_seq = max(self._provenance_seq, seq)
+
+                # binary 模式且尚未完整轉為 NetworkX：改 map 新 snapshot，
+                # 記憶體只保留 compaction 期間新進的增量
+                if self.snapshot_format == "binary":
+                    self.snapshot_path = new_path
+                    if not self._materialized:
+                        self._base = GraphSnapshot(new_path)
+                        self._graph = nx.MultiDiGraph()
+                        self._by_relation = {}
+                        for _, triples in self._tail:
+                            for t in triples:
+                                self._apply(t)
+
+                if self._journal is not None:
+                    self._journal.rewrite(self._tail)
+
+            # 在 _snapshot_lock 內清理，不會刪到其他執行緒剛寫好的新檔
+            if self.snapshot_format == "binary":
+                self._remove_old_snapshots(seq)
+
+    def _write_provenance(
+        self,
+        seq: int,
+        records: List[JournalRecord],
+        provenance: Optional[Dict[str, Any]],
+    ) -> None:
+        """
+        （持有 _snapshot_lock）讓出處檔涵蓋到 seq：一般只追加一行新出處，
+        追加檔過長或需要整份改寫時才改寫 .prov.json 並清空追加檔。
+        """
+        if provenance is not None:
+            ProvenanceIndex.write(self.provenance_path, provenance, seq)
+            ProvenanceIndex.clear_log(self.provenance_log_path)
+            self._provenance_log_lines = 0
             return
 
-        with open(self.path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        # 沒有新出處也寫一行，記錄出處已涵蓋到 seq
+        sourced = [
+            t for r_seq, triples in records if r_seq > self._provenance_seq
+            for t in triples if t.get("chunk_id")
+        ]
+        ProvenanceIndex.append_log(self.provenance_log_path, seq, sourced)  # type: ignore[arg-type]
+        self._provenance_log_lines += 1
+
+        if self._provenance_log_lines >= PROVENANCE_FOLD_EVERY:
+            # 由檔案重建（不讀記憶體中的索引，不需要 _lock）
+            folded, folded_seq, _ = ProvenanceIndex.load_files(
+                self.provenance_path, self.provenance_log_path
+            )
+            ProvenanceIndex.write(self.provenance_path, folded.to_dict(), folded_seq)
+            ProvenanceIndex.clear_log(self.provenance_log_path)
+            self._provenance_log_lines = 0
+            print(f"🧾 GraphStore：出處追加檔已併入 {self.provenance_path.name}")
+
+    def _binary_snapshot_path(self, seq: int) -> Path:
+        """涵蓋到 WAL 序號 seq 的 binary snapshot 檔名。"""
+        return self.path.with_name(f"{self.path.stem}.{seq}.bin")
+
+    def _binary_snapshots(self) -> List[Tuple[int, Path]]:
+        """
+        列出既有的 binary snapshot，依涵蓋的序號排序。
+
+        舊版單一檔名的 `<stem>.bin` 視為最舊（-1）。
+        """
+        found: List[Tuple[int, Path]] = []
+        legacy = self.path.with_suffix(".bin")
+        if legacy.exists():
+            found.append((-1, legacy))
+
+        prefix = self.path.stem + "."
+        for f in self.path.parent.glob(f"{glob_escape(self.path.stem)}.*.bin"):
+            middle = f.name[len(prefix) : -len(".bin")]
+            if middle.isdigit():
+                found.append((int(middle), f))
+        return sorted(found)
+
+    def _remove_old_snapshots(self, current_seq: int) -> None:
+        """刪除序號早於 current_seq 的 binary snapshot；仍被 map（Windows）而刪不掉者略過。"""
+        for seq, f in self._binary_snapshots():
+            if seq >= current_seq:
+                continue
+            try:
+                f.unlink()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _iter_merged_nodes(
+        base: Optional[GraphSnapshot],
+        delta: nx.MultiDiGraph,
+    ) -> Iterator[str]:
+        if base is not None:
+            yield from base.iter_nodes()
+        yield from delta.nodes
 
-        self.graph = json_graph.node_link_graph(data)
+    @staticmethod
+    def _iter_merged_edges(
+        base: Optional[GraphSnapshot],
+        delta: nx.MultiDiGraph,
+    ) -> Iterator[Edge]:
+        for s, o, r in delta.edges(data="relation"):
+            yield s, o, r
+        if base is not None:
+            for s, o, r in base.iter_edges():
+                if not delta.has_edge(s, o, key=edge_key(r)):
+                    yield s, o, r
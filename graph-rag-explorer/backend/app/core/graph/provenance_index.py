@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TypedDict
+
+
+# 三元組的身分：(subject, predicate, object)
+EdgeKey = Tuple[str, Optional[str], str]
+
+
+class Source(TypedDict):
+    """
+    三元組的出處：來自哪份文件的哪個 chunk。
+    """
+    doc_id: str
+    chunk_id: str
+
+
+class ProvenanceIndex:
+    """
+    ProvenanceIndex 記錄圖譜中節點與邊的出處，並維護 entity → chunk 的 postings。
+
+    - 邊：(subject, predicate, object) → 依出現順序的 chunk id
+    - 節點：entity → 依出現順序的 chunk id（subject 與 object 皆記錄）
+    - chunk id → doc id
+
+    postings 以 dict 保存（插入順序即出現順序、天然去重），
+    查詢某個 entity 的出處成本與其 postings 長度成正比。
+
+    本類別不負責執行緒安全與持久化時機，由 GraphStore 在自己的鎖內呼叫。
+    """
+
+    def __init__(self) -> None:
+        self._entity_chunks: Dict[str, Dict[str, None]] = {}
+        self._edge_chunks: Dict[EdgeKey, Dict[str, None]] = {}
+        self._chunk_doc: Dict[str, str] = {}
+
+        # 每次新增出處即遞增，供上層快取判斷是否失效
+        self.version: int = 0
+
+    def add(self, triple: Dict[str, Any]) -> bool:
+        """
+        記錄單一三元組的出處（沒有 chunk_id 者略過）。
+
+        Args:
+            triple: 帶有 doc_id / chunk_id 的三元組。
+
+        Returns:
+            是否新增了任何出處。
+        """
+        cid = triple.get("chunk_id")
+        if not cid:
+            return False
+
+        s, p, o = triple["subject"], triple.get("predicate"), triple["object"]
+        changed = False
+
+        edge = self._edge_chunks.setdefault((s, p, o), {})
+        if cid not in edge:
+            edge[cid] = None
+            changed = True
+
+        for entity in (s, o):
+            postings = self._entity_chunks.setdefault(entity, {})
+            if cid not in postings:
+                postings[cid] = None
+                changed = True
+
+        doc_id = triple.get("doc_id")
+        if doc_id and self._chunk_doc.get(cid) != doc_id:
+            self._chunk_doc[cid] = doc_id
+            changed = True
+
+        if changed:
+            self.version += 1
+        return changed
+
+    def edge_sources(self, subject: str, predicate: Optional[str], obj: str) -> List[Source]:
+        """
+        取得單一邊的出處。
+
+        Args:
+            subject: subject 節點。
+            predicate: 關係名稱。
+            obj: object 節點。
+
+        Returns:
+            出處清單（依出現順序）。
+        """
+        return self._sources(self._edge_chunks.get((subject, predicate, obj), {}))
+
+    def node_sources(self, entity: str, limit: Optional[int] = None) -> List[Source]:
+        """
+        取得節點的出處。
+
+        Args:
+            entity: 節點名稱。
+            limit: 最多回傳筆數，None 表示不限制。
+
+        Returns:
+            出處清單（依出現順序）。
+        """
+        postings = self._entity_chunks.get(entity, {})
+        return self._sources(list(postings)[:limit] if limit is not None else postings)
+
+    def chunks_for_entities(self, entities: Iterable[str], limit: int) -> List[str]:
+        """
+        合併多個 entity 的 postings，依「連到幾個 entity」排序取出 chunk id。
+
+        成本與這些 entity 的 postings 總長成正比，與圖譜大小無關。
+
+        Args:
+            entities: 節點名稱。
+            limit: 最多回傳筆數。
+
+        Returns:
+            chunk id 清單；同分者保留先出現者在前。
+        """
+        counts: Counter = Counter()
+        for entity in dict.fromkeys(entities):
+            counts.update(self._entity_chunks.get(entity, {}).keys())
+        return [cid for cid, _ in counts.most_common(limit)]
+
+    def __len__(self) -> int:
+        """有出處紀錄的節點數。"""
+        return len(self._entity_chunks)
+
+    # ----------------------------------------------------------
+    # 持久化
+    # ----------------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為可 JSON 序列化的結構（呼叫端持鎖時取得一致的複本）。"""
+        return {
+            "chunk_doc": dict(self._chunk_doc),
+            "edges": [[s, p, o, list(c)] for (s, p, o), c in self._edge_chunks.items()],
+        }
+
+    def load_dict(self, data: Dict[str, Any]) -> None:
+        """
+        由 to_dict 的結果重建索引（節點 postings 由邊推得）。
+
+        Args:
+            data: to_dict 的輸出。
+        """
+        self._entity_chunks = {}
+        self._edge_chunks = {}
+        self._chunk_doc = dict(data.get("chunk_doc", {}))
+
+        for s, p, o, chunks in data.get("edges", []):
+            self._edge_chunks[(s, p, o)] = dict.fromkeys(chunks)
+            for entity in (s, o):
+                self._entity_chunks.setdefault(entity, {}).update(dict.fromkeys(chunks))
+
+    @staticmethod
+    def write(path: Path, data: Dict[str, Any], wal_seq: int) -> None:
+        """
+        原子寫入出處檔。
+
+        Args:
+            path: 檔案路徑。
+            data: to_dict 的輸出。
+            wal_seq: 此檔涵蓋到的 WAL 序號。
+        """
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"wal_seq": wal_seq, **data}, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def append_log(path: Path, wal_seq: int, triples: List[Dict[str, Any]]) -> None:
+        """
+        在出處追加檔尾端寫入一行（一次 compaction 新增的出處），並 fsync。
+
+        Args:
+            path: 追加檔路徑。
+            wal_seq: 寫入此行後出處涵蓋到的 WAL 序號。
+            triples: 帶有 doc_id / chunk_id 的三元組。
+        """
+        line = json.dumps(
+            {"wal_seq": wal_seq, "triples": triples},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        with open(path, "ab") as f:
+            f.write(line.encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def read_log(path: Path) -> List[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        讀取出處追加檔，並截掉崩潰留下的半行。
+
+        Args:
+            path: 追加檔路徑。
+
+        Returns:
+            依寫入順序的 (涵蓋到的 WAL 序號, 三元組) 清單；檔案不存在時為空。
+        """
+        if not path.exists():
+            return []
+
+        entries: List[Tuple[int, List[Dict[str, Any]]]] = []
+        valid_end = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    break
+                entries.append((int(data["wal_seq"]), data["triples"]))
+                valid_end += len(line)
+
+        if valid_end < path.stat().st_size:
+            with open(path, "r+b") as f:
+                f.truncate(valid_end)
+        return entries
+
+    @staticmethod
+    def clear_log(path: Path) -> None:
+        """清空出處追加檔（內容已併入出處檔之後）。"""
+        with open(path, "wb") as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def load_files(cls, path: Path, log_path: Path) -> Tuple["ProvenanceIndex", int, int]:
+        """
+        由出處檔與追加檔重建索引。
+
+        Args:
+            path: 出處檔路徑。
+            log_path: 追加檔路徑。
+
+        Returns:
+            (索引, 涵蓋到的 WAL 序號, 追加檔中尚未併入出處檔的行數)。
+        """
+        seq, data = cls.read(path)
+        index = cls()
+        index.load_dict(data)
+
+        pending = 0
+        for wal_seq, triples in cls.read_log(log_path):
+            if wal_seq <= seq:
+                continue   # 已併入出處檔（併入後、清空前中斷）
+            for t in triples:
+                index.add(t)
+            seq = wal_seq
+            pending += 1
+        return index, seq, pending
+
+    @staticmethod
+    def read(path: Path) -> Tuple[int, Dict[str, Any]]:
+        """
+        讀取出處檔。
+
+        Args:
+            path: 檔案路徑。
+
+        Returns:
+            (涵蓋到的 WAL 序號, 資料)；檔案不存在時為 (0, {})。
+        """
+        if not path.exists():
+            return 0, {}
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return int(data.pop("wal_seq", 0)), data
+
+    # ----------------------------------------------------------
+    # 輔助
+    # ----------------------------------------------------------
+    def _sources(self, chunks: Iterable[str]) -> List[Source]:
+        return [{"doc_id": self._chunk_doc.get(c, ""), "chunk_id": c} for c in chunks]
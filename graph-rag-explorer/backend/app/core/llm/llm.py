@@ -1,7 +1,10 @@
 # app/core/llm.py
 from __future__ import annotations
-from typing import List, Optional
-from transformers import AutoTokenizer, AutoModelForCausalLM, PreTrainedModel, PreTrainedTokenizerBase, pipeline
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from transformers import AutoTokenizer, AutoModelForCausalLM, DynamicCache, PreTrainedModel, PreTrainedTokenizerBase, pipeline
 import torch
 import os
 
@@ -9,18 +12,53 @@ from app.capabilities.textgen.protocols import TextGenPipe
 from app.capabilities.textgen.text_generator import GeneratedText
 
 
+# ===== 可調參數 =====
+GENERATION_KWARGS: Dict[str, Any] = {
+    "max_new_tokens": 128,
+    "do_sample": True,
+    "temperature": 0.1,
+    "top_p": 0.9,
+}
+PREFIX_CACHE_SIZE = 4   # 最多保留幾個固定 prompt 前綴的 KV cache（LRU）
+
+# answer 的固定系統區塊（作為可重用 KV cache 的前綴）
+ANSWER_SYSTEM_PROMPT = "[系統]\n你是知識型助手，根據以下內容回答問題。\n"
+
+
 class LLM:
     """
     通用文字生成模型。
     可被 GraphExtractor 共用。
+
+    前綴 KV cache（prefix_cache=True 時）：
+    - 固定的 prompt 前綴（抽取指令、answer 系統區塊）只 prefill 一次，
+      其 key/value cache 依前綴文字保存（LRU）
+    - 之後每次生成只需 prefill 可變的部分；cache 會複製一份再交給
+      generate，原本的 cache 不會被改動，可跨執行緒共用
+    - 前綴 cache 涵蓋「除最後一個 token 以外」的前綴，確保每次生成
+      至少有一個未快取的輸入 token
+    - 每筆 prompt 都整段 tokenize 後在前綴長度處切開；開頭與前綴 token
+      不一致（例如 BPE 跨越邊界合併）的 prompt 改走一般生成，結果與不快取時相同
     """
 
-    def __init__(self, model_id: str, device: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        model_id: str,
+        device: Optional[str] = None,
+        prefix_cache: bool = True,
+    ) -> None:
         self.model_id: str = model_id
         self.device: str = device or ("cuda" if torch.cuda.is_available() else "cpu")
         self.tokenizer: Optional[PreTrainedTokenizerBase] = None
         self.model: PreTrainedModel | None = None
         self.pipe: Optional[TextGenPipe] = None
+        self.generation_kwargs: Dict[str, Any] = dict(GENERATION_KWARGS)
+
+        self.prefix_cache_enabled: bool = prefix_cache
+        self._prefix_cache: "OrderedDict[str, Tuple[List[int], DynamicCache]]" = OrderedDict()
+        self._prefix_lock = threading.Lock()
+        self.prefix_hits: int = 0
+        self.prefix_misses: int = 0
 
     # -------------------------------------------------------------
     # 模型載入 / 釋放
@@ -33,6 +71,11 @@ class LLM:
 
         self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
 
+        # 批次生成需要 padding；decoder-only 模型須左側補齊
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"
+
         self.model = AutoModelForCausalLM.from_pretrained(
             self.model_id,
             torch_dtype=torch.bfloat16, 
@@ -45,15 +88,14 @@ class LLM:
             model=self.model,
             tokenizer=self.tokenizer, # type: ignore
             device=0 if self.device == "cuda" else -1,
-            max_new_tokens=128,
-            do_sample=True,
-            temperature=0.1,
-            top_p=0.9,
+            **self.generation_kwargs,
         )
 
     def unload(self) -> None:
         """釋放 GPU 資源"""
         print("🧹 卸載 LLM 模型資源 ...")
+        with self._prefix_lock:
+            self._prefix_cache.clear()
         del self.pipe, self.model, self.tokenizer
         torch.cuda.empty_cache()
 
@@ -66,18 +108,200 @@ class LLM:
             raise RuntimeError("LLM 尚未初始化。請先呼叫 load()。")
 
         context = "\n".join(passages)
-        prompt = (
-            f"[系統]\n你是知識型助手，根據以下內容回答問題。\n"
+        body = (
             f"[內容]\n{context}\n"
             f"[問題]\n{question}\n"
             f"請給出清晰、簡潔的回答："
         )
 
-        result = self.pipe(prompt)[0]["generated_text"]
+        result = self.generate_with_prefix(ANSWER_SYSTEM_PROMPT, body)[0]["generated_text"]
         return result.strip()
     
     def generate(self, prompt: str) -> List[GeneratedText]:
         if self.pipe is None:
-            raise RuntimeError("LLM 尚未初始化")
+            raise RuntimeError("LLM 尚未初始化。請先呼叫 load()。")
 
         return self.pipe(prompt)
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        batch_size: int = 8,
+    ) -> List[List[GeneratedText]]:
+        """
+        一次生成多個 prompt：pipeline 依 batch_size 左側補齊後合併成
+        同一次 forward，減少逐筆生成時的閒置。
+
+        Args:
+            prompts: prompt 清單。
+            batch_size: 每次 forward 的 prompt 數。
+
+        Returns:
+            與 prompts 等長、順序相同的生成結果。
+        """
+        if self.pipe is None:
+            raise RuntimeError("LLM 尚未初始化。請先呼叫 load()。")
+
+        if not prompts:
+            return []
+
+        return self.pipe(prompts, batch_size=batch_size)  # type: ignore[call-arg]
+
+    # -------------------------------------------------------------
+    # 固定前綴的 KV cache 重用
+    # -------------------------------------------------------------
+    def generate_with_prefix(self, prefix: str, suffix: str) -> List[GeneratedText]:
+        """
+        生成 prefix + suffix，prefix 的 KV cache 會被保存並重用。
+
+        Args:
+            prefix: 固定的 prompt 前綴。
+            suffix: 每次不同的 prompt 後段。
+
+        Returns:
+            生成結果（generated_text 與 pipeline 相同，包含完整 prompt）。
+        """
+        return self.generate_batch_with_prefix(prefix, [suffix], batch_size=1)[0]
+
+    def generate_batch_with_prefix(
+        self,
+        prefix: str,
+        suffixes: List[str],
+        batch_size: int = 8,
+    ) -> List[List[GeneratedText]]:
+        """
+        以共用前綴批次生成：前綴只 prefill 一次，每批只 prefill 各自的後段。
+
+        後段長度不一時，padding 放在前綴與後段之間（attention mask 遮住），
+        位置編號依 attention mask 計算，不受 padding 影響。
+        停用前綴 cache、或 prompt 開頭的 token 與前綴不一致時，
+        等同 generate_batch(prefix + suffix)。
+
+        Args:
+            prefix: 固定的 prompt 前綴。
+            suffixes: 各筆 prompt 的後段。
+            batch_size: 每次 forward 的 prompt 數。
+
+        Returns:
+            與 suffixes 等長、順序相同的生成結果。
+        """
+        if self.pipe is None or self.model is None or self.tokenizer is None:
+            raise RuntimeError("LLM 尚未初始化。請先呼叫 load()。")
+
+        if not suffixes:
+            return []
+
+        cached = self._prefix_kv(prefix) if self.prefix_cache_enabled else None
+        if cached is None:
+            if len(suffixes) == 1:
+                return [self.generate(prefix + suffixes[0])]
+            return self.generate_batch([prefix + s for s in suffixes], batch_size=batch_size)
+
+        prefix_ids, prefix_kv = cached
+        pad_id = self.tokenizer.pad_token_id
+
+        # 整段 tokenize 後於前綴長度切開，與不快取時的 token 完全相同
+        n = len(prefix_ids)
+        reusable: List[Tuple[int, List[int]]] = []
+        fallback: List[int] = []
+        for j, s in enumerate(suffixes):
+            ids: List[int] = self.tokenizer(prefix + s)["input_ids"]
+            if ids[:n] == prefix_ids and len(ids) > n:
+                reusable.append((j, ids[n:]))
+            else:
+                fallback.append(j)
+
+        results: List[Optional[List[GeneratedText]]] = [None] * len(suffixes)
+        if fallback:
+            plain = self.generate_batch([prefix + suffixes[j] for j in fallback], batch_size=batch_size)
+            for j, r in zip(fallback, plain):
+                results[j] = r
+
+        for i in range(0, len(reusable), max(1, batch_size)):
+            chunk = reusable[i : i + max(1, batch_size)]
+            encoded = [e for _, e in chunk]
+            width = max(len(e) for e in encoded)
+
+            input_ids = torch.tensor(
+                [prefix_ids + [pad_id] * (width - len(e)) + e for e in encoded],
+                device=self.model.device,
+            )
+            attention_mask = torch.tensor(
+                [[1] * len(prefix_ids) + [0] * (width - len(e)) + [1] * len(e) for e in encoded],
+                device=self.model.device,
+            )
+
+            # generate 會就地擴充 cache，須使用複本
+            past = copy.deepcopy(prefix_kv)
+            if len(chunk) > 1:
+                past.batch_repeat_interleave(len(chunk))
+
+            with torch.no_grad():
+                output = self.model.generate(  # type: ignore[operator]
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    past_key_values=past,
+                    pad_token_id=pad_id,
+                    **self.generation_kwargs,
+                )
+
+            generated = self.tokenizer.batch_decode(
+                output[:, input_ids.shape[1]:],
+                skip_special_tokens=True,
+            )
+            for (j, _), g in zip(chunk, generated):
+                results[j] = [{"generated_text": prefix + suffixes[j] + g}]
+
+        return results  # type: ignore[return-value]
+
+    def prefix_cache_stats(self) -> Dict[str, int]:
+        """前綴 KV cache 的筆數與 hit / miss 次數。"""
+        with self._prefix_lock:
+            return {
+                "entries": len(self._prefix_cache),
+                "hits": self.prefix_hits,
+                "misses": self.prefix_misses,
+            }
+
+    def _prefix_kv(self, prefix: str) -> Optional[Tuple[List[int], DynamicCache]]:
+        """
+        取得（必要時 prefill 並保存）前綴的 token 與 KV cache。
+
+        Returns:
+            (前綴 token ids, 涵蓋除最後一個 token 以外的 KV cache)；
+            前綴不足兩個 token 時為 None（不值得快取）。
+        """
+        assert self.model is not None and self.tokenizer is not None
+
+        with self._prefix_lock:
+            hit = self._prefix_cache.get(prefix)
+            if hit is not None:
+                self._prefix_cache.move_to_end(prefix)
+                self.prefix_hits += 1
+                return hit
+
+        ids: List[int] = self.tokenizer(prefix)["input_ids"]
+        if len(ids) < 2:
+            return None
+
+        # prefill 不持有鎖，其他前綴的 hit / miss 不必等待；同一前綴同時 miss 時以先寫入者為準
+        with torch.no_grad():
+            out = self.model(
+                input_ids=torch.tensor([ids[:-1]], device=self.model.device),
+                use_cache=True,
+            )
+
+        with self._prefix_lock:
+            self.prefix_misses += 1
+            existing = self._prefix_cache.get(prefix)
+            if existing is not None:
+                self._prefix_cache.move_to_end(prefix)
+                return existing
+
+            entry = (ids, out.past_key_values)
+            self._prefix_cache[prefix] = entry
+            while len(self._prefix_cache) > PREFIX_CACHE_SIZE:
+                self._prefix_cache.popitem(last=False)
+
+        print(f"🧠 LLM：已預先計算 prompt 前綴的 KV cache（{len(ids) - 1} tokens）")
+        return entry
@@ -1,8 +1,8 @@
-from typing import Optional
+from typing import Callable, Optional
 import torch
 
 from app.config.modules import ModulesConfig
-from app.core.embedding.embedder import Embedder
+from app.core.embedding.embedder import AddChunksResult, Embedder
 from app.core.llm.llm import LLM
 from app.core.graph.graph_extractor import GraphExtractor
 
@@ -40,6 +40,8 @@ class ModelRegistry:
         embedder  = Embedder(
             model_id=self.modules.embedder_model,
             device="cpu",
+            index_backend=self.modules.vector_index_backend,
+            index_dtype=self.modules.vector_index_dtype,
         )
         print(f"✅ Embedder ready ({self.modules.embedder_model})")
         return embedder
@@ -51,6 +53,7 @@ class ModelRegistry:
         llm = LLM(
             model_id=self.modules.llm_model,
             device=self.device,
+            prefix_cache=self.modules.llm_prefix_cache,
         )
         llm.load()
         print(f"✅ LLM ready ({self.modules.llm_model})")
@@ -91,6 +94,10 @@ class ModelRegistry:
         return self._llm
 
     ### === embedder的封裝 ===
-    def add_chunks(self, texts: list[str]) -> None:
+    def add_chunks(
+        self,
+        texts: list[str],
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> AddChunksResult:
         embedder = self._get_embedder_internal()
-        embedder.add_chunks(texts)
+        return embedder.add_chunks(texts, progress=progress)
@@ -1,5 +1,7 @@
 # app/infrastructure/models/model_provider.py
 
+from typing import Optional
+
 from app.infrastructure.models.model_loader import ModelRegistry
 from app.core.llm.llm import LLM
 from app.core.embedding.embedder import Embedder
@@ -33,3 +35,9 @@ class ModelProvider:
         取得可用的 Embedder
         """
         return self._registry._get_embedder_internal()
+
+    def get_loaded_embedder(self) -> Optional[Embedder]:
+        """
+        取得已建立的 Embedder；尚未建立時回傳 None，不觸發載入（供監控用）
+        """
+        return self._registry._embedder
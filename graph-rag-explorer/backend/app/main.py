@@ -1,17 +1,28 @@
 from fastapi import FastAPI
+from app.application.services.answer_cache import AnswerCache
 from app.application.services.document_chunking_service import DocumentChunkingService
 from app.application.services.embedding_ingest_service import EmbeddingIngestService
+from app.application.services.entity_linking_service import EntityLinkingService
 from app.application.services.file_storage_service import FileStorageService
 from app.application.services.graph_ingest_service import GraphIngestService
 from app.application.services.graph_query_service import GraphQueryService
+from app.application.services.inference_executor import InferenceExecutor
+from app.application.services.job_service import JobService
 from app.application.usecases.extract_graph_usecase import ExtractGraphUseCase
+from app.application.usecases.ingest_usecase import IngestUseCase
 from app.application.usecases.upload_usecase import UploadUseCase
-from app.config.paths import UPLOAD_DIR
+from app.config.paths import ANSWER_CACHE_PATH, KEYWORD_INDEX_DIR, UPLOAD_DIR
+from app.core.embedding.bigram_index import BigramIndex
+from app.core.graph.entity_matcher import EntityMatcher
+from app.core.graph.extraction_cache import ExtractionCache
+from app.core.graph.graph_layout import GraphLayout
 from app.core.graph.graph_store import GraphStore
+from app.core.llm.llm import ANSWER_SYSTEM_PROMPT, GENERATION_KWARGS
 from app.infrastructure.models.model_loader import ModelRegistry
 from app.routes import upload
 from app.routes import graph
 from app.routes import inference
+from app.routes import jobs
 from app.globals import get_registry, set_registry
 from app.infrastructure.models.model_provider import ModelProvider
 from app.application.services.retrieval_service import RetrievalService
@@ -30,6 +41,7 @@ app = FastAPI(
 app.include_router(upload.router, prefix="/api")
 app.include_router(graph.router)
 app.include_router(inference.router)
+app.include_router(jobs.router)
 
 @app.get("/")
 def root():
@@ -52,45 +64,91 @@ async def load_models():
     set_registry(registry)
 
     # 在main組好service
-    graph_store = GraphStore()
+    graph_store = GraphStore(
+        snapshot_format=registry.modules.graph_snapshot_format,
+    )
     
     graph_ingest_service = GraphIngestService(
         provider=provider,
         store=graph_store,
+        cache=ExtractionCache(),
+    )
+
+    graph_layout = GraphLayout(
+        path=graph_store.path.with_suffix(".layout.npz"),
     )
 
     graph_query_service = GraphQueryService(
         store=graph_store,
+        layout=graph_layout,
     )
 
     extract_graph_usecase = ExtractGraphUseCase(
         ingest_service=graph_ingest_service
     )
 
+    keyword_index = BigramIndex(KEYWORD_INDEX_DIR)
+
+    # 檢索擴充與 entity linking 共用同一個 entity 自動機
+    entity_matcher = EntityMatcher(graph_store)
+
     # === Application Services ===
-    retrieval_service = RetrievalService(provider=provider)
+    retrieval_service = RetrievalService(
+        provider=provider,
+        keyword_index=keyword_index,
+        mode=registry.modules.retrieval_mode,
+        graph_store=graph_store,
+        entity_matcher=entity_matcher,
+    )
     answer_generation_service = AnswerGenerationService(provider=provider)
     graph_extraction_service = GraphExtractionService(provider=provider)
+    entity_linking_service = EntityLinkingService(store=graph_store, matcher=entity_matcher)
     file_storage_service = FileStorageService(UPLOAD_DIR)
     document_chunker_service = DocumentChunkingService()
     embedding_ingestor_service = EmbeddingIngestService(registry)
+    job_service = JobService()
+    inference_executor = InferenceExecutor()
+
+    answer_cache = None
+    if registry.modules.answer_cache_entries > 0:
+        answer_cache = AnswerCache(
+            model_id=registry.modules.llm_model,
+            generation_params={**GENERATION_KWARGS, "system_prompt": ANSWER_SYSTEM_PROMPT},
+            path=ANSWER_CACHE_PATH if registry.modules.answer_cache_persist else None,
+            max_entries=registry.modules.answer_cache_entries,
+        )
 
     # === UseCase ===
     ask_question_usecase = AskQuestionUseCase(
         retrieval=retrieval_service,
         answer_generator=answer_generation_service,
         graph_extractor=graph_extraction_service,
+        entity_linker=entity_linking_service,
+        triples_mode=registry.modules.answer_triples_mode,
+        answer_cache=answer_cache,
     )
     
     upload_usecase = UploadUseCase(
         chunker=document_chunker_service,
         ingestor=embedding_ingestor_service,
+        keyword_index=keyword_index,
+    )
+
+    ingest_usecase = IngestUseCase(
+        chunker=document_chunker_service,
+        ingestor=embedding_ingestor_service,
+        graph_ingest=graph_ingest_service,
+        keyword_index=keyword_index,
     )
 
     # 掛到 app.state
     app.state.ask_question_usecase = ask_question_usecase
     app.state.upload_usecase = upload_usecase
+    app.state.ingest_usecase = ingest_usecase
     app.state.file_storage_service = file_storage_service
+    app.state.job_service = job_service
+    app.state.inference_executor = inference_executor
+    app.state.answer_cache = answer_cache
     
     app.state.graph_store = graph_store
     app.state.graph_ingest_service = graph_ingest_service
@@ -103,6 +161,19 @@ async def load_models():
 def release_gpu():
     print("🧹 Releasing GPU memory before shutdown...")
 
+    # 取消排隊中的背景工作，等待執行中的工作寫完
+    app.state.job_service.shutdown()
+    app.state.inference_executor.shutdown()
+
+    # 等待背景佈局寫回座標，再等待背景 compaction 並將 WAL 落盤
+    if app.state.graph_query_service.layout is not None:
+        app.state.graph_query_service.layout.close()
+    app.state.graph_store.close()
+    if app.state.answer_cache is not None:
+        app.state.answer_cache.close()
+    if app.state.graph_ingest_service.cache is not None:
+        app.state.graph_ingest_service.cache.close()
+
     registry = get_registry()
     if registry:
         registry.unload_all()
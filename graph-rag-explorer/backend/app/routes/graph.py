@@ -1,9 +1,18 @@
-from fastapi import APIRouter, File, Path, Query, Request, UploadFile
-from fastapi.responses import JSONResponse, HTMLResponse
+import json
+from typing import Literal
+
+from fastapi import APIRouter, File, HTTPException, Path, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from pathlib import Path
 
 router = APIRouter()
 
+# NDJSON 串流每批送出的元素數
+STREAM_BATCH_SIZE = 500
+
+# 鄰域查詢每層每個節點最多可展開的邊數
+MAX_FANOUT = 1000
+
 def debug_find_path(obj, prefix="root"):
     if isinstance(obj, Path):
         print(f"❌ Path found at {prefix}: {obj}")
@@ -14,7 +23,7 @@ def debug_find_path(obj, prefix="root"):
         for i, v in enumerate(obj):
             debug_find_path(v, f"{prefix}[{i}]")
 
-@router.post("/extract_graph")
+@router.post("/extract_graph", status_code=202)
 async def extract_graph(
     request: Request,
     file: UploadFile = File(...),
@@ -23,18 +32,24 @@ async def extract_graph(
     # 宣告需要的usecase(甚至service)
     storage = request.app.state.file_storage_service
     usecase = request.app.state.extract_graph_usecase
+    jobs = request.app.state.job_service
     
     # 將收到的檔案存檔, 並取得檔案路徑
     file_path = await storage.save(file)
 
-    # 開始流程
-    result = usecase.execute(
-        file_path=file_path,
-        max_chunks=max_chunks,
+    # 開始流程（背景 worker 執行，進度以 /jobs/{job_id} 查詢）
+    job = jobs.submit(
+        "extract_graph",
+        lambda job: usecase.execute(
+            file_path=file_path,
+            max_chunks=max_chunks,
+            progress=lambda done, total, triples: job.report(
+                done, total, triples, stage="extract"
+            ),
+        ),
     )
-    debug_find_path(result)
-    # 回傳結果
-    return JSONResponse(result)
+    # 回傳 job id
+    return JSONResponse({"job_id": job.id, "status": job.status}, status_code=202)
 
 # 知識圖譜 查詢器 單結點
 @router.get("/graph")
@@ -47,6 +62,44 @@ def get_graph(
     return {"node": node, "relations": relations}
 
 
+# 知識圖譜 查詢器 依關係
+@router.get("/graph/by_relation")
+def get_graph_by_relation(
+    request: Request,
+    predicate: str = Query(..., description="關係名稱"),
+    limit: int | None = Query(None, ge=1, description="最多回傳筆數"),
+) -> dict[str, object]:
+    service = request.app.state.graph_query_service
+    triples = service.get_by_relation(predicate, limit=limit)
+    return {"predicate": predicate, "count": len(triples), "triples": triples}
+
+
+# 知識圖譜 查詢器 k-hop 鄰域子圖
+@router.get("/graph/neighborhood")
+def get_graph_neighborhood(
+    request: Request,
+    node: str = Query(..., description="起點節點名稱"),
+    hops: int = Query(2, ge=1, le=3, description="展開層數"),
+    direction: Literal["out", "in", "both"] = Query("both", description="邊的方向"),
+    fanout: list[int] = Query([20], description="每層每個節點最多展開的邊數，可逐層指定"),
+    max_edges: int = Query(200, ge=1, le=5000, description="子圖最多邊數"),
+) -> dict[str, object]:
+    if any(f < 1 or f > MAX_FANOUT for f in fanout):
+        raise HTTPException(status_code=422, detail=f"fanout 每一項須介於 1 與 {MAX_FANOUT} 之間")
+
+    service = request.app.state.graph_query_service
+    try:
+        return service.get_neighborhood(
+            node,
+            hops=hops,
+            direction=direction,
+            fanout=fanout,
+            max_edges=max_edges,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # 知識圖譜 展示 純文字
 @router.get("/graph/visual")
 def visual_graph(request: Request):
@@ -55,6 +108,52 @@ def visual_graph(request: Request):
     return JSONResponse(data)
 
 
+# 知識圖譜 展示 增量（自指定版本之後的新增節點與邊）
+@router.get("/graph/visual/changes")
+def visual_graph_changes(
+    request: Request,
+    since: int = Query(..., ge=0, description="前端目前持有的圖譜版本"),
+    layout_epoch: int | None = Query(None, ge=0, description="前端目前座標所屬的佈局 epoch"),
+):
+    service = request.app.state.graph_query_service
+    data = service.get_visual_changes(since, layout_epoch=layout_epoch)
+    return JSONResponse(data)
+
+
+# 知識圖譜 展示 分頁
+@router.get("/graph/visual/page")
+def visual_graph_page(
+    request: Request,
+    cursor: str | None = Query(None, description="上一頁回傳的 next_cursor"),
+    limit: int = Query(1000, ge=1, le=10000, description="每頁最多元素數"),
+):
+    service = request.app.state.graph_query_service
+    try:
+        data = service.get_visual_page(cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(data)
+
+
+# 知識圖譜 展示 串流（NDJSON，每行一個 Cytoscape 元素）
+@router.get("/graph/visual/stream")
+def visual_graph_stream(request: Request):
+    service = request.app.state.graph_query_service
+
+    def _ndjson():
+        # 每次送出一批，減少小封包；同步 generator 由 Starlette 放到 threadpool 執行
+        batch: list[str] = []
+        for element in service.iter_visual_elements():
+            batch.append(json.dumps(element, ensure_ascii=False))
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield "\n".join(batch) + "\n"
+                batch = []
+        if batch:
+            yield "\n".join(batch) + "\n"
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+
 # 知識圖譜 展示 視覺化網頁
 @router.get("/graph/visual/html")
 def visual_graph_html():
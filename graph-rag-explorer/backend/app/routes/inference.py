@@ -1,9 +1,48 @@
 from typing import Any
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.application.services.inference_executor import (
+    InferenceCancelledError,
+    InferenceOverloadedError,
+)
 
 router = APIRouter(prefix="/api")
 
+# client 已斷線時回應的狀態碼（nginx 慣例）
+CLIENT_CLOSED_REQUEST = 499
+
 @router.post("/ask")
-async def ask(request: Request, body: str) -> dict[str, Any]:
+async def ask(request: Request, body: str) -> Any:
     usecase = request.app.state.ask_question_usecase
-    return usecase.execute(body)
+    executor = request.app.state.inference_executor
+
+    # 推論在專用執行緒池執行，不佔用 event loop
+    try:
+        result, timing = await executor.run(
+            lambda cancel: usecase.execute(body, cancelled=cancel.is_set),
+            is_disconnected=request.is_disconnected,
+        )
+    except InferenceOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except InferenceCancelledError:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+    return {**result, "timing": timing}
+
+
+@router.get("/ask/stats")
+def ask_stats(request: Request) -> dict[str, int]:
+    return request.app.state.inference_executor.stats()
+
+
+@router.get("/ask/cache")
+def answer_cache_stats(request: Request) -> dict[str, float]:
+    cache = request.app.state.answer_cache
+    return cache.stats() if cache is not None else {}
+
+
+@router.get("/embedder/cache")
+def embedder_cache_stats(request: Request) -> dict[str, float]:
+    # 監控用：Embedder 尚未建立時回傳空 dict，不為了統計而載入模型
+    embedder = request.app.state.model_provider.get_loaded_embedder()
+    return embedder.cache_stats() if embedder is not None else {}
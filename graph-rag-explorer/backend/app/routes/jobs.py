@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+router = APIRouter()
+
+# SSE 串流檢查新事件的間隔（秒）
+EVENT_POLL_INTERVAL = 0.25
+
+
+def _get_job(request: Request, job_id: str):
+    job = request.app.state.job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"找不到 job：{job_id}")
+    return job
+
+
+# 背景工作 狀態查詢
+@router.get("/jobs/{job_id}")
+def get_job(request: Request, job_id: str) -> dict[str, object]:
+    return _get_job(request, job_id).to_dict()
+
+
+# 背景工作 事件串流（SSE）：status / progress / result / error
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(request: Request, job_id: str):
+    job = _get_job(request, job_id)
+
+    async def _events():
+        cursor = 0
+        while True:
+            events = job.events_since(cursor)
+            cursor += len(events)
+            for e in events:
+                payload = json.dumps(e, ensure_ascii=False, default=str)
+                yield f"event: {e['event']}\ndata: {payload}\n\n"
+
+            if job.finished and not job.events_since(cursor):
+                break
+            if await request.is_disconnected():
+                break
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
@@ -9,10 +9,46 @@ router = APIRouter()
 
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-@router.post("/upload")
+@router.post("/upload", status_code=202)
 async def upload_file(request: Request, file: UploadFile = File(...)):
     storage = request.app.state.file_storage_service
     usecase = request.app.state.upload_usecase
+    jobs = request.app.state.job_service
     
     file_path = await storage.save(file)
-    return await usecase.execute(file_path)
\ No newline at end of file
+
+    # 切 chunk + 向量化交給背景 worker，進度以 /jobs/{job_id} 查詢
+    job = jobs.submit(
+        "upload",
+        lambda job: usecase.execute(
+            file_path,
+            progress=lambda done, total: job.report(done, total, stage="embed"),
+        ),
+    )
+    return JSONResponse({"job_id": job.id, "status": job.status}, status_code=202)
+
+
+@router.post("/ingest", status_code=202)
+async def ingest_file(
+    request: Request,
+    file: UploadFile = File(...),
+    max_chunks: int | None = Query(None, ge=1, description="圖譜抽取最多處理的 chunk 數"),
+):
+    storage = request.app.state.file_storage_service
+    usecase = request.app.state.ingest_usecase
+    jobs = request.app.state.job_service
+
+    file_path = await storage.save(file)
+
+    # 切一次 chunk，向量化與圖譜抽取並行；進度事件以 stage 區分 embed / extract
+    job = jobs.submit(
+        "ingest",
+        lambda job: usecase.execute(
+            file_path,
+            max_chunks=max_chunks,
+            progress=lambda stage, done, total, triples: job.report(
+                done, total, triples, stage=stage
+            ),
+        ),
+    )
+    return JSONResponse({"job_id": job.id, "status": job.status}, status_code=202)
@@ -0,0 +1,70 @@
+from app.application.services.answer_cache import AnswerCache
+from app.application.types.graph_triple import GraphTriple
+
+_PARAMS = {"max_new_tokens": 128, "temperature": 0.1}
+
+
+def test_問題正規化後相同即命中_段落或參數不同則不命中():
+    cache = AnswerCache(model_id="m", generation_params=_PARAMS)
+    key = cache.key("什麼是 GraphRAG？", ["段落一", "段落二"])
+
+    assert cache.key("  什麼是   graphrag？ ", ["段落一", "段落二"]) == key
+    assert cache.key("什麼是 GraphRAG？", ["段落一"]) != key
+    assert cache.key("什麼是 GraphRAG？", ["段落二", "段落一"]) != key
+    other = AnswerCache(model_id="m", generation_params={**_PARAMS, "temperature": 0.7})
+    assert other.key("什麼是 GraphRAG？", ["段落一", "段落二"]) != key
+
+
+def test_超過上限時淘汰最久未用的回答():
+    cache = AnswerCache(model_id="m", generation_params=_PARAMS, max_entries=2)
+    cache.put("a", "A", None)
+    cache.put("b", "B", None)
+    assert cache.get("a") == ("A", None)
+    cache.put("c", "C", None)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ("A", None)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_寫入磁碟後重啟仍可命中(tmp_path):
+    path = tmp_path / "answers.sqlite3"
+    triples = [GraphTriple(subject="甲", predicate="是", object="乙", source_text="甲是乙")]
+
+    cache = AnswerCache(model_id="m", generation_params=_PARAMS, path=path, max_entries=2)
+    for k in ("a", "b", "c"):
+        cache.put(k, k.upper(), triples)
+    cache.close()
+
+    reopened = AnswerCache(model_id="m", generation_params=_PARAMS, path=path, max_entries=2)
+    assert len(reopened) == 2
+    assert reopened.get("a") is None
+    assert reopened.get("c") == ("C", triples)
+    reopened.close()
+
+
+def test_命中只更新記憶體_批次或關閉時才寫回使用順序(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "answers.sqlite3"
+    cache = AnswerCache(model_id="m", generation_params=_PARAMS, path=path, max_entries=2, touch_flush=3)
+    cache.put("a", "A", None)
+    cache.put("b", "B", None)
+
+    def _last_used(key):
+        with sqlite3.connect(str(path)) as conn:
+            return conn.execute("SELECT last_used FROM answer_cache WHERE key=?", (key,)).fetchone()[0]
+
+    before = _last_used("a")
+    assert cache.get("a") == ("A", None)
+    assert _last_used("a") == before        # 命中不寫磁碟
+
+    cache.close()
+    assert _last_used("a") > _last_used("b")
+
+    # 重啟後依寫回的使用順序淘汰：b 最久未用
+    reopened = AnswerCache(model_id="m", generation_params=_PARAMS, path=path, max_entries=2)
+    reopened.put("c", "C", None)
+    assert reopened.get("b") is None
+    assert reopened.get("a") == ("A", None)
+    reopened.close()
@@ -0,0 +1,25 @@
+import tempfile
+
+from app.application.services.graph_query_service import GraphQueryService
+from app.core.graph.graph_store import GraphStore
+
+
+def test_鄰域查詢快取在圖譜變更後失效():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+        service = GraphQueryService(store)
+
+        first = service.get_neighborhood("A", hops=2)
+        second = service.get_neighborhood("A", hops=2)
+        assert first["cached"] is False
+        assert second["cached"] is True
+
+        # 重複的三元組不改變版本，快取仍有效
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+        assert service.get_neighborhood("A", hops=2)["cached"] is True
+
+        store.add_triples([{"subject": "B", "predicate": "r", "object": "C"}])
+        third = service.get_neighborhood("A", hops=2)
+        assert third["cached"] is False
+        assert "C" in third["nodes"]
@@ -0,0 +1,113 @@
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from app.application.services.graph_query_service import GraphQueryService
+from app.core.graph.graph_layout import GraphLayout
+from app.core.graph.graph_store import GraphStore
+
+
+@pytest.mark.parametrize("snapshot_format", ["json", "binary"])
+def test_分頁取回的元素與一次取回相同(snapshot_format):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(
+            path=f"{tmp}/graph.json",
+            snapshot_format=snapshot_format,
+            compact_every=2,
+            background_compaction=False,
+        )
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+        store.add_triples([{"subject": "A", "predicate": "q", "object": "C"}])
+        store.add_triples([{"subject": "B", "predicate": "r", "object": "C"}])
+        service = GraphQueryService(store)
+
+        full = service.get_visual_elements()["elements"]
+
+        nodes, edges, cursor = [], [], None
+        while True:
+            page = service.get_visual_page(cursor, limit=2)
+            nodes += page["elements"]["nodes"]
+            edges += page["elements"]["edges"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert nodes == full["nodes"]
+        assert edges == full["edges"]
+        assert len(edges) == 3
+
+        streamed = list(service.iter_visual_elements())
+        assert [e["group"] for e in streamed] == ["nodes"] * 3 + ["edges"] * 3
+
+
+def test_無效的_cursor_會拋出_ValueError():
+    with tempfile.TemporaryDirectory() as tmp:
+        service = GraphQueryService(GraphStore(path=f"{tmp}/graph.json"))
+
+        with pytest.raises(ValueError):
+            service.get_visual_page("x:1")
+
+
+@pytest.mark.parametrize("snapshot_format", ["json", "binary"])
+def test_分頁期間寫入與_compaction_不會略過或重複元素(snapshot_format):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(
+            path=f"{tmp}/graph.json",
+            snapshot_format=snapshot_format,
+            compact_every=1,
+            background_compaction=False,
+        )
+        store.add_triples([{"subject": f"m{i}", "predicate": "r", "object": f"m{i + 1}"} for i in range(6)])
+        service = GraphQueryService(store)
+        before_nodes = {n for n in store.iter_nodes()}
+        before_edges = {(t["subject"], t["predicate"], t["object"]) for t in store.iter_edges()}
+
+        nodes, edges, cursor, i = [], [], None, 0
+        while True:
+            page = service.get_visual_page(cursor, limit=3)
+            nodes += [n["data"]["id"] for n in page["elements"]["nodes"]]
+            edges += [(e["data"]["source"], e["data"]["label"], e["data"]["target"]) for e in page["elements"]["edges"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+            # 每頁之間寫入新節點（排在前面與後面都有），並觸發 compaction 重排節點表
+            store.add_triples([
+                {"subject": f"a{i}", "predicate": "r", "object": "m0"},
+                {"subject": "m2", "predicate": "新", "object": f"z{i}"},
+            ])
+            i += 1
+
+        assert len(nodes) == len(set(nodes))
+        assert len(edges) == len(set(edges))
+        assert before_nodes <= set(nodes)
+        assert before_edges <= set(edges)
+
+
+def test_增量變更不會移動既有節點且重新佈局後回傳完整圖():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+        layout = GraphLayout(Path(tmp) / "graph.layout.npz", background=False)
+        service = GraphQueryService(store, layout=layout)
+
+        first = service.get_visual_elements()
+        assert first["meta"]["layout"] == "preset"
+        positions = {n["data"]["id"]: n["position"] for n in first["elements"]["nodes"]}
+        version, epoch = first["meta"]["version"], first["meta"]["layout_epoch"]
+
+        store.add_triples([{"subject": "B", "predicate": "r", "object": "C"}])
+        delta = service.get_visual_changes(version, layout_epoch=epoch)
+        assert delta["full"] is False
+        assert [n["data"]["id"] for n in delta["elements"]["nodes"]] == ["C"]
+
+        after = service.get_visual_elements()["elements"]["nodes"]
+        assert {n["data"]["id"]: n["position"] for n in after if n["data"]["id"] in positions} == positions
+
+        # 節點數成長觸發完整重新佈局：epoch 改變，舊座標的前端收到完整圖
+        store.add_triples([{"subject": "C", "predicate": "r", "object": f"D{i}"} for i in range(6)])
+        delta = service.get_visual_changes(delta["version"], layout_epoch=epoch)
+        assert layout.epoch == epoch + 1
+        assert delta["full"] is True
+        assert delta["meta"]["layout_epoch"] == layout.epoch
+        assert len(delta["elements"]["nodes"]) == 9
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.application.services import inference_executor as module
+from app.application.services.inference_executor import (
+    InferenceCancelledError,
+    InferenceExecutor,
+    InferenceOverloadedError,
+)
+
+
+def test_推論結果會附帶排隊與延遲計時():
+    executor = InferenceExecutor(max_workers=1, max_in_flight=2)
+
+    result, timing = asyncio.run(executor.run(lambda cancel: "答案"))
+
+    assert result == "答案"
+    assert set(timing) == {"queue_time", "run_time", "latency"}
+    assert timing["latency"] >= timing["run_time"]
+    assert executor.stats()["completed"] == 1
+    executor.shutdown()
+
+
+def test_超過_max_in_flight_時立即拒絕():
+    executor = InferenceExecutor(max_workers=1, max_in_flight=1)
+    release = threading.Event()
+
+    async def scenario() -> None:
+        first = asyncio.create_task(executor.run(lambda cancel: release.wait(5)))
+        await asyncio.sleep(0.05)
+        with pytest.raises(InferenceOverloadedError):
+            await executor.run(lambda cancel: None)
+        release.set()
+        await first
+
+    asyncio.run(scenario())
+    assert executor.stats()["rejected"] == 1
+    executor.shutdown()
+
+
+def test_client_斷線時會通知工作函式取消(monkeypatch):
+    monkeypatch.setattr(module, "DISCONNECT_POLL_INTERVAL", 0.01)
+    executor = InferenceExecutor(max_workers=1, max_in_flight=2)
+    seen_cancel = threading.Event()
+
+    def work(cancel: threading.Event) -> None:
+        if cancel.wait(5):
+            seen_cancel.set()
+
+    async def disconnected() -> bool:
+        return True
+
+    with pytest.raises(InferenceCancelledError):
+        asyncio.run(executor.run(work, is_disconnected=disconnected))
+
+    assert seen_cancel.wait(5)
+    assert executor.stats()["cancelled"] == 1
+    executor.shutdown()
@@ -0,0 +1,60 @@
+import time
+
+from app.application.services.job_service import Job, JobService
+
+
+def _wait(job: Job, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_背景工作會回報進度_部分三元組與結果():
+    service = JobService(max_workers=1)
+
+    def work(job: Job) -> dict:
+        job.report(1, 2, [{"subject": "甲", "predicate": "是", "object": "乙"}], stage="extract")
+        job.report(2, 2, [{"subject": "乙", "predicate": "是", "object": "丙"}], stage="extract")
+        return {"count": 2}
+
+    job = service.submit("extract_graph", work)
+    _wait(job)
+    state = service.get(job.id).to_dict()  # type: ignore[union-attr]
+
+    assert state["status"] == "succeeded"
+    assert state["progress"] == {"done": 2, "total": 2}
+    assert state["partial_triple_count"] == 2
+    assert state["result"] == {"count": 2}
+    assert state["timing"]["run_time"] is not None
+    assert [e["event"] for e in job.events_since(0)] == [
+        "status", "status", "progress", "progress", "result",
+    ]
+    service.shutdown()
+
+
+def test_工作拋出例外時狀態為_failed():
+    service = JobService(max_workers=1)
+
+    def work(job: Job) -> dict:
+        raise ValueError("壞掉了")
+
+    job = service.submit("upload", work)
+    _wait(job)
+
+    assert job.status == "failed"
+    assert job.error == "壞掉了"
+    assert job.events_since(0)[-1]["event"] == "error"
+    service.shutdown()
+
+
+def test_看到結束狀態時結果事件已經存在():
+    service = JobService(max_workers=4)
+    jobs = [service.submit("upload", lambda job, i=i: {"i": i}) for i in range(50)]
+
+    for job in jobs:
+        # SSE 以 finished 判斷何時停止讀取事件：此時結果事件必須已經追加
+        while not job.finished:
+            pass
+        assert job.events_since(0)[-1]["event"] == "result"
+        assert job.to_dict()["result"] is not None
+    service.shutdown()
@@ -0,0 +1,119 @@
+from typing import List
+
+from app.application.services import retrieval_service as module
+from app.application.services.retrieval_service import RetrievalService
+
+
+class _FakeEmbedder:
+    def __init__(self) -> None:
+        self.version = 0
+        self.queries: List[str] = []
+
+    def query(self, question: str, top_k: int = 5) -> List[dict]:
+        self.queries.append(question)
+        return [{"text": f"{question}#{self.version}", "score": 0.1}][:top_k]
+
+
+class _Provider:
+    def __init__(self, embedder: _FakeEmbedder) -> None:
+        self.embedder = embedder
+
+    def get_embedder(self) -> _FakeEmbedder:
+        return self.embedder
+
+
+def test_相同問題第二次不會再查詢向量資料庫():
+    embedder = _FakeEmbedder()
+    service = RetrievalService(provider=_Provider(embedder))  # type: ignore[arg-type]
+
+    first = service.retrieve("什麼是 GraphRAG？")
+    second = service.retrieve("  什麼是   GraphRAG？ ")
+
+    assert first == second
+    assert len(embedder.queries) == 1
+    assert service.cache_stats()["hits"] == 1
+
+
+def test_寫入新向量或逾時後快取失效(monkeypatch):
+    embedder = _FakeEmbedder()
+    service = RetrievalService(provider=_Provider(embedder), cache_ttl=60)  # type: ignore[arg-type]
+
+    service.retrieve("問題")
+    embedder.version += 1
+    assert service.retrieve("問題") == ["問題#1"]
+    assert len(embedder.queries) == 2
+
+    clock = [module.time.monotonic() + 120]
+    monkeypatch.setattr(module.time, "monotonic", lambda: clock[0])
+    service.retrieve("問題")
+    assert len(embedder.queries) == 3
+
+
+def test_hybrid_模式以_RRF_融合向量與關鍵字結果():
+    import tempfile
+    from pathlib import Path
+
+    from app.core.embedding.bigram_index import BigramIndex
+    from app.core.embedding.embedder import chunk_id
+
+    class _DenseEmbedder(_FakeEmbedder):
+        def query(self, question: str, top_k: int = 5) -> List[dict]:
+            self.queries.append(question)
+            return [{"text": "向量命中", "score": 0.1}, {"text": "兩路都有的圖譜段落", "score": 0.2}]
+
+    texts = ["兩路都有的圖譜段落", "只有關鍵字命中的圖譜"]
+    with tempfile.TemporaryDirectory() as tmp:
+        keyword = BigramIndex(Path(tmp))
+        keyword.add([chunk_id(t) for t in texts], texts)
+
+        service = RetrievalService(  # type: ignore[arg-type]
+            provider=_Provider(_DenseEmbedder()),
+            keyword_index=keyword,
+            mode="hybrid",
+        )
+        passages = service.retrieve("圖譜段落", top_k=3)
+
+        assert passages[0] == "兩路都有的圖譜段落"
+        assert set(passages) == {"兩路都有的圖譜段落", "向量命中", "只有關鍵字命中的圖譜"}
+
+
+def test_問題提到的_entity_會經由出處_postings_補上段落():
+    import tempfile
+    from pathlib import Path
+
+    from app.core.embedding.bigram_index import BigramIndex
+    from app.core.embedding.embedder import chunk_id
+    from app.core.graph.graph_store import GraphStore
+
+    class _DenseEmbedder(_FakeEmbedder):
+        def query(self, question: str, top_k: int = 5) -> List[dict]:
+            return [{"text": "西瓜是夏天的水果", "score": 0.1}]
+
+    linked = "西瓜的水分含量很高"
+    with tempfile.TemporaryDirectory() as tmp:
+        keyword = BigramIndex(Path(tmp) / "kw")
+        keyword.add([chunk_id(linked)], [linked])
+
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([{
+            "subject": "西瓜", "predicate": "含有", "object": "水分",
+            "doc_id": "fruit.txt", "chunk_id": chunk_id(linked),
+        }])
+
+        service = RetrievalService(  # type: ignore[arg-type]
+            provider=_Provider(_DenseEmbedder()),
+            keyword_index=keyword,
+            graph_store=store,
+        )
+
+        assert service.retrieve("西瓜有什麼營養？", top_k=1) == ["西瓜是夏天的水果", linked]
+
+        # entity 比對不分大小寫
+        english = "Watermelon is mostly water"
+        keyword.add([chunk_id(english)], [english])
+        store.add_triples([{
+            "subject": "Watermelon", "predicate": "contains", "object": "water",
+            "doc_id": "fruit.txt", "chunk_id": chunk_id(english),
+        }])
+        assert service.retrieve("is WATERMELON healthy?", top_k=1) == ["西瓜是夏天的水果", english]
+        store.close()
@@ -1,5 +1,6 @@
 from unittest.mock import Mock
 
+from app.application.services.answer_cache import AnswerCache
 from app.application.usecases.ask_question_usecase import AskQuestionUseCase
 from app.application.types.graph_triple import GraphTriple
 
@@ -52,3 +53,35 @@ def test_ask_question_usecase_happy_path():
     mock_graph_extractor.extract.assert_called_once_with(
         mock_answer_generator.generate.return_value
     )
+
+
+def test_相同問題且段落不變時直接回傳快取的回答():
+    mock_retrieval = Mock()
+    mock_answer_generator = Mock()
+    mock_graph_extractor = Mock()
+    mock_retrieval.retrieve.return_value = ["GraphRAG combines graphs with retrieval."]
+    mock_answer_generator.generate.return_value = "GraphRAG is RAG with graphs."
+    mock_graph_extractor.extract.return_value = [
+        GraphTriple(subject="GraphRAG", predicate="is", object="RAG")
+    ]
+
+    usecase = AskQuestionUseCase(
+        retrieval=mock_retrieval,
+        answer_generator=mock_answer_generator,
+        graph_extractor=mock_graph_extractor,
+        answer_cache=AnswerCache(model_id="m", generation_params={}),
+    )
+
+    first = usecase.execute("What is GraphRAG?")
+    second = usecase.execute("  what is graphrag? ")
+
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["answer"] == first["answer"]
+    assert second["triples"] == first["triples"]
+    assert mock_answer_generator.generate.call_count == 1
+    assert mock_graph_extractor.extract.call_count == 1
+
+    # 語料變動使檢索段落不同時重新生成
+    mock_retrieval.retrieve.return_value = ["GraphRAG was updated."]
+    assert usecase.execute("What is GraphRAG?")["cached"] is False
+    assert mock_answer_generator.generate.call_count == 2
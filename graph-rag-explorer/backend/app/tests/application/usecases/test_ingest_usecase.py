@@ -0,0 +1,116 @@
+import json
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterator, List
+
+from app.application.services.document_chunking_service import DocumentChunkingService
+from app.application.services.graph_ingest_service import GraphIngestService
+from app.application.usecases.ingest_usecase import IngestUseCase
+from app.capabilities.textgen.text_generator import GeneratedText
+from app.core.embedding.bigram_index import BigramIndex
+from app.core.embedding.chunker import DocumentChunk
+from app.core.graph.graph_store import GraphStore
+
+
+class _OnceChunker(DocumentChunkingService):
+    def __init__(self, texts: List[str]) -> None:
+        self.texts = texts
+        self.calls = 0
+
+    def iter_split(self, file_path: Path) -> Iterator[DocumentChunk]:
+        self.calls += 1
+        for i, t in enumerate(self.texts):
+            yield {"id": i, "text": t, "length": len(t)}
+
+
+class _Ingestor:
+    def __init__(self) -> None:
+        self.texts: List[str] = []
+        self.batches: List[List[str]] = []
+        self.thread = ""
+
+    def ingest(self, texts, progress=None):
+        self.thread = threading.current_thread().name
+        self.batches.append(list(texts))
+        self.texts += texts
+        if progress is not None:
+            progress(len(texts), len(texts))
+        return {"new": len(texts), "skipped": 0}
+
+
+class _LLM:
+    model_id = "dummy-llm"
+
+    def generate(self, prompt: str) -> List[GeneratedText]:
+        payload = [{"subject": "西瓜", "predicate": "含有", "object": "水"}]
+        return [{"generated_text": json.dumps(payload, ensure_ascii=False)}]
+
+
+class _Provider:
+    def get_llm(self) -> _LLM:
+        return _LLM()
+
+
+def test_只切一次_chunk_向量與三元組共用_chunk_id():
+    texts = ["西瓜含有水。", "蘋果是水果。"]
+    with tempfile.TemporaryDirectory() as tmp:
+        chunker = _OnceChunker(texts)
+        ingestor = _Ingestor()
+        store = GraphStore(path=f"{tmp}/graph.json")
+        keyword = BigramIndex(Path(tmp) / "kw")
+        stages: List[str] = []
+
+        usecase = IngestUseCase(
+            chunker=chunker,  # type: ignore[arg-type]
+            ingestor=ingestor,  # type: ignore[arg-type]
+            graph_ingest=GraphIngestService(provider=_Provider(), store=store),  # type: ignore[arg-type]
+            keyword_index=keyword,
+        )
+        result = usecase.execute(
+            Path(tmp) / "fruit.txt",
+            progress=lambda stage, done, total, triples: stages.append(stage),
+        )
+
+        assert chunker.calls == 1
+        assert ingestor.texts == texts
+        assert ingestor.thread.startswith("ingest")
+        assert set(stages) == {"embed", "extract"}
+
+        ids = [c["chunk_id"] for c in result["chunks"]]  # type: ignore[index]
+        assert set(keyword.texts(ids).values()) == set(texts)
+        assert {t["chunk_id"] for t in result["triples"]} <= set(ids)  # type: ignore[index]
+        assert store.edge_sources("西瓜", "含有", "水")[0]["doc_id"] == "fruit.txt"
+        store.close()
+
+
+def test_串流切分並逐批向量化與抽取():
+    texts = ["西瓜含有水。", "蘋果是水果。", "西瓜含有水。", "香蕉是水果。", "葡萄是水果。"]
+    with tempfile.TemporaryDirectory() as tmp:
+        chunker = _OnceChunker(texts)
+        ingestor = _Ingestor()
+        store = GraphStore(path=f"{tmp}/graph.json")
+        extracted: List[tuple] = []
+        embedded: List[tuple] = []
+
+        usecase = IngestUseCase(
+            chunker=chunker,
+            ingestor=ingestor,  # type: ignore[arg-type]
+            graph_ingest=GraphIngestService(provider=_Provider(), store=store),  # type: ignore[arg-type]
+            batch_size=2,
+        )
+
+        def _progress(stage, done, total, triples):
+            (embedded if stage == "embed" else extracted).append((done, total))
+
+        result = usecase.execute(Path(tmp) / "fruit.txt", progress=_progress)
+
+        assert chunker.calls == 1
+        assert ingestor.batches == [texts[0:2], texts[2:4], texts[4:5]]
+        assert result["chunks_stored"] == 5
+        assert [c["id"] for c in result["chunks"]] == [0, 1, 2, 3, 4]  # type: ignore[index]
+        assert embedded[-1] == (5, 5)
+        # 重複的 chunk 只抽取一次
+        assert extracted[-1] == (4, 4)
+        assert all(done <= total for done, total in embedded + extracted)
+        store.close()
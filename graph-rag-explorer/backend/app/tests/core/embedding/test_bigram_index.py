@@ -0,0 +1,100 @@
+import tempfile
+from pathlib import Path
+
+from app.core.embedding.bigram_index import BigramIndex, tokenize
+
+
+def test_中文以重疊_bigram_切詞_英數字整詞小寫():
+    assert tokenize("知識圖譜 GraphRAG") == ["知識", "識圖", "圖譜", "graphrag"]
+    assert tokenize("水") == ["水"]
+
+
+def test_BM25_依相關度排序且索引重開後結果相同():
+    texts = [
+        "西瓜含有大量的水分，夏天很受歡迎。",
+        "知識圖譜以三元組描述實體之間的關係。",
+        "圖譜查詢可以找出知識圖譜中相鄰的實體。",
+    ]
+    ids = [f"c{i}" for i in range(len(texts))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BigramIndex(Path(tmp))
+        assert index.add(ids, texts) == 3
+        assert index.add(ids[:1], texts[:1]) == 0
+        index.save()
+
+        hits = index.search("知識圖譜的三元組", top_k=2)
+        assert [h["id"] for h in hits] == ["c1", "c2"]
+        assert hits[0]["score"] > hits[1]["score"]
+
+        reopened = BigramIndex(Path(tmp))
+        assert len(reopened) == 3
+        assert reopened.search("知識圖譜的三元組", top_k=2) == hits
+        assert reopened.postings_bytes == index.postings_bytes
+        assert reopened.search("西瓜", top_k=1)[0]["id"] == "c0"
+
+
+def test_未提交的_docs_尾段會在載入時截掉():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BigramIndex(Path(tmp))
+        index.add(["a"], ["蘋果是水果"])
+        index.save()
+
+        with open(Path(tmp) / "docs.jsonl", "ab") as f:
+            f.write(b'["b", "\xe9\xa6\x99\xe8\x95\x89", 1]\n["c", "')
+
+        reopened = BigramIndex(Path(tmp))
+        assert len(reopened) == 1
+        reopened.add(["b"], ["香蕉是水果"])
+        reopened.save()
+        assert [h["id"] for h in BigramIndex(Path(tmp)).search("香蕉")] == ["b"]
+
+
+def test_沒有_postings_時殘留的_docs_會被清除():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BigramIndex(Path(tmp))
+        index.add(["a"], ["蘋果是水果"])
+        index.save()
+        # 模擬第一次提交前崩潰：docs.jsonl 已寫入，postings.bin 尚未建立
+        (Path(tmp) / "postings.bin").unlink()
+
+        reopened = BigramIndex(Path(tmp))
+        assert len(reopened) == 0
+        reopened.add(["b"], ["香蕉是水果"])
+        reopened.save()
+
+        again = BigramIndex(Path(tmp))
+        assert again.texts(["a", "b"]) == {"b": "香蕉是水果"}
+        assert [h["id"] for h in again.search("香蕉")] == ["b"]
+
+
+def test_save_只追加新段並定期合併():
+    texts = [f"第{i}段文字提到水果{'西瓜' if i % 2 else '香蕉'}" for i in range(7)]
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BigramIndex(Path(tmp), merge_segments=4)
+        index.add(["c0"], texts[:1])
+        index.save()
+        base = (Path(tmp) / "postings.bin").read_bytes()
+
+        for i in range(1, 4):
+            index.add([f"c{i}"], texts[i : i + 1])
+            index.save()
+
+        # postings.bin 未改寫，新 postings 都在追加段中
+        assert (Path(tmp) / "postings.bin").read_bytes() == base
+        assert len(list(Path(tmp).glob("postings.*.seg"))) == 3
+
+        reopened = BigramIndex(Path(tmp), merge_segments=4)
+        assert len(reopened) == 4
+        assert reopened.postings_bytes == index.postings_bytes
+        assert reopened.search("西瓜", top_k=4) == index.search("西瓜", top_k=4)
+
+        # 第 4 段達到合併門檻：整份改寫並刪除追加段
+        reopened.add(["c4", "c5", "c6"], texts[4:])
+        reopened.save()
+        assert list(Path(tmp).glob("postings.*.seg")) == []
+
+        merged = BigramIndex(Path(tmp))
+        assert len(merged) == 7
+        assert merged.search("香蕉", top_k=7) == reopened.search("香蕉", top_k=7)
+        assert {h["id"] for h in merged.search("西瓜", top_k=7)} == {"c1", "c3", "c5"}
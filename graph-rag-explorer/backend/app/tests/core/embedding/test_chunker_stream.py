@@ -0,0 +1,49 @@
+import random
+import tempfile
+from pathlib import Path
+
+from app.core.embedding import chunker
+from app.core.embedding.chunker import iter_document_chunks, split_document
+
+
+def _sample_text(seed: int) -> str:
+    rng = random.Random(seed)
+    words = ["知識圖譜", "GraphRAG", "西瓜", "水分", "relation", "3.14", "  ", "\n", "資料"]
+    ends = ["。", "！", "？", ". ", "；", ":", "", ""]
+    return "".join(rng.choice(words) + rng.choice(ends) for _ in range(800))
+
+
+def test_串流切分與_split_document_結果相同():
+    with tempfile.TemporaryDirectory() as tmp:
+        for seed in range(3):
+            path = Path(tmp) / f"doc{seed}.txt"
+            path.write_text(_sample_text(seed), encoding="utf-8")
+
+            expected = split_document(str(path))
+            for block in (1, 7, 4096):
+                assert list(iter_document_chunks(str(path), block_chars=block)) == expected
+
+
+def test_相鄰_chunk_以_SENTENCE_OVERLAP_句重疊():
+    sentences = [f"第{i}句" + "字" * 90 + "。" for i in range(12)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "doc.txt"
+        path.write_text("".join(sentences), encoding="utf-8")
+
+        chunks = [c["text"] for c in iter_document_chunks(str(path), block_chars=50)]
+
+    assert len(chunks) > 1
+    for prev, curr in zip(chunks, chunks[1:]):
+        assert curr.split(" ")[0] == prev.split(" ")[-1]
+
+
+def test_沒有句尾符號的長文字會在暫存上限強制成句(monkeypatch):
+    monkeypatch.setattr(chunker, "STREAM_MAX_PENDING", 100)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "log.txt"
+        path.write_text("無標點" * 1000, encoding="utf-8")
+
+        chunks = list(iter_document_chunks(str(path), block_chars=64))
+
+    assert "".join(c["text"].replace(" ", "") for c in chunks).startswith("無標點" * 100)
+    assert max(c["length"] for c in chunks) <= chunker.MAX_CHARS_PER_CHUNK + 200
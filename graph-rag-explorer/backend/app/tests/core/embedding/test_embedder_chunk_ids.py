@@ -0,0 +1,74 @@
+import tempfile
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app.core.embedding.embedder import Embedder, chunk_id
+
+
+class _FakeModel:
+    """測試用假模型：記錄被編碼的文字"""
+
+    def __init__(self) -> None:
+        self.encoded: List[str] = []
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        self.encoded.extend(texts)
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_重複上傳時只編碼新的_chunk():
+    with tempfile.TemporaryDirectory() as tmp:
+        embedder = Embedder(model_id="fake", device="cpu", persist_dir=tmp, cache_dir=Path(tmp) / "cache")
+        model = _FakeModel()
+        embedder.model = model  # type: ignore[assignment]
+
+        first = embedder.add_chunks(["蘋果是水果", "香蕉是水果"])
+        second = embedder.add_chunks(["香蕉是水果", "西瓜是水果", "西瓜是水果"])
+
+        assert first == {"new": 2, "skipped": 0}
+        assert second == {"new": 1, "skipped": 2}
+        assert model.encoded == ["蘋果是水果", "香蕉是水果", "西瓜是水果"]
+        assert embedder.index.count() == 3
+        assert embedder.index.existing_ids([chunk_id("西瓜是水果")]) == {chunk_id("西瓜是水果")}
+
+
+def test_分批_ingest_會依長度分桶並回報進度():
+    with tempfile.TemporaryDirectory() as tmp:
+        embedder = Embedder(model_id="fake", device="cpu", persist_dir=tmp, cache_dir=Path(tmp) / "cache")
+        model = _FakeModel()
+        embedder.model = model  # type: ignore[assignment]
+        reports: List[tuple] = []
+
+        texts = ["長" * n for n in (5, 1, 4, 2, 3)]
+        result = embedder.add_chunks(texts, batch_size=2, progress=lambda d, t: reports.append((d, t)))
+
+        assert result == {"new": 5, "skipped": 0}
+        assert model.encoded == sorted(texts, key=len)
+        assert reports == [(2, 5), (4, 5), (5, 5)]
+        assert embedder.index.count() == 5
+        assert embedder.last_ingest_stats is not None
+        assert embedder.last_ingest_stats["batches"] == 3
+
+
+def test_同時新增相同文字只會編碼一次():
+    import threading
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embedder = Embedder(model_id="fake", device="cpu", persist_dir=tmp, cache_dir=Path(tmp) / "cache",
+                            index_backend="numpy", vector_cache_capacity=0)
+        model = _FakeModel()
+        embedder.model = model  # type: ignore[assignment]
+        texts = [f"第{i}段" for i in range(20)]
+        results: List[dict] = []
+
+        threads = [threading.Thread(target=lambda: results.append(embedder.add_chunks(texts))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(model.encoded) == sorted(texts)
+        assert sum(r["new"] for r in results) == 20
+        assert embedder.index.count() == 20
@@ -0,0 +1,60 @@
+import tempfile
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app.core.embedding.embedder import Embedder
+from app.core.embedding.embedding_cache import EmbeddingCache
+
+
+class _FakeModel:
+    def __init__(self) -> None:
+        self.encoded: List[str] = []
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        self.encoded.extend(texts)
+        return np.array([[float(len(t)), 0.5, -1.0] for t in texts], dtype=np.float32)
+
+
+def test_向量快取重開後仍可命中且以正規化文字為_key():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(Path(tmp), "model-a", capacity=8)
+        cache.put_many(["蘋果  是水果"], np.array([[1.0, 2.0, 3.0]]))
+        cache.flush()
+
+        cache = EmbeddingCache(Path(tmp), "model-a", capacity=8)
+        hit, miss = cache.get_many([" 蘋果 是水果 ", "香蕉"])
+
+        assert hit is not None and np.allclose(hit, [1.0, 2.0, 3.0])
+        assert miss is None
+        assert cache.stats()["hit_rate"] == 0.5
+        assert cache.stats()["bytes_used"] > 0
+        assert EmbeddingCache(Path(tmp), "model-b", capacity=8).get_many(["蘋果 是水果"]) == [None]
+
+
+def test_槽位滿時覆寫最久未用的向量():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(Path(tmp), "m", capacity=2)
+        cache.put_many(["a", "b"], np.eye(2))
+        cache.get_many(["a"])
+        cache.put_many(["c"], np.ones((1, 2)))
+
+        a, b, c = cache.get_many(["a", "b", "c"])
+        assert a is not None and c is not None
+        assert b is None
+        assert len(cache) == 2
+
+
+def test_embed_只編碼快取未命中的文字():
+    with tempfile.TemporaryDirectory() as tmp:
+        embedder = Embedder(model_id="fake", device="cpu", persist_dir=tmp, cache_dir=Path(tmp) / "cache")
+        model = _FakeModel()
+        embedder.model = model  # type: ignore[assignment]
+
+        first = embedder.embed(["甲", "乙乙"])
+        second = embedder.embed(["乙乙", "丙丙丙"])
+
+        assert model.encoded == ["甲", "乙乙", "丙丙丙"]
+        assert np.allclose(second[0], first[1])
+        assert embedder.cache_stats()["hits"] == 1
@@ -0,0 +1,66 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.core.embedding.numpy_index import NumpyVectorIndex
+
+
+def _data(n: int = 300, dim: int = 16):
+    rng = np.random.default_rng(0)
+    vecs = rng.normal(size=(n, dim)).astype(np.float32)
+    return [f"id{i}" for i in range(n)], [f"doc{i}" for i in range(n)], vecs
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_top_k_與暴力搜尋結果一致(dtype):
+    ids, docs, vecs = _data()
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NumpyVectorIndex(Path(tmp), dtype=dtype)
+        index.add(ids, docs, vecs)
+
+        q = vecs[7] + 0.01
+        unit = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+        expected = np.argsort(-(unit @ (q / np.linalg.norm(q))))[:5]
+
+        hits = index.query(q, top_k=5)
+
+        assert hits[0]["id"] == "id7"
+        assert hits[0]["text"] == "doc7"
+        assert len({h["id"] for h in hits} & {ids[i] for i in expected}) >= 4
+        assert [h["score"] for h in hits] == sorted(h["score"] for h in hits)
+
+
+def test_索引重開後保留資料且略過已存在的_id():
+    ids, docs, vecs = _data(n=1500)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NumpyVectorIndex(Path(tmp), dtype="float16")
+        index.add(ids[:1000], docs[:1000], vecs[:1000])
+        index.add(ids[900:], docs[900:], vecs[900:])
+
+        reopened = NumpyVectorIndex(Path(tmp), dtype="float16")
+
+        assert reopened.count() == 1500
+        assert reopened.existing_ids(["id0", "id1499", "nope"]) == {"id0", "id1499"}
+        assert reopened.query(vecs[1234], top_k=1)[0]["id"] == "id1234"
+        with pytest.raises(ValueError):
+            NumpyVectorIndex(Path(tmp), dtype="int8")
+
+
+def test_第一次提交前崩潰殘留的_docs_會被清除():
+    ids, docs, vecs = _data(n=10)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NumpyVectorIndex(Path(tmp))
+        index.add(ids[:3], docs[:3], vecs[:3])
+        # 模擬第一次寫入 meta 前崩潰：docs.jsonl 已有未提交的行
+        (Path(tmp) / "meta.json").unlink()
+
+        reopened = NumpyVectorIndex(Path(tmp))
+        assert reopened.count() == 0
+        reopened.add(ids[5:], docs[5:], vecs[5:])
+
+        again = NumpyVectorIndex(Path(tmp))
+        assert again.count() == 5
+        assert again.get(["id5", "id9"]) == {"id5": "doc5", "id9": "doc9"}
+        assert again.query(vecs[7], top_k=1)[0]["id"] == "id7"
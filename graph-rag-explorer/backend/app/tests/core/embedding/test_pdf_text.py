@@ -0,0 +1,115 @@
+import tempfile
+from pathlib import Path
+from typing import List
+
+from app.core.embedding import pdf_text
+from app.core.embedding.pdf_text import PdfTextCache, iter_pdf_pages
+
+
+def _write_pdf(path: Path, pages: List[str]) -> None:
+    """產生每頁一行 ASCII 文字的最小 PDF。"""
+    n = len(pages)
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(n))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def test_平行抽取依頁序產生各頁文字():
+    pages = [f"Page {i} says hello." for i in range(5)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "doc.pdf"
+        _write_pdf(path, pages)
+
+        result = list(iter_pdf_pages(path, workers=2, pages_per_task=2, min_pages=0))
+        pool = pdf_text._pool
+        again = list(iter_pdf_pages(path, workers=2, pages_per_task=2, min_pages=0))
+        reused = pdf_text._pool is pool
+        pdf_text.shutdown_pdf_pool()
+
+    assert [p.strip() for p in result] == pages
+    assert again == result
+    assert pool is not None and reused   # 同一個 process pool 跨呼叫重複使用
+
+
+def test_相同內容的檔案第二次直接讀快取不再解析(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        first = Path(tmp) / "a.pdf"
+        _write_pdf(first, ["Alpha.", "Beta."])
+        second = Path(tmp) / "copy_of_a.pdf"
+        second.write_bytes(first.read_bytes())
+
+        cache = PdfTextCache(Path(tmp) / "cache")
+        parsed = list(cache.iter_pages(first, workers=1))
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("命中快取時不應解析 PDF")
+
+        monkeypatch.setattr(pdf_text, "iter_pdf_pages", _fail)
+        assert list(cache.iter_pages(second, workers=1)) == parsed
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+
+def test_中途停止的解析不會留下快取():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "doc.pdf"
+        _write_pdf(path, ["One.", "Two.", "Three."])
+        cache = PdfTextCache(Path(tmp) / "cache")
+
+        pages = cache.iter_pages(path, workers=1)
+        next(pages)
+        pages.close()
+
+        assert cache.stats()["files"] == 0
+        assert list(cache.dir.iterdir()) == []
+
+
+def test_快取檔被其他_process_刪除時視為未命中或略過(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "doc.pdf"
+        _write_pdf(path, ["One.", "Two."])
+        cache = PdfTextCache(Path(tmp) / "cache", max_files=1)
+        parsed = list(cache.iter_pages(path, workers=1))
+
+        # 開檔後、更新 mtime 前被刪除：仍讀完已開啟的檔案
+        def _gone(p, *args, **kwargs):
+            raise FileNotFoundError(p)
+
+        monkeypatch.setattr(pdf_text.os, "utime", _gone)
+        assert list(cache.iter_pages(path, workers=1)) == parsed
+        monkeypatch.undo()
+
+        # 開檔前已被刪除：重新解析
+        for cached in cache.dir.glob("*.jsonl"):
+            cached.unlink()
+        assert list(cache.iter_pages(path, workers=1)) == parsed
+        assert cache.stats()["misses"] == 2
+
+        # 淘汰時列出的檔案已消失：略過
+        ghost = cache.dir / "ghost.jsonl"
+        real_glob = Path.glob
+        monkeypatch.setattr(Path, "glob", lambda self, pattern: [*real_glob(self, pattern), ghost])
+        cache._evict()
+        monkeypatch.undo()
+        assert cache.stats()["files"] == 1
@@ -0,0 +1,75 @@
+import tempfile
+
+from app.application.services.entity_linking_service import EntityLinkingService
+from app.core.graph.entity_matcher import EntityMatcher
+from app.core.graph.graph_store import GraphStore
+
+
+def test_比對採_leftmost_longest_且不分大小寫():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([
+            {"subject": "知識圖譜", "predicate": "包含", "object": "圖譜"},
+            {"subject": "GraphRAG", "predicate": "使用", "object": "知識圖譜"},
+            {"subject": "水", "predicate": "是", "object": "液體"},
+        ])
+        matcher = EntityMatcher(store)
+
+        matches = matcher.find("graphrag 如何用知識圖譜回答？水是液體")
+
+        assert [m["entity"] for m in matches] == ["GraphRAG", "知識圖譜", "液體"]
+        assert matches[1]["end"] - matches[1]["start"] == 4   # 不會另外命中「圖譜」
+        store.close()
+
+
+def test_add_triples_之後的新節點會增量加入自動機():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([{"subject": "西瓜", "predicate": "含有", "object": "水分"}])
+        matcher = EntityMatcher(store)
+        assert matcher.entities("西瓜汁和哈密瓜") == ["西瓜"]
+
+        store.add_triples([{"subject": "哈密瓜", "predicate": "屬於", "object": "甜瓜"}])
+
+        assert matcher.entities("西瓜汁和哈密瓜") == ["西瓜", "哈密瓜"]
+        assert len(matcher) == 4
+        store.close()
+
+
+def test_新名稱先以小自動機比對_累積後在背景重建主自動機():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([{"subject": "西瓜", "predicate": "含有", "object": "水分"}])
+        matcher = EntityMatcher(store, rebuild_pending=3)
+        main = matcher._main
+
+        store.add_triples([{"subject": "哈密瓜", "predicate": "屬於", "object": "甜瓜"}])
+        assert matcher.entities("哈密瓜不是西瓜") == ["哈密瓜", "西瓜"]
+        assert matcher._main is main            # 主自動機未重建
+
+        store.add_triples([{"subject": "Melon", "predicate": "即", "object": "MELON"}])
+        assert matcher.entities("melon 與哈密瓜") == ["Melon", "MELON", "哈密瓜"]
+        matcher.wait()
+
+        assert matcher._main is not main
+        assert matcher._pending == {}
+        assert matcher.entities("melon 與哈密瓜") == ["Melon", "MELON", "哈密瓜"]
+        assert len(matcher) == 6
+        store.close()
+
+
+def test_EntityLinkingService_優先回傳兩端都被提到的三元組():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([
+            {"subject": "西瓜", "predicate": "產地", "object": "台灣"},
+            {"subject": "西瓜", "predicate": "含有", "object": "水分"},
+        ])
+
+        triples = EntityLinkingService(store).extract("西瓜的水分很多")
+
+        assert [(t.subject, t.predicate, t.object) for t in triples] == [
+            ("西瓜", "含有", "水分"),
+            ("西瓜", "產地", "台灣"),
+        ]
+        store.close()
@@ -0,0 +1,113 @@
+import json
+import tempfile
+from pathlib import Path
+from typing import List
+
+from app.capabilities.textgen.text_generator import GeneratedText
+from app.core.graph.extraction_cache import ExtractionCache
+from app.core.graph.graph_builder import GraphBuilder
+from app.core.graph.graph_store import GraphStore
+
+
+class _CountingLLM:
+    model_id = "dummy-llm"
+
+    def __init__(self) -> None:
+        self.prompts: List[str] = []
+
+    def generate(self, prompt: str) -> List[GeneratedText]:
+        self.prompts.append(prompt)
+        payload = [{"subject": "西瓜", "predicate": "含有", "object": "水"}]
+        return [{"generated_text": json.dumps(payload, ensure_ascii=False)}]
+
+
+class _EmptyLLM(_CountingLLM):
+    def generate(self, prompt: str) -> List[GeneratedText]:
+        self.prompts.append(prompt)
+        return [{"generated_text": "[]"}]
+
+
+class _Provider:
+    def __init__(self, llm: _CountingLLM) -> None:
+        self.llm = llm
+
+    def get_llm(self) -> _CountingLLM:
+        return self.llm
+
+
+def test_快取重開後仍可命中並統計_hit_miss():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache.sqlite3"
+        key = ("abc", "m", "p", 400)
+
+        cache = ExtractionCache(path=path)
+        cache.put_many({key: [{"subject": "甲", "predicate": "是", "object": "乙"}]})
+        cache.close()
+
+        cache = ExtractionCache(path=path)
+        found = cache.get_many([key, ("zzz", "m", "p", 400)])
+
+        assert found == {key: [{"subject": "甲", "predicate": "是", "object": "乙"}]}
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        cache.close()
+
+
+def test_超過上限時淘汰最久未用的紀錄():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(path=Path(tmp) / "cache.sqlite3", max_entries=10)
+
+        for i in range(10):
+            cache.put_many({(str(i), "m", "p", 1): []})
+        cache.get_many([("0", "m", "p", 1)])
+        cache.put_many({("new", "m", "p", 1): []})
+
+        assert len(cache) <= 10
+        assert len(cache) == int(cache._conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0])
+        assert cache.evictions >= 1
+        assert ("1", "m", "p", 1) not in cache.get_many([("1", "m", "p", 1)])
+        assert ("0", "m", "p", 1) in cache.get_many([("0", "m", "p", 1)])
+        cache.close()
+
+
+def test_重複匯入同一份文件時不會再次呼叫_LLM():
+    with tempfile.TemporaryDirectory() as tmp:
+        doc = Path(tmp) / "doc.txt"
+        doc.write_text("西瓜含有大量的水。", encoding="utf-8")
+
+        llm = _CountingLLM()
+        cache = ExtractionCache(path=Path(tmp) / "cache.sqlite3")
+        store = GraphStore(path=f"{tmp}/graph.json")
+        builder = GraphBuilder(provider=_Provider(llm), store=store, cache=cache)  # type: ignore[arg-type]
+
+        first = builder.build_from_file(str(doc))
+        calls = len(llm.prompts)
+        second = builder.build_from_file(str(doc))
+
+        assert calls > 0
+        assert len(llm.prompts) == calls
+        assert first == second
+        assert cache.stats()["hits"] >= 1
+        store.close()
+        cache.close()
+
+
+def test_沒有三元組的_chunk_也會快取():
+    with tempfile.TemporaryDirectory() as tmp:
+        doc = Path(tmp) / "doc.txt"
+        doc.write_text("今天天氣很好。", encoding="utf-8")
+
+        llm = _EmptyLLM()
+        cache = ExtractionCache(path=Path(tmp) / "cache.sqlite3")
+        store = GraphStore(path=f"{tmp}/graph.json")
+        builder = GraphBuilder(provider=_Provider(llm), store=store, cache=cache)  # type: ignore[arg-type]
+
+        builder.build_from_file(str(doc))
+        calls = len(llm.prompts)
+        builder.build_from_file(str(doc))
+
+        assert calls > 0
+        assert len(llm.prompts) == calls
+        assert len(cache) == calls
+        store.close()
+        cache.close()
@@ -0,0 +1,90 @@
+import json
+from typing import List
+
+from app.capabilities.textgen.text_generator import GeneratedText
+from app.core.graph.graph_extractor import EXTRACTION_PROMPT_PREFIX, GraphExtractor
+
+
+class _BatchLLM:
+    """測試用假 LLM：回傳以 prompt 內文字為 subject 的三元組"""
+
+    def __init__(self) -> None:
+        self.batch_calls: List[int] = []
+
+    def generate(self, prompt: str) -> List[GeneratedText]:
+        raise AssertionError("支援批次時不應逐筆呼叫 generate")
+
+    def generate_batch(self, prompts: List[str], batch_size: int = 8) -> List[List[GeneratedText]]:
+        self.batch_calls.append(len(prompts))
+        outputs: List[List[GeneratedText]] = []
+        for p in prompts:
+            text = p.split("文字如下：")[1].split("請輸出結果")[0].strip()
+            if text == "壞掉":
+                outputs.append([{"generated_text": "???"}])
+                continue
+            payload = [{"subject": text, "predicate": "屬於", "object": "測試"}]
+            outputs.append([{"generated_text": json.dumps(payload, ensure_ascii=False)}])
+        return outputs
+
+
+class _SingleLLM:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def generate(self, prompt: str) -> List[GeneratedText]:
+        self.calls += 1
+        return [{"generated_text": '[{"subject":"甲","predicate":"是","object":"乙"}]'}]
+
+
+def test_批次抽取會一次送出所有_prompt_並保持順序():
+    llm = _BatchLLM()
+    extractor = GraphExtractor(llm=llm)
+
+    results = extractor.extract_triples_batch(["蘋果", "壞掉", "香蕉"], batch_size=3)
+
+    assert llm.batch_calls == [3]
+    assert [r[0]["subject"] if r else None for r in results] == ["蘋果", None, "香蕉"]
+
+
+def test_LLM_不支援批次時會退回逐筆抽取():
+    llm = _SingleLLM()
+    extractor = GraphExtractor(llm=llm)
+
+    results = extractor.extract_triples_batch(["一", "二"])
+
+    assert llm.calls == 2
+    assert results == [[{"subject": "甲", "predicate": "是", "object": "乙"}]] * 2
+
+
+class _PrefixLLM:
+    """測試用假 LLM：支援共用前綴的批次生成"""
+
+    def __init__(self) -> None:
+        self.prefixes: List[str] = []
+
+    def generate(self, prompt: str) -> List[GeneratedText]:
+        raise AssertionError("支援前綴 cache 時不應呼叫 generate")
+
+    def generate_batch_with_prefix(
+        self, prefix: str, suffixes: List[str], batch_size: int = 8
+    ) -> List[List[GeneratedText]]:
+        self.prefixes.append(prefix)
+        return [
+            [{"generated_text": json.dumps(
+                [{"subject": s.split("請輸出結果")[0].strip(), "predicate": "是", "object": "乙"}],
+                ensure_ascii=False,
+            )}]
+            for s in suffixes
+        ]
+
+
+def test_LLM_支援前綴_cache_時固定指令只作為前綴送出():
+    llm = _PrefixLLM()
+    extractor = GraphExtractor(llm=llm)
+
+    assert extractor.extract_triples("甲")[0]["subject"] == "甲"
+    results = extractor.extract_triples_batch(["丙", "丁"])
+
+    assert [r[0]["subject"] for r in results] == ["丙", "丁"]
+    assert llm.prefixes == [EXTRACTION_PROMPT_PREFIX] * 2
+    assert EXTRACTION_PROMPT_PREFIX + extractor._build_suffix(" 戊 ") == extractor._build_prompt(" 戊 ")
@@ -0,0 +1,79 @@
+import tempfile
+from pathlib import Path
+
+from app.core.graph.graph_layout import GraphLayout
+from app.core.graph.graph_store import GraphStore
+
+
+def test_佈局只為新節點計算座標且可重新載入():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([
+            {"subject": "A", "predicate": "r", "object": "B"},
+            {"subject": "B", "predicate": "r", "object": "C"},
+        ])
+        layout_path = Path(tmp) / "graph.layout.npz"
+        layout = GraphLayout(layout_path, background=False)
+
+        assert layout.update(store) == 3
+        assert layout.position("A") is not None
+
+        # 版本未變：不重算
+        assert layout.update(store) == 0
+
+        store.add_triples([{"subject": "C", "predicate": "r", "object": "D"}])
+        assert layout.update(store) == 1
+        assert layout.position("D") is not None
+
+        # 增量佈局延後寫回，close 時補寫；重新載入後沿用快取座標
+        layout.close()
+        reloaded = GraphLayout(layout_path)
+        assert reloaded.position("A") == layout.position("A")
+        assert reloaded.position("D") == layout.position("D")
+
+
+def test_新增節點不會改變既有節點的像素座標():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([{"subject": f"n{i}", "predicate": "r", "object": f"n{i + 1}"} for i in range(5)])
+        layout = GraphLayout(Path(tmp) / "graph.layout.npz", background=False)
+        layout.update(store)
+        before = {n: layout.position(n) for n in store.iter_nodes()}
+
+        store.add_triples([{"subject": "n5", "predicate": "r", "object": "新節點"}])
+        assert layout.update(store) == 1
+
+        assert {n: layout.position(n) for n in before} == before
+        assert layout.epoch == 1
+
+
+def test_背景完整佈局完成前_ready_為_False():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+        layout = GraphLayout(Path(tmp) / "graph.layout.npz")
+
+        assert layout.update(store) == 0   # 立即返回，不在呼叫端計算
+        layout.wait()
+
+        assert layout.ready
+        assert layout.position("A") is not None
+
+
+def test_背景增量佈局期間沿用上一份座標():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+        layout = GraphLayout(Path(tmp) / "graph.layout.npz")
+        layout.update(store)
+        layout.wait()
+        before = layout.position("A")
+
+        store.add_triples([{"subject": "B", "predicate": "r", "object": "C"}])
+        assert layout.update(store) == 0   # 增量佈局同樣交給背景執行緒
+        assert layout.position("A") == before
+        layout.wait()
+
+        assert layout.position("C") is not None
+        assert layout.position("A") == before
+        assert layout.epoch == 1
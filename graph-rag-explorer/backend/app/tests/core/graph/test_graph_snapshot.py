@@ -0,0 +1,94 @@
+import tempfile
+from pathlib import Path
+
+from app.core.graph.graph_snapshot import GraphSnapshot, write_snapshot
+from app.core.graph.graph_store import GraphStore
+
+
+def test_binary_snapshot_可直接查詢出入邊():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "graph.bin"
+        write_snapshot(
+            path,
+            nodes=["孤點"],
+            edges=[("西瓜", "水", "含有"), ("西瓜", "糖", None), ("葡萄", "水", "含有")],
+            wal_seq=7,
+        )
+
+        snap = GraphSnapshot(path)
+
+        assert snap.wal_seq == 7
+        assert snap.node_count == 5
+        assert snap.has_node("孤點")
+        assert not snap.has_node("香蕉")
+        assert sorted(snap.out_edges("西瓜")) == [("水", "含有"), ("糖", None)]  # type: ignore
+        assert sorted(snap.in_edges("水")) == [("葡萄", "含有"), ("西瓜", "含有")]
+
+        assert snap.has_edge("西瓜", "水", "含有")
+        assert snap.has_edge("西瓜", "糖", None)
+        assert not snap.has_edge("西瓜", "糖", "含有")
+        assert not snap.has_edge("西瓜", "水", None)
+        assert not snap.has_edge("葡萄", "糖", None)
+        assert not snap.has_edge("香蕉", "水", "含有")
+
+
+def test_binary_模式_GraphStore_不需轉成_NetworkX_即可查詢():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/graph.json"
+        store = GraphStore(
+            path=path,
+            snapshot_format="binary",
+            compact_every=1,
+            background_compaction=False,
+        )
+        store.add_triples([{"subject": "西瓜", "predicate": "含有", "object": "水"}])
+        store.close()
+
+        reopened = GraphStore(path=path, snapshot_format="binary")
+        reopened.add_triples([{"subject": "西瓜", "predicate": "屬於", "object": "水果"}])
+
+        related = reopened.search_related("西瓜")
+        assert reopened._base is not None
+        assert {(t["predicate"], t["object"]) for t in related} == {
+            ("含有", "水"),
+            ("屬於", "水果"),
+        }
+
+        assert reopened.graph.has_edge("西瓜", "水")
+        assert reopened.graph.has_edge("西瓜", "水果")
+
+
+def test_binary_compaction_寫到新檔名並刪除舊_snapshot():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/graph.json"
+        store = GraphStore(
+            path=path,
+            snapshot_format="binary",
+            compact_every=1,
+            background_compaction=False,
+        )
+        store.add_triples([{"subject": "西瓜", "predicate": "含有", "object": "水"}])
+        first = store.snapshot_path
+        store.add_triples([{"subject": "西瓜", "predicate": "屬於", "object": "水果"}])
+        store.close()
+
+        # 不取代 map 中的檔案：每次 compaction 寫新檔，舊檔在改 map 後刪除
+        assert store.snapshot_path != first
+        assert sorted(p.name for p in Path(tmp).glob("*.bin")) == [store.snapshot_path.name]
+
+        reopened = GraphStore(path=path, snapshot_format="binary")
+        assert reopened.snapshot_path == store.snapshot_path
+        assert {t["object"] for t in reopened.search_related("西瓜")} == {"水", "水果"}
+
+
+def test_binary_snapshot_串流寫入大量重複端點():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "graph.bin"
+        edges = ((f"n{i % 50}", f"n{(i * 7) % 50}", f"r{i % 3}") for i in range(1000))
+        write_snapshot(path, nodes=iter(()), edges=edges)
+
+        snap = GraphSnapshot(path)
+        assert snap.node_count == 50
+        assert snap.edge_count == 1000
+        row = [o for o, _ in snap.out_edges("n1")]
+        assert row == sorted(row)
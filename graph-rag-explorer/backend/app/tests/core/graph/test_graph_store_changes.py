@@ -0,0 +1,52 @@
+import tempfile
+
+from app.core.graph import graph_store
+from app.core.graph.graph_store import GraphStore
+
+
+def test_changes_since_只回傳指定版本之後的新增內容():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+        v1 = store.version
+
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])  # 重複，不算變更
+        store.add_triples([{"subject": "B", "predicate": "r", "object": "C"}])
+
+        changes = store.changes_since(v1)
+
+        assert changes is not None
+        assert len(changes) == 1
+        assert changes[0]["nodes"] == ["C"]
+        assert changes[0]["triples"][0]["object"] == "C"
+        assert store.changes_since(store.version) == []
+        assert store.changes_since(store.version + 1) is None
+
+
+def test_版本在重啟後延續且舊版本需改取完整圖譜():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/graph.json"
+        store = GraphStore(path=path)
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+        v1 = store.version
+        store.close()
+
+        reopened = GraphStore(path=path)
+        assert reopened.version == v1
+
+        # 重啟前的變更沒有紀錄
+        assert reopened.changes_since(0) is None
+        assert reopened.changes_since(v1) == []
+
+
+def test_變更紀錄截斷後回傳_None(monkeypatch):
+    monkeypatch.setattr(graph_store, "CHANGE_LOG_SIZE", 2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        start = store.version
+        for i in range(3):
+            store.add_triples([{"subject": "A", "predicate": "r", "object": f"N{i}"}])
+
+        assert store.changes_since(start) is None
+        assert len(store.changes_since(store.version - 2) or []) == 2
@@ -0,0 +1,74 @@
+import tempfile
+from pathlib import Path
+
+from app.core.graph.graph_store import GraphStore
+
+
+def test_重新開啟_GraphStore_時會重播_WAL():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/graph.json"
+        store = GraphStore(path=path)
+        store.add_triples([{"subject": "西瓜", "predicate": "含有", "object": "水"}])
+        store.close()
+
+        # 尚未 compaction：snapshot 不存在，只有 WAL
+        assert not Path(path).exists()
+
+        reopened = GraphStore(path=path)
+        assert reopened.graph.has_edge("西瓜", "水")
+
+
+def test_compaction_後_snapshot_涵蓋資料且_WAL_被清空():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/graph.json"
+        store = GraphStore(path=path, compact_every=2, background_compaction=False)
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+        store.add_triples([{"subject": "B", "predicate": "r", "object": "C"}])
+        store.close()
+
+        assert Path(path).exists()
+        assert store.wal_path.read_bytes() == b""
+
+        reopened = GraphStore(path=path)
+        assert reopened.graph.has_edge("A", "B")
+        assert reopened.graph.has_edge("B", "C")
+
+
+def test_WAL_尾端半截紀錄會被捨棄():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/graph.json"
+        store = GraphStore(path=path)
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+        store.close()
+
+        with open(store.wal_path, "ab") as f:
+            f.write(b'0000 {"seq":2,"trip')
+
+        reopened = GraphStore(path=path)
+        assert reopened.graph.has_edge("A", "B")
+        assert reopened.graph.number_of_edges() == 1
+
+
+def test_寫入觸發_compaction_與外部_save_同時進行不會死結():
+    import threading
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json", compact_every=1, background_compaction=False)
+
+        def _ingest() -> None:
+            for i in range(100):
+                store.add_triples([{"subject": f"n{i}", "predicate": "r", "object": f"n{i + 1}"}])
+
+        def _save() -> None:
+            for _ in range(100):
+                store.save()
+
+        threads = [threading.Thread(target=_ingest), threading.Thread(target=_save)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=30)
+
+        assert not any(t.is_alive() for t in threads)
+        store.close()
+        assert GraphStore(path=f"{tmp}/graph.json").graph.number_of_edges() == 100
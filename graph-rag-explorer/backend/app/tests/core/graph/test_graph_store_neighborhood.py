@@ -0,0 +1,69 @@
+import tempfile
+
+import pytest
+
+from app.core.graph.graph_store import GraphStore
+
+
+def _chain_store(tmp: str) -> GraphStore:
+    store = GraphStore(path=f"{tmp}/graph.json")
+    store.add_triples([
+        {"subject": "A", "predicate": "r", "object": "B"},
+        {"subject": "B", "predicate": "r", "object": "C"},
+        {"subject": "C", "predicate": "r", "object": "D"},
+        {"subject": "X", "predicate": "r", "object": "A"},
+    ])
+    return store
+
+
+def test_兩層鄰域會包含雙向邊且不超過層數():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _chain_store(tmp)
+
+        result = store.neighborhood("A", hops=2)
+
+        assert set(result["nodes"]) == {"A", "B", "C", "X"}
+        assert len(result["triples"]) == 3
+        assert result["truncated"] is False
+
+
+def test_只看出邊且受_max_edges_限制():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _chain_store(tmp)
+
+        result = store.neighborhood("A", hops=3, direction="out", max_edges=2)
+
+        assert [t["object"] for t in result["triples"]] == ["B", "C"]
+        assert result["truncated"] is True
+
+
+def test_不存在的節點回傳空子圖():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _chain_store(tmp)
+
+        assert store.neighborhood("不存在")["nodes"] == []
+
+
+def test_雙向展開時_fanout_由出邊與入邊交錯分配():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples(
+            [{"subject": "H", "predicate": "r", "object": f"out{i}"} for i in range(5)]
+            + [{"subject": f"in{i}", "predicate": "r", "object": "H"} for i in range(5)]
+        )
+
+        result = store.neighborhood("H", hops=1, fanout=4)
+
+        subjects = [t["subject"] for t in result["triples"]]
+        assert subjects.count("H") == 2
+        assert len(subjects) == 4
+
+
+def test_fanout_小於_1_時拋出_ValueError():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([{"subject": "A", "predicate": "r", "object": "B"}])
+
+        for fanout in (0, -1, [3, 0]):
+            with pytest.raises(ValueError):
+                store.neighborhood("A", fanout=fanout)
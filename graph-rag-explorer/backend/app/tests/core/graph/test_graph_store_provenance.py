@@ -0,0 +1,83 @@
+import tempfile
+
+import pytest
+
+from app.core.graph.graph_store import GraphStore
+
+
+def _t(s, p, o, doc, chunk):
+    return {"subject": s, "predicate": p, "object": o, "doc_id": doc, "chunk_id": chunk}
+
+
+def test_重複的邊會累加出處_entity_postings_依命中數排序():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([_t("西瓜", "含有", "水", "a.txt", "c1")])
+        v = store.provenance_version
+        store.add_triples([
+            _t("西瓜", "含有", "水", "b.txt", "c2"),
+            _t("水", "是", "液體", "b.txt", "c2"),
+        ])
+
+        assert store.provenance_version > v
+        assert store.edge_sources("西瓜", "含有", "水") == [
+            {"doc_id": "a.txt", "chunk_id": "c1"},
+            {"doc_id": "b.txt", "chunk_id": "c2"},
+        ]
+        assert store.node_sources("液體") == [{"doc_id": "b.txt", "chunk_id": "c2"}]
+        assert store.chunks_for_entities(["水", "液體"], limit=2) == ["c2", "c1"]
+
+
+@pytest.mark.parametrize("snapshot_format", ["json", "binary"])
+def test_出處在_compaction_與重啟後保留(snapshot_format):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/graph.json"
+        store = GraphStore(
+            path=path,
+            compact_every=2,
+            background_compaction=False,
+            snapshot_format=snapshot_format,
+        )
+        store.add_triples([_t("A", "r", "B", "d", "c1")])
+        store.add_triples([_t("B", "r", "C", "d", "c2")])   # 觸發 compaction
+        store.add_triples([_t("A", "r", "B", "e", "c3")])   # 只在 WAL 中
+        store.close()
+
+        reopened = GraphStore(path=path, snapshot_format=snapshot_format)
+        assert [s["chunk_id"] for s in reopened.edge_sources("A", "r", "B")] == ["c1", "c3"]
+        assert reopened.chunks_for_entities(["B"], limit=5) == ["c1", "c2", "c3"]
+        reopened.close()
+
+
+@pytest.mark.parametrize("journaled", [True, False])
+def test_出處只追加新紀錄_累積後才併回出處檔(journaled, monkeypatch):
+    from app.core.graph import graph_store
+
+    monkeypatch.setattr(graph_store, "PROVENANCE_FOLD_EVERY", 3)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/graph.json"
+        store = GraphStore(path=path, journaled=journaled, compact_every=1, background_compaction=False)
+
+        store.add_triples([_t("A", "r", "B", "a.txt", "c1")])
+        store.add_triples([_t("B", "r", "C", "a.txt", "c2")])
+
+        # 出處檔尚未建立，新出處只在追加檔中（每次 snapshot 一行，只含新紀錄）
+        assert not store.provenance_path.exists()
+        lines = store.provenance_log_path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2
+        assert "c1" not in lines[1]
+
+        reopened = GraphStore(path=path, journaled=journaled)
+        assert reopened.edge_sources("B", "r", "C") == [{"doc_id": "a.txt", "chunk_id": "c2"}]
+        reopened.close()
+
+        # 第 3 行達到門檻：併回出處檔並清空追加檔
+        store.add_triples([_t("C", "r", "D", "b.txt", "c3")])
+        assert store.provenance_path.exists()
+        assert store.provenance_log_path.read_bytes() == b""
+        store.close()
+
+        reopened = GraphStore(path=path, journaled=journaled)
+        assert reopened.chunks_for_entities(["B", "C"], limit=3) == ["c2", "c1", "c3"]
+        assert reopened.node_sources("D") == [{"doc_id": "b.txt", "chunk_id": "c3"}]
+        reopened.close()
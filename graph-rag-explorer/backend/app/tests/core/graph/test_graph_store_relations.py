@@ -0,0 +1,47 @@
+import tempfile
+
+import pytest
+
+from app.core.graph.graph_store import GraphStore
+
+
+def test_同一對節點的不同關係不會互相覆蓋():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([
+            {"subject": "西瓜", "predicate": "含有", "object": "水"},
+            {"subject": "西瓜", "predicate": "需要", "object": "水"},
+            {"subject": "西瓜", "predicate": "含有", "object": "水"},
+        ])
+
+        related = store.search_related("西瓜")
+
+        assert sorted(t["predicate"] for t in related) == ["含有", "需要"]  # type: ignore
+
+
+@pytest.mark.parametrize("snapshot_format", ["json", "binary"])
+def test_依關係與入邊查詢(snapshot_format):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/graph.json"
+        store = GraphStore(
+            path=path,
+            snapshot_format=snapshot_format,
+            compact_every=1,
+            background_compaction=False,
+        )
+        store.add_triples([
+            {"subject": "西瓜", "predicate": "含有", "object": "水"},
+            {"subject": "葡萄", "predicate": "含有", "object": "水"},
+        ])
+        store.close()
+
+        reopened = GraphStore(path=path, snapshot_format=snapshot_format)
+        reopened.add_triples([{"subject": "西瓜", "predicate": "屬於", "object": "水果"}])
+
+        by_rel = reopened.search_by_relation("含有")
+        assert sorted(t["subject"] for t in by_rel) == ["葡萄", "西瓜"]
+        assert len(reopened.search_by_relation("含有", limit=1)) == 1
+        assert reopened.search_by_relation("不存在") == []
+
+        incoming = reopened.search_incoming("水")
+        assert sorted(t["subject"] for t in incoming) == ["葡萄", "西瓜"]
@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import pytest
+import torch
+from tokenizers import Regex, Tokenizer, decoders, models, pre_tokenizers
+from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+from app.core.llm.llm import LLM
+
+_CHARS = "[]系統內容問題：\n abcdefghijklmnopqrstuvwxyz甲乙丙丁是的"
+
+
+def _build_tiny_model(path: Path, words: tuple[str, ...] = ()) -> Path:
+    """以隨機權重建立極小的 Llama 與逐字 tokenizer；words 中的詞會合併成單一 token"""
+    vocab = {"<unk>": 0, "<s>": 1, "</s>": 2}
+    for token in (*words, *_CHARS):
+        vocab.setdefault(token, len(vocab))
+    pattern = "|".join([*words, "."]) if words else "."
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Split(Regex(pattern), behavior="isolated")
+    backend.decoder = decoders.Fuse()
+    PreTrainedTokenizerFast(
+        tokenizer_object=backend,
+        unk_token="<unk>",
+        bos_token="<s>",
+        eos_token="</s>",
+    ).save_pretrained(path)
+
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=256,
+        bos_token_id=1,
+        eos_token_id=2,
+    )
+    LlamaForCausalLM(config).save_pretrained(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def tiny_model_dir(tmp_path_factory) -> Path:
+    """不需下載模型的極小 Llama"""
+    return _build_tiny_model(tmp_path_factory.mktemp("tiny_llm"))
+
+
+def _load(path: Path, prefix_cache: bool) -> LLM:
+    llm = LLM(model_id=str(path), device="cpu", prefix_cache=prefix_cache)
+    llm.generation_kwargs = {"max_new_tokens": 6, "do_sample": False}
+    llm.load()
+    # bfloat16 的捨入誤差會讓隨機模型的 greedy 結果在近似平手時分歧，比對時改用 float32
+    llm.model.float()
+    return llm
+
+
+def test_使用前綴_cache_的生成結果與完整_prompt_相同(tiny_model_dir):
+    cached = _load(tiny_model_dir, prefix_cache=True)
+    plain = _load(tiny_model_dir, prefix_cache=False)
+    prefix = "[系統]\n甲是乙的內容：\n"
+    suffixes = ["abc", "丙丁是 xyz 的問題：", "q"]
+
+    expected = [plain.generate_with_prefix(prefix, s) for s in suffixes]
+
+    # 逐筆、批次（不同長度的後段）都要一致
+    assert [cached.generate_with_prefix(prefix, s) for s in suffixes] == expected
+    assert cached.generate_batch_with_prefix(prefix, suffixes, batch_size=3) == expected
+
+    stats = cached.prefix_cache_stats()
+    assert stats["entries"] == 1
+    assert stats["misses"] == 1
+    assert stats["hits"] == 3
+
+
+def test_前綴_cache_依最近使用淘汰(tiny_model_dir, monkeypatch):
+    monkeypatch.setattr("app.core.llm.llm.PREFIX_CACHE_SIZE", 2)
+    llm = _load(tiny_model_dir, prefix_cache=True)
+
+    for prefix in ("甲甲", "乙乙", "甲甲", "丙丙"):
+        llm.generate_with_prefix(prefix, "a")
+
+    assert list(llm._prefix_cache) == ["甲甲", "丙丙"]
+
+
+def test_前綴與後段跨邊界合併時改走一般生成(tmp_path):
+    path = _build_tiny_model(tmp_path, words=("ab",))
+    cached = _load(path, prefix_cache=True)
+    plain = _load(path, prefix_cache=False)
+    prefix = "[系統]\n甲是乙的內容：a"
+    suffixes = ["bc", "xyz"]   # "a" + "b" 整段 tokenize 時會合併成 "ab"
+
+    expected = [plain.generate_with_prefix(prefix, s) for s in suffixes]
+
+    assert cached.generate_batch_with_prefix(prefix, suffixes, batch_size=2) == expected
+    assert cached.generate_with_prefix(prefix, "bc") == expected[0]
@@ -0,0 +1,39 @@
+import tempfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.application.services.graph_query_service import GraphQueryService
+from app.core.graph.graph_store import GraphStore
+from app.routes import graph
+
+
+@pytest.fixture
+def client():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore(path=f"{tmp}/graph.json")
+        store.add_triples([
+            {"subject": "A", "predicate": "r", "object": "B"},
+            {"subject": "B", "predicate": "r", "object": "C"},
+        ])
+        app = FastAPI()
+        app.include_router(graph.router)
+        app.state.graph_query_service = GraphQueryService(store)
+        yield TestClient(app)
+        store.close()
+
+
+@pytest.mark.parametrize("fanout", ["-1", "0", "2&fanout=0", str(graph.MAX_FANOUT + 1)])
+def test_fanout_不是正數或超過上限時回傳_422(client, fanout):
+    response = client.get(f"/graph/neighborhood?node=A&fanout={fanout}")
+
+    assert response.status_code == 422
+    assert "fanout" in response.json()["detail"]
+
+
+def test_合法的_fanout_逐層展開(client):
+    response = client.get("/graph/neighborhood?node=A&hops=2&fanout=1&fanout=1")
+
+    assert response.status_code == 200
+    assert set(response.json()["nodes"]) == {"A", "B", "C"}
@@ -0,0 +1,19 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.infrastructure.models.model_loader import ModelRegistry
+from app.infrastructure.models.model_provider import ModelProvider
+from app.routes import inference
+
+
+def test_embedder_尚未建立時查詢快取統計不會載入模型():
+    registry = ModelRegistry(device="cpu")
+    app = FastAPI()
+    app.include_router(inference.router)
+    app.state.model_provider = ModelProvider(registry)
+
+    response = TestClient(app).get("/api/embedder/cache")
+
+    assert response.status_code == 200
+    assert response.json() == {}
+    assert registry._embedder is None
@@ -0,0 +1,226 @@
+"""
+離線批次匯入整個目錄的文件（不啟動 FastAPI）。
+
+流程：
+ 1. 走訪目錄，收集指定副檔名的檔案
+ 2. 以 process pool 平行串流切 chunk（iter_document_chunks）
+ 3. 主程序累積 chunk，每滿 --flush-chunks 筆：
+    - 向量化並寫入 Embedder 的向量索引（與 /api/upload 相同的內容 hash chunk id）
+    - 加入關鍵字（bigram）倒排索引
+    - 以 LLM 批次抽取三元組並寫入 GraphStore（附出處）
+ 4. 輸出各階段的耗時與吞吐量
+
+切 chunk 與後續階段重疊進行：主程序處理前一批時，pool 仍在切後面的檔案；
+同時在途的檔案數有上限，切得比處理快時不會無限制堆積在記憶體。
+
+用法（於 backend/ 執行）：
+    python scripts/bulk_ingest.py data/corpus --workers 4 --flush-chunks 1024
+    python scripts/bulk_ingest.py data/corpus --no-graph          # 只建向量與關鍵字索引
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config.modules import ModulesConfig  # noqa: E402
+from app.config.paths import KEYWORD_INDEX_DIR  # noqa: E402
+from app.core.embedding import pdf_text  # noqa: E402
+from app.core.embedding.bigram_index import BigramIndex  # noqa: E402
+from app.core.embedding.chunker import iter_document_chunks  # noqa: E402
+from app.core.embedding.embedder import chunk_id  # noqa: E402
+from app.core.graph.extraction_cache import ExtractionCache  # noqa: E402
+from app.core.graph.graph_builder import EXTRACTION_BATCH_SIZE, GraphBuilder  # noqa: E402
+from app.core.graph.graph_store import GraphStore  # noqa: E402
+from app.infrastructure.models.model_loader import ModelRegistry  # noqa: E402
+from app.infrastructure.models.model_provider import ModelProvider  # noqa: E402
+
+
+DEFAULT_EXTENSIONS = ".txt,.md,.log,.pdf"
+
+
+def _init_worker() -> None:
+    # 已在 process pool 中平行處理檔案，PDF 不再另開 process pool
+    pdf_text.PDF_WORKERS = 1
+
+
+def _chunk_file(path: str) -> Tuple[str, List[str], float]:
+    """
+    （worker process）串流切分單一檔案，回傳 (路徑, chunk 文字, 耗時)。
+
+    逐段讀檔，不會把整份檔案與所有句子同時留在記憶體；
+    chunk 文字要跨 process 傳回主程序，只能整份檔案一起回傳。
+    """
+    t0 = time.perf_counter()
+    texts = [c["text"] for c in iter_document_chunks(path)]
+    return path, texts, time.perf_counter() - t0
+
+
+class Stage:
+    """單一階段的累計筆數與耗時。"""
+
+    def __init__(self, name: str, unit: str) -> None:
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.seconds = 0.0
+
+    def add(self, items: int, seconds: float) -> None:
+        self.items += items
+        self.seconds += seconds
+
+    def report(self) -> str:
+        rate = self.items / self.seconds if self.seconds > 0 else 0.0
+        return f"{self.name:<10}{self.items:>10} {self.unit:<8}{self.seconds:>10.2f}s{rate:>12.1f} {self.unit}/s"
+
+
+def collect_files(root: Path, extensions: Set[str]) -> List[Path]:
+    """遞迴收集指定副檔名的檔案（依路徑排序）。"""
+    return sorted(
+        p for p in root.rglob("*")
+        if p.is_file() and p.suffix.lower() in extensions
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", type=Path, help="要匯入的目錄")
+    parser.add_argument("--extensions", default=DEFAULT_EXTENSIONS, help="逗號分隔的副檔名")
+    parser.add_argument("--workers", type=int, default=max(1, (multiprocessing.cpu_count() or 2) - 1), help="切 chunk 的 process 數")
+    parser.add_argument("--flush-chunks", type=int, default=1024, help="累積幾個 chunk 送一次向量化 / 抽取")
+    parser.add_argument("--extract-batch", type=int, default=EXTRACTION_BATCH_SIZE, help="每次送進 LLM 的 chunk 數")
+    parser.add_argument("--max-graph-chunks", type=int, default=None, help="每次 flush 最多抽取三元組的 chunk 數（預設不限制）")
+    parser.add_argument("--no-embed", action="store_true", help="不建立向量與關鍵字索引")
+    parser.add_argument("--no-graph", action="store_true", help="不抽取三元組")
+    args = parser.parse_args()
+
+    extensions = {e.strip().lower() if e.strip().startswith(".") else "." + e.strip().lower()
+                  for e in args.extensions.split(",") if e.strip()}
+    files = collect_files(args.root, extensions)
+    if not files:
+        print(f"⚠️ {args.root} 底下沒有符合 {sorted(extensions)} 的檔案")
+        return
+    print(f"📂 找到 {len(files)} 個檔案，以 {args.workers} 個 process 切 chunk ...")
+
+    modules = ModulesConfig()
+    registry = ModelRegistry(modules)
+    provider = ModelProvider(registry)
+
+    keyword_index: Optional[BigramIndex] = None if args.no_embed else BigramIndex(KEYWORD_INDEX_DIR)
+    store: Optional[GraphStore] = None
+    builder: Optional[GraphBuilder] = None
+    extraction_cache: Optional[ExtractionCache] = None
+    if not args.no_graph:
+        store = GraphStore(snapshot_format=modules.graph_snapshot_format)
+        extraction_cache = ExtractionCache()
+        builder = GraphBuilder(provider=provider, store=store, cache=extraction_cache)
+
+    chunk_stage = Stage("chunk", "files")
+    embed_stage = Stage("embed", "chunks")
+    keyword_stage = Stage("keyword", "chunks")
+    graph_stage = Stage("graph", "chunks")
+    totals: Dict[str, int] = {"chunks": 0, "new": 0, "skipped": 0, "triples": 0}
+
+    buffer: List[Tuple[str, str]] = []   # (doc id, chunk 文字)
+
+    def flush() -> None:
+        if not buffer:
+            return
+        texts = [t for _, t in buffer]
+
+        if not args.no_embed:
+            t0 = time.perf_counter()
+            counts = provider.get_embedder().add_chunks(texts)
+            embed_stage.add(len(texts), time.perf_counter() - t0)
+            totals["new"] += counts["new"]
+            totals["skipped"] += counts["skipped"]
+
+            assert keyword_index is not None
+            t0 = time.perf_counter()
+            keyword_index.add([chunk_id(t) for t in texts], texts)
+            keyword_index.save()
+            keyword_stage.add(len(texts), time.perf_counter() - t0)
+
+        if builder is not None:
+            t0 = time.perf_counter()
+            triples = builder.build_from_chunks(
+                buffer,
+                max_chunks=args.max_graph_chunks,
+                batch_size=args.extract_batch,
+            )
+            graph_stage.add(len(buffer), time.perf_counter() - t0)
+            totals["triples"] += len(triples)
+
+        buffer.clear()
+
+    started = time.perf_counter()
+    max_in_flight = max(1, args.workers) * 2
+    pending: Set[Future] = set()
+    queue = iter(files)
+    done_files = 0
+
+    with ProcessPoolExecutor(
+        max_workers=max(1, args.workers),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    ) as pool:
+        while True:
+            # 補滿在途的檔案
+            for path in queue:
+                pending.add(pool.submit(_chunk_file, str(path)))
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                try:
+                    path, texts, seconds = future.result()
+                except Exception as e:
+                    print(f"❌ 切 chunk 失敗：{e}")
+                    continue
+
+                chunk_stage.add(1, seconds)
+                done_files += 1
+                totals["chunks"] += len(texts)
+                doc_id = str(Path(path).relative_to(args.root))
+                buffer.extend((doc_id, t) for t in texts)
+                print(f"🧩 [{done_files}/{len(files)}] {doc_id}：{len(texts)} 個 chunk")
+
+            if len(buffer) >= args.flush_chunks:
+                flush()
+
+    flush()
+    wall = time.perf_counter() - started
+
+    if store is not None:
+        store.close()
+    if extraction_cache is not None:
+        extraction_cache.close()
+    registry.unload_all()
+
+    print()
+    print(f"✅ 完成：{len(files)} 個檔案、{totals['chunks']} 個 chunk，總耗時 {wall:.2f}s")
+    if not args.no_embed:
+        print(f"   向量索引新增 {totals['new']} 筆，略過 {totals['skipped']} 筆（已存在）")
+    if builder is not None:
+        print(f"   三元組 {totals['triples']} 筆")
+    print()
+    print(f"{'stage':<10}{'items':>10} {'unit':<8}{'busy':>11}{'throughput':>15}")
+    # chunk 階段的耗時為各 worker 的累計 CPU 時間，其餘為主程序時間
+    for stage in (chunk_stage, embed_stage, keyword_stage, graph_stage):
+        if stage.items:
+            print(stage.report())
+    print(f"{'overall':<10}{totals['chunks']:>10} {'chunks':<8}{wall:>10.2f}s{totals['chunks'] / max(wall, 1e-9):>12.1f} chunks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+比較向量索引後端的召回率與查詢延遲。
+
+以合成的群聚向量（模擬句向量分佈）建立：
+ - ChromaDB（HNSW，L2）
+ - NumpyVectorIndex（float32 / float16 / int8）
+並以 float64 暴力搜尋結果為基準，計算 recall@k 與 p50 / p95 查詢延遲。
+
+用法（於 backend/ 執行）：
+    python scripts/compare_vector_index.py --n 20000 --dim 384 --queries 200 --k 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.capabilities.vectorindex.vector_index import VectorIndex  # noqa: E402
+from app.core.embedding.chroma_index import ChromaVectorIndex  # noqa: E402
+from app.core.embedding.numpy_index import NumpyVectorIndex  # noqa: E402
+
+
+def make_vectors(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """產生群聚分佈的正規化向量。"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=n)
+    vecs = centers[labels] + 0.6 * rng.normal(size=(n, dim))
+    return (vecs / np.linalg.norm(vecs, axis=1, keepdims=True)).astype(np.float32)
+
+
+def evaluate(
+    name: str,
+    factory: Callable[[Path], VectorIndex],
+    vecs: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    k: int,
+    batch: int,
+) -> Dict[str, float]:
+    ids = [f"id{i}" for i in range(len(vecs))]
+    docs = [f"doc{i}" for i in range(len(vecs))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = factory(Path(tmp))
+        step = min(batch, index.max_batch_size)
+
+        t0 = time.perf_counter()
+        for a in range(0, len(vecs), step):
+            index.add(ids[a : a + step], docs[a : a + step], vecs[a : a + step].tolist())
+        build = time.perf_counter() - t0
+
+        latencies: List[float] = []
+        hits = 0
+        for q, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            result = index.query(q.tolist(), k)
+            latencies.append(time.perf_counter() - t0)
+            found = {int(h["id"][2:]) for h in result}
+            hits += len(found & set(expected.tolist()))
+
+    lat = np.array(latencies) * 1000
+    return {
+        "backend": name,
+        "build_s": build,
+        "recall": hits / (len(queries) * k),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20_000, help="向量數")
+    parser.add_argument("--dim", type=int, default=384, help="向量維度")
+    parser.add_argument("--queries", type=int, default=200, help="查詢數")
+    parser.add_argument("--k", type=int, default=5, help="top-k")
+    parser.add_argument("--clusters", type=int, default=64, help="群聚數")
+    parser.add_argument("--batch", type=int, default=2_000, help="每批寫入筆數")
+    parser.add_argument("--skip-chroma", action="store_true", help="不測 ChromaDB")
+    args = parser.parse_args()
+
+    print(f"🧪 產生 {args.n} 筆 {args.dim} 維向量、{args.queries} 筆查詢 ...")
+    vecs = make_vectors(args.n, args.dim, args.clusters, seed=0)
+    queries = make_vectors(args.queries, args.dim, args.clusters, seed=1)
+
+    exact = queries.astype(np.float64) @ vecs.astype(np.float64).T
+    truth = np.argsort(-exact, axis=1)[:, : args.k]
+
+    backends: Dict[str, Callable[[Path], VectorIndex]] = {}
+    if not args.skip_chroma:
+        backends["chroma"] = lambda d: ChromaVectorIndex(d)
+    for dtype in ("float32", "float16", "int8"):
+        backends[f"numpy-{dtype}"] = lambda d, dt=dtype: NumpyVectorIndex(d, dtype=dt)
+
+    rows = [
+        evaluate(name, factory, vecs, queries, truth, args.k, args.batch)
+        for name, factory in backends.items()
+    ]
+
+    print()
+    print(f"{'backend':<16}{'build(s)':>10}{'recall@' + str(args.k):>12}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for r in rows:
+        print(
+            f"{r['backend']:<16}{r['build_s']:>10.2f}{r['recall']:>12.3f}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()